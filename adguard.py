@@ -2,30 +2,44 @@
 # 🛡️ ADGUARD SYSTEM - USER SESSION PROTECTION
 # ==========================================
 
+import asyncio
 import time
 import logging
-import aiosqlite
 from functools import wraps
 from telegram import Update, InlineQueryResultArticle, InputTextMessageContent
 from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
 
+from dbpool import SQLitePool
+
 logger = logging.getLogger(__name__)
 
 class AdguardSystem:
     """
     Adguard System - Proteksi akses bot
     User HARUS /start dulu sebelum bisa akses fitur apapun
+
+    Semua session aktif di-load ke memory saat init_table, jadi check_session
+    murni lookup dict. Update last_activity dikumpulkan lalu di-flush batch
+    tiap `flush_interval` detik; session expired dibersihkan oleh task sweeper.
     """
     
-    def __init__(self, db_name: str):
+    def __init__(self, db_name: str, pool: SQLitePool = None,
+                 flush_interval: float = 30.0, sweep_interval: float = 600.0):
         self.db_name = db_name
-        self.active_sessions = {}
+        self.pool = pool or SQLitePool(db_name)
+        self.active_sessions = {}  # user_id -> last_activity
         self.session_timeout = 86400 * 30
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self._dirty = {}  # user_id -> last_activity yang belum ditulis ke DB
+        self._task = None
+        self.flushed_rows = 0
+        self.swept = 0
         
     async def init_table(self):
-        """Buat tabel adguard_sessions jika belum ada"""
-        async with aiosqlite.connect(self.db_name) as db:
+        """Buat tabel adguard_sessions jika belum ada, lalu load session aktif ke memory"""
+        async with self.pool.writer() as db:
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS adguard_sessions (
                     user_id INTEGER PRIMARY KEY,
@@ -36,14 +50,84 @@ class AdguardSystem:
                 )
             """)
             await db.commit()
-        logger.info("[ADGUARD] Table initialized")
+        
+        rows = await self.pool.fetch_all(
+            "SELECT user_id, last_activity FROM adguard_sessions WHERE is_active=1 AND last_activity>?",
+            (time.time() - self.session_timeout,)
+        )
+        self.active_sessions = {user_id: last_activity for user_id, last_activity in rows or []}
+        logger.info(f"[ADGUARD] Table initialized ({len(self.active_sessions)} active sessions loaded)")
+
+    # ===== BACKGROUND FLUSH & SWEEP =====
+
+    def start(self):
+        """Mulai task flush last_activity + sweep session expired"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop task background lalu flush sisa last_activity"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        last_sweep = time.time()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if time.time() - last_sweep >= self.sweep_interval:
+                await self.sweep()
+                last_sweep = time.time()
+
+    async def flush(self):
+        """Tulis semua perubahan last_activity dalam 1 transaksi"""
+        if not self._dirty:
+            return
+        batch, self._dirty = self._dirty, {}
+        try:
+            await self.pool.executemany(
+                "UPDATE adguard_sessions SET last_activity=? WHERE user_id=?",
+                [(last_activity, user_id) for user_id, last_activity in batch.items()]
+            )
+            self.flushed_rows += len(batch)
+        except Exception as e:
+            logger.error(f"[ADGUARD] Flush error: {e}")
+            # Kembalikan ke antrian (nilai yang lebih baru menang)
+            for user_id, last_activity in batch.items():
+                self._dirty.setdefault(user_id, last_activity)
+
+    async def sweep(self):
+        """Buang session expired dari memory & tandai is_active=0 di DB"""
+        cutoff = time.time() - self.session_timeout
+        expired = [uid for uid, last_activity in self.active_sessions.items() if last_activity <= cutoff]
+        for uid in expired:
+            self.active_sessions.pop(uid, None)
+            self._dirty.pop(uid, None)
+        try:
+            await self.pool.execute(
+                "UPDATE adguard_sessions SET is_active=0 WHERE is_active=1 AND last_activity<=?",
+                (cutoff,)
+            )
+        except Exception as e:
+            logger.error(f"[ADGUARD] Sweep error: {e}")
+        if expired:
+            self.swept += len(expired)
+            logger.info(f"[ADGUARD] Swept {len(expired)} expired sessions")
+
+    # ===== SESSION API =====
     
     async def register_session(self, user_id: int) -> bool:
         """Register user session saat /start"""
         current_time = time.time()
         
         try:
-            async with aiosqlite.connect(self.db_name) as db:
+            async with self.pool.writer() as db:
                 cursor = await db.execute(
                     "SELECT start_count FROM adguard_sessions WHERE user_id=?",
                     (user_id,)
@@ -64,10 +148,8 @@ class AdguardSystem:
                 
                 await db.commit()
             
-            self.active_sessions[user_id] = {
-                "last_activity": current_time,
-                "is_active": True
-            }
+            self.active_sessions[user_id] = current_time
+            self._dirty.pop(user_id, None)
             
             logger.info(f"[ADGUARD] Session registered for user {user_id}")
             return True
@@ -79,44 +161,9 @@ class AdguardSystem:
     async def unregister_session(self, user_id: int) -> bool:
         """Unregister user session (close)"""
         try:
-            async with aiosqlite.connect(self.db_name) as db:
-                await db.execute("DELETE FROM adguard_sessions WHERE user_id=?", (user_id,))
-                await db.commit()
-            
-            if user_id in self.active_sessions:
-                del self.active_sessions[user_id]
-                
-            logger.info(f"[ADGUARD] Session unregistered for user {user_id}")
-            return True
-        except Exception as e:
-            logger.error(f"[ADGUARD] Unregister error: {e}")
-            return False
-
-    async def unregister_session(self, user_id: int) -> bool:
-        """Unregister user session (close)"""
-        try:
-            async with aiosqlite.connect(self.db_name) as db:
-                await db.execute("DELETE FROM adguard_sessions WHERE user_id=?", (user_id,))
-                await db.commit()
-            
-            if user_id in self.active_sessions:
-                del self.active_sessions[user_id]
-                
-            logger.info(f"[ADGUARD] Session unregistered for user {user_id}")
-            return True
-        except Exception as e:
-            logger.error(f"[ADGUARD] Unregister error: {e}")
-            return False
-
-    async def unregister_session(self, user_id: int) -> bool:
-        """Unregister user session (close)"""
-        try:
-            async with aiosqlite.connect(self.db_name) as db:
-                await db.execute("DELETE FROM adguard_sessions WHERE user_id=?", (user_id,))
-                await db.commit()
-            
-            if user_id in self.active_sessions:
-                del self.active_sessions[user_id]
+            self.active_sessions.pop(user_id, None)
+            self._dirty.pop(user_id, None)
+            await self.pool.execute("DELETE FROM adguard_sessions WHERE user_id=?", (user_id,))
                 
             logger.info(f"[ADGUARD] Session unregistered for user {user_id}")
             return True
@@ -125,57 +172,28 @@ class AdguardSystem:
             return False
 
     async def check_session(self, user_id: int) -> bool:
-        """Cek apakah user punya session aktif"""
-        current_time = time.time()
-        
-        if user_id in self.active_sessions:
-            session = self.active_sessions[user_id]
-            if session.get("is_active") and (current_time - session.get("last_activity", 0)) < self.session_timeout:
-                self.active_sessions[user_id]["last_activity"] = current_time
-                return True
+        """Cek apakah user punya session aktif (in-memory, tanpa query DB)"""
+        last_activity = self.active_sessions.get(user_id)
+        if last_activity is None:
+            return False
         
-        try:
-            async with aiosqlite.connect(self.db_name) as db:
-                cursor = await db.execute(
-                    "SELECT last_activity, is_active FROM adguard_sessions WHERE user_id=?",
-                    (user_id,)
-                )
-                result = await cursor.fetchone()
-                
-                if result:
-                    last_activity, is_active = result
-                    
-                    if is_active and (current_time - last_activity) < self.session_timeout:
-                        self.active_sessions[user_id] = {
-                            "last_activity": current_time,
-                            "is_active": True
-                        }
-                        
-                        await db.execute(
-                            "UPDATE adguard_sessions SET last_activity=? WHERE user_id=?",
-                            (current_time, user_id)
-                        )
-                        await db.commit()
-                        return True
-                    
-                return False
-                
-        except Exception as e:
-            logger.error(f"[ADGUARD] Check session error: {e}")
+        current_time = time.time()
+        if current_time - last_activity >= self.session_timeout:
             return False
+        
+        self.active_sessions[user_id] = current_time
+        self._dirty[user_id] = current_time
+        return True
     
     async def invalidate_session(self, user_id: int) -> bool:
         """Invalidate user session"""
         try:
-            async with aiosqlite.connect(self.db_name) as db:
-                await db.execute(
-                    "UPDATE adguard_sessions SET is_active=0 WHERE user_id=?",
-                    (user_id,)
-                )
-                await db.commit()
-            
-            if user_id in self.active_sessions:
-                del self.active_sessions[user_id]
+            self.active_sessions.pop(user_id, None)
+            self._dirty.pop(user_id, None)
+            await self.pool.execute(
+                "UPDATE adguard_sessions SET is_active=0 WHERE user_id=?",
+                (user_id,)
+            )
             
             logger.info(f"[ADGUARD] Session invalidated for user {user_id}")
             return True
@@ -187,26 +205,32 @@ class AdguardSystem:
     async def get_session_stats(self, user_id: int) -> dict:
         """Get session statistics untuk user"""
         try:
-            async with aiosqlite.connect(self.db_name) as db:
-                cursor = await db.execute(
-                    "SELECT first_start, last_activity, start_count, is_active FROM adguard_sessions WHERE user_id=?",
-                    (user_id,)
-                )
-                result = await cursor.fetchone()
-                
-                if result:
-                    return {
-                        "first_start": result[0],
-                        "last_activity": result[1],
-                        "start_count": result[2],
-                        "is_active": bool(result[3])
-                    }
-                return None
+            result = await self.pool.fetch_one(
+                "SELECT first_start, last_activity, start_count, is_active FROM adguard_sessions WHERE user_id=?",
+                (user_id,)
+            )
+            
+            if result:
+                return {
+                    "first_start": result[0],
+                    "last_activity": self._dirty.get(user_id, result[1]),
+                    "start_count": result[2],
+                    "is_active": bool(result[3])
+                }
+            return None
                 
         except Exception as e:
             logger.error(f"[ADGUARD] Get stats error: {e}")
             return None
 
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.active_sessions),
+            "dirty": len(self._dirty),
+            "flushed_rows": self.flushed_rows,
+            "swept": self.swept,
+        }
+
 
 # Global instance
 _adguard_instance = None
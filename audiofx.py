@@ -0,0 +1,125 @@
+# ==========================================
+# 🎧 AUDIO EFFECTS ENGINE - ASYNC FFMPEG + SOURCE CACHE
+# ==========================================
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+
+logger = logging.getLogger(__name__)
+
+# callback prefix -> (key variant, label, filter ffmpeg)
+AUDIO_EFFECTS = {
+    "eff_8d": ("8d", "8D Audio", "apulsator=hz=0.125"),
+    "eff_bass": ("bass", "Bass Boosted", "equalizer=f=60:width_type=h:width=50:g=15"),
+    "eff_slow": ("slow", "Slowed + Reverb", "atempo=0.85,aecho=0.8:0.9:1000:0.3"),
+    "eff_night": ("night", "Nightcore", "asetrate=44100*1.25,atempo=1.0"),
+    "eff_reverb": ("reverb", "Reverb", "aecho=0.8:0.9:1000:0.3"),
+    "eff_speed": ("speed", "Speed Up", "atempo=1.25"),
+}
+DEFAULT_EFFECT = ("normal", "Normal", "anull")
+
+
+class AudioEffectsEngine:
+    """
+    Render efek audio pakai ffmpeg async (asyncio subprocess) dengan batas paralel.
+    Source mp3 per track_id disimpan di folder cache lokal (LRU by mtime) supaya
+    efek berikutnya tidak perlu download ulang.
+    """
+
+    def __init__(self, cache_dir: str = "audio_cache", max_sources: int = 50,
+                 max_renders: int = 2, render_timeout: float = 120.0):
+        self.cache_dir = cache_dir
+        self.max_sources = max_sources
+        self.render_timeout = render_timeout
+        self._render_slots = asyncio.Semaphore(max_renders)
+        self.max_renders = max_renders
+        self.renders = 0
+        self.render_failures = 0
+        self.source_hits = 0
+        self.source_misses = 0
+        self._total_render_ms = 0.0
+
+    @staticmethod
+    def resolve(effect_type: str) -> tuple:
+        """Return (key, label, filter) untuk callback eff_*"""
+        return AUDIO_EFFECTS.get(effect_type, DEFAULT_EFFECT)
+
+    # ===== SOURCE CACHE =====
+
+    def _source_file(self, track_id: str) -> str:
+        safe_id = "".join(c for c in track_id if c.isalnum())
+        return os.path.join(self.cache_dir, f"{safe_id}.mp3")
+
+    def get_source(self, track_id: str):
+        """Path source mp3 lokal kalau ada (dan tandai baru dipakai)"""
+        path = self._source_file(track_id)
+        if os.path.exists(path):
+            os.utime(path, None)
+            self.source_hits += 1
+            return path
+        self.source_misses += 1
+        return None
+
+    def store_source(self, track_id: str, file_path: str) -> str:
+        """Pindahkan mp3 hasil download ke cache source, lalu prune yang paling lama"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        dest = self._source_file(track_id)
+        shutil.move(file_path, dest)
+        self._prune()
+        return dest
+
+    def _prune(self):
+        try:
+            files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".mp3")]
+        except FileNotFoundError:
+            return
+        if len(files) <= self.max_sources:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_sources]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # ===== RENDER =====
+
+    async def render(self, input_path: str, filter_cmd: str, output_path: str) -> bool:
+        """Jalankan ffmpeg async (maks `max_renders` paralel). Return True kalau output jadi."""
+        async with self._render_slots:
+            started = time.perf_counter()
+            proc = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-loglevel", "error", "-i", input_path,
+                "-af", filter_cmd, "-vn", "-y", output_path,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                _, stderr = await asyncio.wait_for(proc.communicate(), timeout=self.render_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                proc.kill()
+                await proc.wait()
+                self.render_failures += 1
+                raise
+
+            if proc.returncode != 0 or not os.path.exists(output_path):
+                self.render_failures += 1
+                logger.error(f"[AUDIOFX] ffmpeg failed ({proc.returncode}): {stderr.decode(errors='ignore')[:200]}")
+                return False
+
+            self.renders += 1
+            self._total_render_ms += (time.perf_counter() - started) * 1000
+            return True
+
+    def stats(self) -> dict:
+        return {
+            "renders": self.renders,
+            "failures": self.render_failures,
+            "avg_render_ms": round(self._total_render_ms / self.renders, 1) if self.renders else 0.0,
+            "source_hits": self.source_hits,
+            "source_misses": self.source_misses,
+            "max_renders": self.max_renders,
+        }
@@ -0,0 +1,35 @@
+"""
+Benchmark extractor per platform vs walk generik collect_urls pada fixture GiMiTA.
+
+    python benchmarks/bench_extractors.py [iterasi]
+"""
+
+import glob
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mediaextract import GIMITA_EXTRACTORS, ExtractorRegistry, collect_urls, unwrap_response  # noqa: E402
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    registry = ExtractorRegistry(GIMITA_EXTRACTORS)
+    print(f"{'fixture':<24}{'extractor us':>14}{'walk us':>10}{'speedup':>9}")
+    for path in sorted(glob.glob(os.path.join(ROOT, "tests", "fixtures", "gimita", "*.json"))):
+        with open(path, encoding="utf-8") as fh:
+            fx = json.load(fh)
+        platform, data = fx["platform"], unwrap_response(fx["response"])
+        # Jalur produksi: extractor, walk hanya kalau extractor menyerah
+        fast = timeit.timeit(lambda: registry.extract(platform, data) or collect_urls(data, platform), number=number)
+        walk = timeit.timeit(lambda: collect_urls(data, platform), number=number)
+        name = os.path.basename(path)[:-5]
+        print(f"{name:<24}{fast / number * 1e6:>14.2f}{walk / number * 1e6:>10.2f}{walk / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
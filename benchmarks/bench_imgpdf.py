@@ -0,0 +1,90 @@
+"""
+Benchmark /imgpdf: versi lama (PIL decode + exif_transpose + thumbnail 2500px + save PDF)
+vs _op_images (JPEG di-embed apa adanya, orientasi EXIF lewat matrix halaman), langsung
+dan lewat PdfEngine.run (termasuk start proses worker, seperti di bot).
+Input sintetis: foto JPEG ~12 MP dengan tag Orientation 6 (seperti foto HP) dan PNG
+(jalur decode tetap dipakai untuk non-JPEG).
+
+    python benchmarks/bench_imgpdf.py [lebar] [tinggi] [runs]
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageOps
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pdfengine import PdfEngine, _op_images  # noqa: E402
+
+
+def make_photo(path: str, width: int, height: int, fmt: str = "JPEG"):
+    """Gambar bernoise (tidak terlalu gampang dikompres) + EXIF Orientation 6 untuk JPEG"""
+    noise = Image.effect_noise((width // 4, height // 4), 60).resize((width, height))
+    gradient = Image.linear_gradient("L").resize((width, height))
+    im = Image.merge("RGB", (noise, gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    if fmt == "JPEG":
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        im.save(path, "JPEG", quality=90, exif=exif)
+    else:
+        im.save(path, fmt)
+
+
+def legacy_imgpdf(paths: list, out_path: str) -> dict:
+    """Alur /imgpdf sebelum engine (di proses bot)"""
+    pil_images = []
+    for p in paths:
+        im = Image.open(p)
+        im = ImageOps.exif_transpose(im)
+        if im.mode in ("RGBA", "P"):
+            im = im.convert("RGB")
+        if max(im.size) > 2500:
+            im.thumbnail((2500, 2500))
+        pil_images.append(im)
+    first = pil_images[0]
+    first.save(out_path, "PDF", resolution=150.0, save_all=True, append_images=pil_images[1:])
+    return {"pages": len(pil_images)}
+
+
+def engine_imgpdf(paths: list, out_path: str) -> dict:
+    return asyncio.run(PdfEngine(max_workers=1).run("images", paths, out_path))
+
+
+def measure(func, paths: list, out_path: str, runs: int) -> tuple:
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(paths, out_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, os.path.getsize(out_path)
+
+
+def main(width: int = 4000, height: int = 3000, runs: int = 3):
+    workdir = tempfile.mkdtemp(prefix="bench_imgpdf_")
+    try:
+        inputs = {}
+        for fmt, ext in (("JPEG", "jpg"), ("PNG", "png")):
+            path = os.path.join(workdir, f"photo.{ext}")
+            make_photo(path, width, height, fmt)
+            inputs[fmt] = path
+
+        print(f"gambar {width}x{height}, best of {runs}")
+        print(f"{'input':<6} {'versi':<8} {'ms':>9} {'output KB':>10}")
+        for fmt, path in inputs.items():
+            out_path = os.path.join(workdir, "out.pdf")
+            for label, func in (("lama", legacy_imgpdf), ("op", _op_images), ("worker", engine_imgpdf)):
+                elapsed, size = measure(func, [path], out_path, runs)
+                print(f"{fmt:<6} {label:<8} {elapsed * 1000:>9.1f} {size // 1024:>10}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:4]))
@@ -0,0 +1,101 @@
+"""
+Benchmark credit ledger di bawah contention: deduct lama (SELECT saldo, cek di Python,
+lalu UPDATE tanpa syarat) vs CreditLedger.deduct (1 UPDATE bersyarat di lock writer).
+Tiap user di-spam request bersamaan melebihi saldonya; diukur deduct/detik dan overspend
+(deduct yang lolos melebihi saldo). Terakhir: reset harian 1 bulk UPDATE untuk semua user.
+
+    python benchmarks/bench_ledger.py [users] [request_per_user] [cost]
+"""
+
+import asyncio
+import datetime
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dbpool import SQLitePool  # noqa: E402
+from ledger import FREE_DAILY_CREDITS, CreditLedger  # noqa: E402
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS user_credits (
+        user_id INTEGER PRIMARY KEY,
+        credits INTEGER DEFAULT 50,
+        last_reset TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+async def legacy_deduct(pool: SQLitePool, user_id: int, cost: int) -> tuple:
+    """Alur sebelum ledger: baca saldo, cek, lalu potong (ada await di antara cek & UPDATE)"""
+    row = await pool.fetch_one("SELECT credits FROM user_credits WHERE user_id = ?", (user_id,))
+    credits = row[0]
+    if credits < cost:
+        return (False, credits)
+    await pool.execute("UPDATE user_credits SET credits = credits - ? WHERE user_id = ?", (cost, user_id))
+    return (True, credits - cost)
+
+
+async def fresh_pool(path: str, users: int) -> SQLitePool:
+    if os.path.exists(path):
+        os.remove(path)
+    pool = SQLitePool(path)
+    await pool.open()
+    await pool.execute(SCHEMA)
+    now = datetime.datetime.now().isoformat()
+    await pool.executemany(
+        "INSERT INTO user_credits (user_id, credits, last_reset) VALUES (?, ?, ?)",
+        [(uid, FREE_DAILY_CREDITS, now) for uid in range(users)]
+    )
+    return pool
+
+
+async def run(label: str, path: str, users: int, per_user: int, cost: int, ledger_mode: bool):
+    pool = await fresh_pool(path, users)
+    ledger = CreditLedger(pool)
+    # Request di-interleave antar user, semua di-gather sekaligus
+    tasks = [ledger.deduct(uid, cost) if ledger_mode else legacy_deduct(pool, uid, cost)
+             for _ in range(per_user) for uid in range(users)]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    ok = sum(1 for success, _ in results if success)
+    allowed = users * (FREE_DAILY_CREDITS // cost)
+    rows = await pool.fetch_all("SELECT credits FROM user_credits")
+    negative = sum(1 for (credits,) in rows if credits < 0)
+    print(f"{label:<8} {len(tasks):>8} {ok:>8} {max(0, ok - allowed):>10} {negative:>9} "
+          f"{elapsed * 1000:>10.1f} {len(tasks) / elapsed:>10.0f}")
+
+    if ledger_mode:
+        start = time.perf_counter()
+        reset_rows = await ledger.reset_daily()
+        print(f"\nreset harian: {reset_rows} user dalam 1 UPDATE, {(time.perf_counter() - start) * 1000:.1f} ms")
+    await pool.close()
+
+
+async def amain(users: int, per_user: int, cost: int):
+    workdir = tempfile.mkdtemp(prefix="bench_ledger_")
+    path = os.path.join(workdir, "ledger.db")
+    print(f"{users} user x {per_user} request bersamaan, cost {cost}, saldo awal {FREE_DAILY_CREDITS}")
+    print(f"{'versi':<8} {'request':>8} {'lolos':>8} {'overspend':>10} {'saldo<0':>9} {'total ms':>10} {'req/s':>10}")
+    try:
+        await run("lama", path, users, per_user, cost, ledger_mode=False)
+        await run("ledger", path, users, per_user, cost, ledger_mode=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(users: int = 200, per_user: int = 80, cost: int = 1):
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(amain(users, per_user, cost))
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:4]))
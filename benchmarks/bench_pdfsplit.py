@@ -0,0 +1,110 @@
+"""
+Benchmark /pdfsplit: split lama (1 file sementara per halaman lalu di-zip) vs
+_op_split (halaman langsung ke ZIP, opsional hanya range terpilih).
+Diukur: wall time, byte yang ditulis proses (/proc/self/io wchar) dan jumlah file sementara.
+
+    python benchmarks/bench_pdfsplit.py [halaman] [range]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pdfengine import _op_split, parse_page_ranges  # noqa: E402
+
+
+def make_pdf(path: str, pages: int, lines: int = 40):
+    """PDF teks sintetis ~3KB/halaman (tanpa dependency selain stdlib)"""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+    objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>")
+    font_id = 3 + 2 * pages
+    for i in range(pages):
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {4 + 2 * i} 0 R "
+                    f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>")
+        text = " ".join(f"BT /F1 10 Tf 40 {800 - 18 * n} Td (Page {i + 1} line {n} lorem ipsum dolor sit amet) Tj ET"
+                        for n in range(lines))
+        objs.append(f"<< /Length {len(text)} >>\nstream\n{text}\nendstream")
+    objs.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    out = "%PDF-1.4\n"
+    offsets = []
+    for n, obj in enumerate(objs):
+        offsets.append(len(out))
+        out += f"{n + 1} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    with open(path, "w") as fh:
+        fh.write(out)
+
+
+def legacy_split(path: str, zip_path: str, tmp_dir: str) -> dict:
+    """Perilaku /pdfsplit sebelum PDF worker: semua halaman ke file sementara, lalu zf.write"""
+    from PyPDF2 import PdfReader, PdfWriter
+
+    reader = PdfReader(path)
+    files = 0
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(len(reader.pages)):
+            writer = PdfWriter()
+            writer.add_page(reader.pages[i])
+            page_path = os.path.join(tmp_dir, f"page_{i + 1}.pdf")
+            with open(page_path, "wb") as pf:
+                writer.write(pf)
+            files += 1
+            zf.write(page_path, arcname=f"page_{i + 1}.pdf")
+    return {"pages": len(reader.pages), "temp_files": files}
+
+
+def written_bytes() -> int:
+    try:
+        with open("/proc/self/io") as fh:
+            for line in fh:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def measure(label: str, fn):
+    before = written_bytes()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    written = written_bytes() - before
+    print(f"{label:<28}{elapsed * 1000:>10.0f} ms{written / 1024:>12.0f} KB{result.get('temp_files', 0):>8}"
+          f"{result['pages']:>8}")
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    spec = sys.argv[2] if len(sys.argv) > 2 else "1-3,10,20-25"
+    work = tempfile.mkdtemp(prefix="bench_split_")
+    try:
+        src = os.path.join(work, "source.pdf")
+        make_pdf(src, pages)
+        print(f"source: {pages} pages, {os.path.getsize(src) / 1024:.0f} KB, selection '{spec}'")
+        print(f"{'mode':<28}{'wall':>13}{'written':>15}{'tmp':>8}{'pages':>8}")
+        ranges = parse_page_ranges(spec)
+        modes = [
+            ("legacy all pages", lambda: legacy_split(src, os.path.join(work, "legacy.zip"), work)),
+            ("zip stream all pages", lambda: _op_split(src, os.path.join(work, "all.zip"))),
+            ("zip stream selection", lambda: _op_split(src, os.path.join(work, "sel.zip"), ranges)),
+            ("single files 1-3", lambda: _op_split(src, work, [[1, 3]], as_files=True)),
+        ]
+        _op_split(src, os.path.join(work, "warmup.zip"), [[1, 1]])  # import PyPDF2 + cache file
+        for label, fn in modes:
+            measure(label, fn)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark WordChainGame: versi lama (list scan per tebakan / per kata baru) vs
+versi sekarang (tuple + frozenset + used_set, pick O(1)).
+Satu game = main sampai kamus habis di level "hard" terbesar; tiap ronde ada
+1 tebakan benar + 1 tebakan salah yang divalidasi.
+
+    python benchmarks/bench_wordchain.py [games] [games_lama] [kali]
+
+Versi lama ~10 detik per game di kamus en/hard (587 kata), jadi jumlah game-nya dipisah.
+`kali` > 1 memperbesar kamus hard (kata + sufiks), meniru kamus dari WORD_CHAIN_FILE.
+"""
+
+import ast
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from wordindex import LevelVocab  # noqa: E402
+
+SOURCE = os.path.join(ROOT, "duhur_fixed.py")
+
+
+def load_from_bot():
+    """
+    Ambil WORD_CHAIN_WORDS dan class WordChainGame langsung dari duhur_fixed.py
+    (modul bot tidak bisa di-import tanpa config.py)
+    """
+    tree = ast.parse(open(SOURCE, encoding="utf-8").read(), SOURCE)
+    words, game_node = None, None
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "WORD_CHAIN_WORDS":
+            words = ast.literal_eval(node.value)
+        elif isinstance(node, ast.ClassDef) and node.name == "WordChainGame":
+            game_node = node
+    namespace = {"random": random, "LevelVocab": LevelVocab, "current_time": time.time}
+    exec(compile(ast.Module(body=[game_node], type_ignores=[]), SOURCE, "exec"), namespace)
+    return words, namespace["WordChainGame"]
+
+
+class LegacyWordChainGame:
+    """Logika sebelum index: word_list di-copy per game, validasi & pick scan seluruh list"""
+
+    def __init__(self, word_list: list):
+        self.word_list = word_list.copy()
+        self.used_words = []
+        self.current_word = random.choice(word_list)
+        self.used_words.append(self.current_word)
+
+    def is_valid_word(self, word: str) -> bool:
+        word_lower = word.lower().strip()
+        used_lower = [w.lower() for w in self.used_words]
+        if word_lower not in [w.lower() for w in self.word_list]:
+            return False
+        if word_lower in used_lower:
+            return False
+        return True
+
+    def get_next_word(self) -> tuple:
+        available = [w for w in self.word_list if w.lower() not in [uw.lower() for uw in self.used_words]]
+        if not available:
+            return None, True
+        next_word = random.choice(available)
+        self.used_words.append(next_word)
+        self.current_word = next_word
+        return next_word, False
+
+
+def play(game) -> int:
+    """Main sampai kamus habis; return jumlah ronde"""
+    rounds = 0
+    while True:
+        word = game.current_word
+        if not game.is_valid_word("zzqx" + word):
+            rounds += 1
+        game.is_valid_word(word)  # kata yang sudah dipakai -> harus ditolak
+        _, habis = game.get_next_word()
+        if habis:
+            return rounds
+
+
+def run(label: str, make_game, games: int):
+    start = time.perf_counter()
+    rounds = 0
+    for _ in range(games):
+        rounds += play(make_game())
+    elapsed = time.perf_counter() - start
+    per_round = elapsed / rounds
+    print(f"{label:<10} {games:>6} {rounds:>9} {elapsed * 1000:>10.1f} {per_round * 1e6:>12.2f}")
+    return per_round
+
+
+def main(games: int = 200, legacy_games: int = 1, scale: int = 1):
+    words, WordChainGame = load_from_bot()
+    lang, hard = max(((lang, levels["hard"]) for lang, levels in words.items() if "hard" in levels),
+                     key=lambda item: len(item[1]))
+    word_list = [w if n == 0 else f"{w}{n}" for n in range(scale) for w in hard]
+    vocab = LevelVocab(lang, "hard", word_list)
+    print(f"level: {lang}/hard, {len(vocab)} kata")
+    print(f"{'versi':<10} {'game':>6} {'ronde':>9} {'total ms':>10} {'us/ronde':>12}")
+
+    random.seed(1)
+    legacy = run("lama", lambda: LegacyWordChainGame(word_list), legacy_games)
+    random.seed(1)
+    new = run("index", lambda: WordChainGame(0, 0, lang, "hard", vocab), games)
+    print(f"speedup per ronde: {legacy / new:.0f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:4]))
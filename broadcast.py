@@ -0,0 +1,354 @@
+# ==========================================
+# 📢 BROADCAST ENGINE - PARALLEL FAN-OUT + RATE AWARE + RESUMABLE
+# ==========================================
+
+import asyncio
+import datetime
+import logging
+import time
+
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+logger = logging.getLogger(__name__)
+
+# Pesan error BadRequest yang artinya chat sudah mati -> hapus dari subscribers
+DEAD_CHAT_ERRORS = ("chat not found", "user is deactivated", "bot was kicked", "peer_id_invalid")
+
+# Hasil kirim per chat (index = kolom counter di job)
+SENT, FAILED, REMOVED = 1, 2, 3
+_OUTCOME_FIELDS = {SENT: "sent", FAILED: "failed", REMOVED: "removed"}
+
+
+class _RateLimiter:
+    """Rate limiter global (jarak minimal antar kirim) + pause saat kena RetryAfter"""
+
+    def __init__(self, rate_per_sec: float):
+        self.interval = 1.0 / rate_per_sec
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        loop_now = asyncio.get_running_loop().time()
+        self._paused_until = max(self._paused_until, loop_now + seconds)
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self._next_slot, self._paused_until)
+            self._next_slot = start + self.interval
+        delay = start - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class BroadcastJob:
+    """State 1 broadcast (di-checkpoint ke tabel broadcast_jobs)"""
+
+    def __init__(self, job_id: int, kind: str, text: str, parse_mode: str,
+                 status_chat_id: int = None, status_message_id: int = None):
+        self.id = job_id
+        self.kind = kind
+        self.text = text
+        self.parse_mode = parse_mode
+        self.status_chat_id = status_chat_id
+        self.status_message_id = status_message_id
+        self.status = "running"
+        self.total = 0
+        self.sent = 0
+        self.failed = 0
+        self.removed = 0
+        self.last_done_id = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self._session_start_done = 0
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed + self.removed
+
+    @property
+    def rate(self) -> float:
+        """Pesan/detik sejak job (atau resume) dimulai"""
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return (self.done - self._session_start_done) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float:
+        left = max(0, self.total - self.done)
+        return left / self.rate if self.rate > 0 else 0.0
+
+
+class BroadcastEngine:
+    """
+    Kirim 1 pesan ke semua subscriber:
+    - `concurrency` worker paralel, dibatasi rate global (`rate_per_sec`) + jarak per chat
+    - RetryAfter -> semua worker pause, chat yang sama dicoba ulang di tempat (bukan ke
+      belakang antrian) supaya watermark tidak tertahan
+    - chat mati dikumpulkan lalu dihapus pakai 1 DELETE per checkpoint (cache `entitlements` ikut di-invalidate)
+    - progress di-checkpoint tiap `checkpoint_interval` detik: watermark `last_done_id` +
+      counter yang hanya menghitung chat sampai watermark, jadi resume setelah restart
+      mengulang paling banyak `concurrency` chat dan counter tidak dobel
+    - job terjadwal (kind selain 'manual') yang lebih tua dari `scheduled_max_age`
+      tidak di-resume (pesan pagi basi), statusnya jadi 'expired'
+    - status message di-update dengan throughput live lewat `formatter(job)`
+    """
+
+    def __init__(self, pool, formatter=None, rate_per_sec: float = 25.0, concurrency: int = 20,
+                 private_interval: float = 1.0, group_interval: float = 3.0,
+                 checkpoint_interval: float = 5.0, max_attempts: int = 3,
+                 scheduled_max_age: float = 3600.0, entitlements=None):
+        self.pool = pool
+        self.entitlements = entitlements
+        self.formatter = formatter
+        self.rate_per_sec = rate_per_sec
+        self.concurrency = concurrency
+        self.private_interval = private_interval
+        self.group_interval = group_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.max_attempts = max_attempts
+        self.scheduled_max_age = scheduled_max_age
+        self._limiter = _RateLimiter(rate_per_sec)
+        self._last_sent = {}
+        self._tasks = {}
+        self.active_jobs = {}
+        self.retry_after_hits = 0
+
+    async def init_table(self):
+        async with self.pool.writer() as db:
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS broadcast_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT,
+                    text TEXT,
+                    parse_mode TEXT,
+                    status TEXT DEFAULT 'running',
+                    total INTEGER DEFAULT 0,
+                    sent INTEGER DEFAULT 0,
+                    failed INTEGER DEFAULT 0,
+                    removed INTEGER DEFAULT 0,
+                    last_done_id INTEGER DEFAULT 0,
+                    status_chat_id INTEGER,
+                    status_message_id INTEGER,
+                    created_at REAL,
+                    updated_at REAL
+                )
+            """)
+            await db.commit()
+
+    # ===== PUBLIC API =====
+
+    async def launch(self, bot, text: str, kind: str = "manual", parse_mode: str = ParseMode.HTML,
+                     status_chat_id: int = None, status_message_id: int = None) -> BroadcastJob:
+        """Buat job baru lalu jalankan di background. Return job (langsung, tidak menunggu selesai)."""
+        now = time.time()
+        async with self.pool.writer() as db:
+            cursor = await db.execute(
+                "INSERT INTO broadcast_jobs (kind, text, parse_mode, status, status_chat_id, status_message_id, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'running', ?, ?, ?, ?)",
+                (kind, text, parse_mode, status_chat_id, status_message_id, now, now)
+            )
+            job_id = cursor.lastrowid
+            await db.commit()
+        job = BroadcastJob(job_id, kind, text, parse_mode, status_chat_id, status_message_id)
+        self._spawn(bot, job)
+        return job
+
+    async def resume_pending(self, bot) -> int:
+        """Lanjutkan job yang statusnya masih 'running' (bot restart di tengah broadcast)"""
+        rows = await self.pool.fetch_all(
+            "SELECT id, kind, text, parse_mode, sent, failed, removed, last_done_id, status_chat_id, status_message_id, created_at "
+            "FROM broadcast_jobs WHERE status='running'"
+        )
+        resumed = 0
+        for row in rows or []:
+            if row[1] != "manual" and time.time() - (row[10] or 0) > self.scheduled_max_age:
+                logger.info(f"[BROADCAST] Job #{row[0]} ({row[1]}) is stale, not resuming")
+                await self.pool.execute(
+                    "UPDATE broadcast_jobs SET status='expired', updated_at=? WHERE id=?", (time.time(), row[0])
+                )
+                continue
+            job = BroadcastJob(row[0], row[1], row[2], row[3], row[8], row[9])
+            job.sent, job.failed, job.removed, job.last_done_id = row[4], row[5], row[6], row[7] or 0
+            logger.info(f"[BROADCAST] Resuming job #{job.id} after user_id {job.last_done_id}")
+            self._spawn(bot, job)
+            resumed += 1
+        return resumed
+
+    async def stop(self):
+        """Hentikan job aktif; progress terakhir sudah di-checkpoint jadi bisa di-resume"""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        for task in list(self._tasks.values()):
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks.clear()
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self.active_jobs),
+            "rate_limit": self.rate_per_sec,
+            "concurrency": self.concurrency,
+            "retry_after": self.retry_after_hits,
+            "throughput": round(sum(j.rate for j in self.active_jobs.values()), 1),
+        }
+
+    # ===== INTERNAL =====
+
+    def _spawn(self, bot, job: BroadcastJob):
+        task = asyncio.create_task(self._run(bot, job))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _t, jid=job.id: self._tasks.pop(jid, None))
+
+    async def _run(self, bot, job: BroadcastJob):
+        rows = await self.pool.fetch_all(
+            "SELECT user_id FROM subscribers WHERE user_id > ? ORDER BY user_id",
+            (job.last_done_id,)
+        )
+        ids = [r[0] for r in rows or []]
+        job.total = job.done + len(ids)
+        job._session_start_done = job.done
+        job.started_at = time.time()
+        self.active_jobs[job.id] = job
+
+        outcomes = bytearray(len(ids))
+        # committed = counter sampai watermark (yang di-checkpoint); job.sent dst = live
+        state = {"watermark": 0, "committed": {"sent": job.sent, "failed": job.failed, "removed": job.removed}}
+        dead_chats = []
+        queue = asyncio.Queue()
+        for idx, chat_id in enumerate(ids):
+            queue.put_nowait((idx, chat_id))
+
+        def mark_done(idx: int, outcome: int):
+            outcomes[idx] = outcome
+            setattr(job, _OUTCOME_FIELDS[outcome], getattr(job, _OUTCOME_FIELDS[outcome]) + 1)
+            wm = state["watermark"]
+            while wm < len(ids) and outcomes[wm]:
+                state["committed"][_OUTCOME_FIELDS[outcomes[wm]]] += 1
+                wm += 1
+            state["watermark"] = wm
+
+        workers = [
+            asyncio.create_task(self._worker(bot, job, queue, mark_done, dead_chats))
+            for _ in range(min(self.concurrency, max(1, len(ids))))
+        ]
+        reporter = asyncio.create_task(self._checkpoint_loop(bot, job, ids, state, dead_chats))
+        try:
+            await asyncio.gather(*workers)
+            job.status = "done"
+            job.finished_at = time.time()
+        finally:
+            reporter.cancel()
+            for w in workers:
+                w.cancel()
+            # Simpan checkpoint terakhir (status tetap 'running' kalau di-cancel -> resume)
+            try:
+                await self._checkpoint(job, ids, state, dead_chats)
+            except Exception as e:
+                logger.error(f"[BROADCAST] Final checkpoint error: {e}")
+            self.active_jobs.pop(job.id, None)
+            for chat_id in ids:
+                self._last_sent.pop(chat_id, None)
+
+        await self._report(bot, job)
+        logger.info(f"[BROADCAST] Job #{job.id} done: sent={job.sent} failed={job.failed} removed={job.removed}")
+
+    async def _worker(self, bot, job: BroadcastJob, queue: asyncio.Queue, mark_done, dead_chats: list):
+        while True:
+            try:
+                idx, chat_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            outcome = await self._deliver(bot, job, chat_id)
+            if outcome == REMOVED:
+                dead_chats.append((idx, chat_id))
+            mark_done(idx, outcome)
+
+    async def _deliver(self, bot, job: BroadcastJob, chat_id: int) -> int:
+        """Kirim ke 1 chat; retry di tempat (RetryAfter / error jaringan). Return SENT/FAILED/REMOVED."""
+        attempt = 1
+        while True:
+            # Jarak minimal per chat (grup lebih ketat dari private)
+            min_gap = self.group_interval if chat_id < 0 else self.private_interval
+            gap = time.monotonic() - self._last_sent.get(chat_id, 0.0)
+            if gap < min_gap:
+                await asyncio.sleep(min_gap - gap)
+
+            await self._limiter.wait()
+            try:
+                await bot.send_message(chat_id, job.text, parse_mode=job.parse_mode)
+                self._last_sent[chat_id] = time.monotonic()
+                return SENT
+            except RetryAfter as e:
+                delay = e.retry_after
+                if isinstance(delay, datetime.timedelta):
+                    delay = delay.total_seconds()
+                self.retry_after_hits += 1
+                # Semua worker ikut pause; chat ini dicoba lagi begitu limiter buka
+                self._limiter.pause(float(delay) + 0.5)
+            except Forbidden:
+                return REMOVED
+            except BadRequest as e:
+                return REMOVED if any(err in str(e).lower() for err in DEAD_CHAT_ERRORS) else FAILED
+            except (TimedOut, NetworkError):
+                if attempt >= self.max_attempts:
+                    return FAILED
+                await asyncio.sleep(attempt)
+                attempt += 1
+            except Exception as e:
+                logger.debug(f"[BROADCAST] Send error to {chat_id}: {e}")
+                return FAILED
+
+    async def _checkpoint_loop(self, bot, job: BroadcastJob, ids: list, state: dict, dead_chats: list):
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                await self._checkpoint(job, ids, state, dead_chats)
+            except Exception as e:
+                logger.error(f"[BROADCAST] Checkpoint error: {e}")
+            await self._report(bot, job)
+
+    async def _checkpoint(self, job: BroadcastJob, ids: list, state: dict, dead_chats: list):
+        wm = state["watermark"]
+        if wm > 0:
+            job.last_done_id = ids[wm - 1]
+        # Hanya chat sebelum watermark yang dihapus & dihitung; sisanya dicoba lagi kalau resume
+        dead = [chat_id for idx, chat_id in dead_chats if idx < wm]
+        dead_chats[:] = [(idx, chat_id) for idx, chat_id in dead_chats if idx >= wm]
+        committed = state["committed"]
+        async with self.pool.writer() as db:
+            # Chat mati dihapus sekaligus (dipotong per 500 biar aman limit variabel SQLite)
+            for i in range(0, len(dead), 500):
+                chunk = dead[i:i + 500]
+                await db.execute(
+                    f"DELETE FROM subscribers WHERE user_id IN ({','.join('?' for _ in chunk)})",
+                    chunk
+                )
+            await db.execute(
+                "UPDATE broadcast_jobs SET status=?, total=?, sent=?, failed=?, removed=?, last_done_id=?, updated_at=? WHERE id=?",
+                (job.status, job.total, committed["sent"], committed["failed"], committed["removed"],
+                 job.last_done_id, time.time(), job.id)
+            )
+            await db.commit()
+        if self.entitlements is not None:
+            for chat_id in dead:
+                self.entitlements.invalidate(chat_id)
+
+    async def _report(self, bot, job: BroadcastJob):
+        if not (self.formatter and job.status_chat_id and job.status_message_id):
+            return
+        try:
+            await bot.edit_message_text(
+                chat_id=job.status_chat_id,
+                message_id=job.status_message_id,
+                text=self.formatter(job),
+                parse_mode=ParseMode.HTML
+            )
+        except BadRequest:
+            pass
+        except Exception as e:
+            logger.debug(f"[BROADCAST] Status update error: {e}")
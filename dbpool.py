@@ -0,0 +1,242 @@
+# ==========================================
+# 🗄️ DB POOL - PERSISTENT SQLITE CONNECTIONS
+# ==========================================
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# Pragma dipasang sekali per koneksi saat pool dibuka
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=134217728",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+class SQLitePool:
+    """
+    Pool koneksi SQLite yang hidup selama bot jalan.
+    1 koneksi writer (diserialisasi pakai lock) + beberapa koneksi reader (WAL).
+    """
+
+    def __init__(self, db_name: str, readers: int = 4):
+        self.db_name = db_name
+        self.reader_count = max(1, readers)
+        self._writer = None
+        self._write_lock = asyncio.Lock()
+        self._readers = None
+        self._all_readers = []
+        self._open_lock = asyncio.Lock()
+        self.is_open = False
+
+    async def _connect(self, read_only: bool = False):
+        conn = await aiosqlite.connect(self.db_name)
+        for pragma in SQLITE_PRAGMAS:
+            await conn.execute(pragma)
+        if read_only:
+            await conn.execute("PRAGMA query_only=1")
+        return conn
+
+    async def open(self):
+        """Buka writer + reader. Aman dipanggil berkali-kali."""
+        async with self._open_lock:
+            if self.is_open:
+                return
+            self._writer = await self._connect()
+            await self._writer.commit()
+            self._readers = asyncio.Queue()
+            for _ in range(self.reader_count):
+                conn = await self._connect(read_only=True)
+                self._all_readers.append(conn)
+                self._readers.put_nowait(conn)
+            self.is_open = True
+        logger.info(f"[DBPOOL] Opened {self.db_name} (1 writer, {self.reader_count} readers, WAL)")
+
+    async def close(self):
+        """Tutup semua koneksi (dipanggil saat shutdown)"""
+        async with self._open_lock:
+            if not self.is_open:
+                return
+            self.is_open = False
+            async with self._write_lock:
+                try:
+                    await self._writer.commit()
+                    await self._writer.close()
+                except Exception as e:
+                    logger.error(f"[DBPOOL] Writer close error: {e}")
+                self._writer = None
+            for conn in self._all_readers:
+                try:
+                    await conn.close()
+                except Exception as e:
+                    logger.error(f"[DBPOOL] Reader close error: {e}")
+            self._all_readers = []
+            self._readers = None
+        logger.info("[DBPOOL] Closed")
+
+    @asynccontextmanager
+    async def writer(self):
+        """Akses eksklusif ke koneksi writer. Caller yang commit."""
+        if not self.is_open:
+            await self.open()
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except Exception:
+                await self._writer.rollback()
+                raise
+
+    @asynccontextmanager
+    async def reader(self):
+        """Pinjam satu koneksi reader dari pool"""
+        if not self.is_open:
+            await self.open()
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            if self._readers is not None:
+                self._readers.put_nowait(conn)
+
+    # ===== SHORTCUTS =====
+
+    async def execute(self, query: str, params=()) -> int:
+        """Execute + commit di writer. Return rowcount."""
+        async with self.writer() as db:
+            cursor = await db.execute(query, params)
+            await db.commit()
+            return cursor.rowcount
+
+    async def executemany(self, query: str, rows) -> None:
+        """Executemany + commit dalam satu transaksi"""
+        async with self.writer() as db:
+            await db.executemany(query, rows)
+            await db.commit()
+
+    async def fetch_one(self, query: str, params=()):
+        async with self.reader() as db:
+            async with db.execute(query, params) as cursor:
+                return await cursor.fetchone()
+
+    async def fetch_all(self, query: str, params=()):
+        async with self.reader() as db:
+            async with db.execute(query, params) as cursor:
+                return await cursor.fetchall()
+
+
+
+class WriteBehindQueue:
+    """
+    Buffer tulis async (write-behind) untuk log audit & spill session (INSERT / DELETE).
+    Row dikumpulkan di memori lalu di-flush URUT dalam 1 transaksi multi-row
+    tiap `flush_interval` detik atau saat sudah `max_batch` row.
+    """
+
+    def __init__(self, pool: SQLitePool, flush_interval: float = 0.5, max_batch: int = 200, max_queue: int = 20000):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self._pending = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self.flushed_rows = 0
+        self.flush_count = 0
+        self.dropped = 0
+        self.failed_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def push(self, query: str, params: tuple) -> bool:
+        """Antrikan 1 row (non-blocking). Return False kalau antrian penuh."""
+        if len(self._pending) >= self.max_queue:
+            self.dropped += 1
+            return False
+        self._pending.append((query, params))
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    def start(self):
+        """Jalankan flusher di background (panggil dari dalam event loop)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"[WRITEBEHIND] Started (interval={self.flush_interval}s, batch={self.max_batch})")
+
+    async def stop(self):
+        """Stop flusher lalu flush sisa antrian"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        logger.info(f"[WRITEBEHIND] Stopped ({self.flushed_rows} rows flushed total)")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Tulis semua row yang pending dalam satu transaksi"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+
+            # Query sama yang berurutan digabung 1 executemany; urutan antar query tetap
+            # (misal spill INSERT lalu DELETE key yang sama tidak boleh tertukar)
+            grouped = []
+            for query, params in batch:
+                if grouped and grouped[-1][0] == query:
+                    grouped[-1][1].append(params)
+                else:
+                    grouped.append((query, [params]))
+
+            started = time.perf_counter()
+            try:
+                async with self.pool.writer() as db:
+                    for query, rows in grouped:
+                        await db.executemany(query, rows)
+                    await db.commit()
+            except Exception as e:
+                self.failed_rows += len(batch)
+                logger.error(f"[WRITEBEHIND] Flush error ({len(batch)} rows lost): {e}")
+                return
+
+            elapsed = (time.perf_counter() - started) * 1000
+            self.flush_count += 1
+            self.flushed_rows += len(batch)
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self._total_flush_ms += elapsed
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": len(self._pending),
+            "flushed_rows": self.flushed_rows,
+            "flushes": self.flush_count,
+            "dropped": self.dropped,
+            "failed_rows": self.failed_rows,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.flush_count, 2) if self.flush_count else 0.0,
+        }
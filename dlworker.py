@@ -0,0 +1,244 @@
+# ==========================================
+# 📥 DOWNLOAD WORKER POOL - YT-DLP OFF THE EVENT LOOP
+# ==========================================
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadRejected(Exception):
+    """Job ditolak (limit per user / antrian penuh)"""
+
+
+class DownloadCancelled(Exception):
+    """Job dibatalkan user sebelum selesai"""
+
+
+class DownloadJob:
+    """State 1 job download. Field progress ditulis thread worker, dibaca event loop."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, user_id: int, query: str):
+        self.id = next(self._ids)
+        self.user_id = user_id
+        self.query = query
+        self.status = "queued"
+        self.position = 0
+        self.downloaded = 0
+        self.total = 0
+        self.speed = 0.0
+        self.eta = None
+        self.stage = "queued"
+        self.created_at = time.time()
+        self.cancel_event = threading.Event()
+
+    @property
+    def percent(self) -> float:
+        if not self.total:
+            return 0.0
+        return min(100.0, self.downloaded / self.total * 100)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class DownloadPool:
+    """
+    Pool worker terbatas untuk yt-dlp.
+    - yt-dlp jalan di thread pool sendiri (max_workers), event loop tidak pernah block
+    - antrian terbatas + posisi antrian
+    - limit job aktif per user
+    - cancel lewat progress hook
+    - progress dilaporkan ke callback async tiap `progress_interval` detik
+    """
+
+    def __init__(self, max_workers: int = 3, per_user: int = 1, max_queue: int = 50):
+        self.max_workers = max_workers
+        self.per_user = per_user
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ytdlp")
+        self._slots = asyncio.Semaphore(max_workers)
+        self._waiting = []
+        self._jobs = {}
+        self._user_active = {}
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    # ===== WORKER (THREAD) =====
+
+    def _download(self, job: DownloadJob, ydl_opts: dict, query: str):
+        import yt_dlp
+
+        def progress_hook(d):
+            if job.cancel_event.is_set():
+                raise yt_dlp.utils.DownloadCancelled("Cancelled by user")
+            if d.get("status") == "downloading":
+                job.stage = "downloading"
+                job.downloaded = d.get("downloaded_bytes") or 0
+                job.total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
+                job.speed = d.get("speed") or 0.0
+                job.eta = d.get("eta")
+            elif d.get("status") == "finished":
+                job.stage = "processing"
+
+        def postprocessor_hook(d):
+            if job.cancel_event.is_set():
+                raise yt_dlp.utils.DownloadCancelled("Cancelled by user")
+            if d.get("status") == "started":
+                job.stage = "processing"
+
+        opts = dict(ydl_opts)
+        opts["progress_hooks"] = list(opts.get("progress_hooks", [])) + [progress_hook]
+        opts["postprocessor_hooks"] = list(opts.get("postprocessor_hooks", [])) + [postprocessor_hook]
+
+        try:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                return ydl.extract_info(query, download=True)
+        except Exception:
+            # yt-dlp kadang membungkus exception dari hook; cek flag cancel-nya
+            if job.cancel_event.is_set():
+                raise DownloadCancelled()
+            raise
+
+    # ===== API (EVENT LOOP) =====
+
+    def _refresh_positions(self):
+        for idx, waiting_job in enumerate(self._waiting):
+            waiting_job.position = idx + 1
+
+    async def run(self, user_id: int, ydl_opts: dict, query: str, on_progress=None,
+                  progress_interval: float = 2.5, on_job=None):
+        """
+        Jalankan 1 download di worker pool dan tunggu hasilnya (info dict yt-dlp).
+        `on_job(job)` dipanggil sekali setelah job terdaftar (misal untuk tombol cancel).
+        `on_progress(job)` dipanggil berkala selama antri & download.
+        Raise DownloadRejected / DownloadCancelled / error yt-dlp.
+        """
+        if self._user_active.get(user_id, 0) >= self.per_user:
+            raise DownloadRejected("You already have a download in progress. Please wait until it finishes.")
+        if len(self._waiting) >= self.max_queue:
+            raise DownloadRejected("Download queue is full. Please try again in a moment.")
+
+        job = DownloadJob(user_id, query)
+        self._jobs[job.id] = job
+        self._user_active[user_id] = self._user_active.get(user_id, 0) + 1
+        self._waiting.append(job)
+        self._refresh_positions()
+
+        acquired = False
+        future = None
+        acquire_task = asyncio.ensure_future(self._slots.acquire())
+        try:
+            if on_job:
+                await on_job(job)
+
+            # Tunggu slot worker (sambil lapor posisi antrian)
+            while True:
+                done, _ = await asyncio.wait({acquire_task}, timeout=progress_interval)
+                if done:
+                    acquired = True
+                    break
+                if job.cancel_event.is_set():
+                    raise DownloadCancelled()
+                if on_progress:
+                    await self._safe_progress(on_progress, job)
+
+            self._waiting.remove(job)
+            self._refresh_positions()
+            if job.cancel_event.is_set():
+                raise DownloadCancelled()
+
+            job.status = "running"
+            job.stage = "starting"
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, self._download, job, ydl_opts, query)
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=progress_interval)
+                if done:
+                    break
+                if on_progress:
+                    await self._safe_progress(on_progress, job)
+
+            info = future.result()
+            job.status = "done"
+            self.completed += 1
+            return info
+
+        except DownloadCancelled:
+            job.status = "cancelled"
+            self.cancelled += 1
+            raise
+        except asyncio.CancelledError:
+            # Coroutine pemanggil dibatalkan -> hentikan juga thread-nya
+            job.cancel()
+            job.status = "cancelled"
+            self.cancelled += 1
+            raise
+        except Exception:
+            job.status = "failed"
+            self.failed += 1
+            raise
+        finally:
+            if job in self._waiting:
+                self._waiting.remove(job)
+                self._refresh_positions()
+            if not acquired:
+                if acquire_task.done() and not acquire_task.cancelled():
+                    acquired = True
+                else:
+                    acquire_task.cancel()
+            if future is not None and not future.done():
+                # Thread yt-dlp masih jalan (caller dibatalkan): slot & limit user
+                # baru dilepas setelah thread benar-benar berhenti
+                future.add_done_callback(lambda f: self._finish(job, acquired, f))
+            else:
+                self._finish(job, acquired)
+
+    def _finish(self, job: DownloadJob, acquired: bool, future=None):
+        if future is not None and not future.cancelled():
+            future.exception()  # cegah warning "exception was never retrieved"
+        if acquired:
+            self._slots.release()
+        self._jobs.pop(job.id, None)
+        left = self._user_active.get(job.user_id, 1) - 1
+        if left > 0:
+            self._user_active[job.user_id] = left
+        else:
+            self._user_active.pop(job.user_id, None)
+
+    async def _safe_progress(self, on_progress, job: DownloadJob):
+        try:
+            await on_progress(job)
+        except Exception as e:
+            logger.debug(f"[DLPOOL] Progress callback error: {e}")
+
+    def cancel(self, job_id: int, user_id: int = None) -> bool:
+        """Cancel job by id (opsional: hanya kalau milik user_id)"""
+        job = self._jobs.get(job_id)
+        if not job or (user_id is not None and job.user_id != user_id):
+            return False
+        job.cancel()
+        return True
+
+    def shutdown(self):
+        for job in self._jobs.values():
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "running": sum(1 for j in self._jobs.values() if j.status == "running"),
+            "queued": len(self._waiting),
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+        }
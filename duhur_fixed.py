@@ -26,13 +26,13 @@ import math
 import base64
 import hashlib
 import tempfile
-import zipfile
 from urllib.parse import unquote, urlparse
 import urllib.parse
 from concurrent.futures import ThreadPoolExecutor
 
-from tempmail import TempMailClient
-from tempmail.models import DomainType
+# Library berat (yt_dlp, spotipy, PyPDF2, PIL, gTTS, dll) di-load saat handler pertama kali butuh
+from lazyimport import import_report, lazy_import
+import_report.mark("stdlib")
 
 # --- 1. IMPORT RAHASIA DARI CONFIG.PY ---
 try:
@@ -59,35 +59,16 @@ try:
 except ImportError:
     print("❌ ERROR FATAL: File 'config.py' tidak ditemukan!")
     sys.exit()
+import_report.mark("config")
 
 # --- 2. LIBRARY TAMBAHAN ---
-import requests
+# (qrcode, spotipy, faker, gtts, deep_translator, tempmail, PyPDF2, PIL -> lazy_import di handler)
 import httpx
 import aiohttp
-import yt_dlp
-import qrcode
-import aiosqlite
 import sqlite3
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-from faker import Faker
-from gtts import gTTS
-from deep_translator import GoogleTranslator
-
-# --- 3. PDF & CRYPTO ENGINE ---
-from PyPDF2 import PdfReader, PdfWriter, PdfMerger
-from PIL import Image, ImageOps
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-
-# --- 4. LIBRARY SELENIUM ---
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-
-# --- 5. LIBRARY TELEGRAM ---
+import_report.mark("http libs")
+
+# --- 3. LIBRARY TELEGRAM ---
 from telegram import (
     Update,
     InlineKeyboardButton,
@@ -111,9 +92,27 @@ from telegram.ext import (
     filters,
 )
 from telegram.error import NetworkError, BadRequest, TimedOut
-
-# --- 6. ADGUARD SYSTEM ---
+import_report.mark("telegram")
+
+# --- 4. ADGUARD SYSTEM & DB POOL ---
+from dbpool import SQLitePool, WriteBehindQueue
+from httpclients import HttpClientRegistry
+from respcache import InflightRegistry, NoCache, ResponseCache
+from dlworker import DownloadPool, DownloadRejected, DownloadCancelled
+from pdfengine import MergeSession, PdfEngine, PdfJobRejected, parse_page_ranges
+from audiofx import AudioEffectsEngine
+from broadcast import BroadcastEngine
+from wordindex import LevelVocab, WordIndex
+from entitlements import EntitlementService
+from ledger import CreditLedger
+from ratelimit import TokenBucketLimiter
+from sessionstore import BoundedStore
+from urlcanon import UrlCanonicalizer
+from providers import ProviderRacer, ProviderUnavailable
+from mediaextract import GIMITA_EXTRACTORS, ExtractorRegistry, collect_urls, unwrap_response
+from mediaalbum import AlbumSender, dump_album, load_album
 from adguard import AdguardSystem, set_adguard_instance, require_start, require_start_callback, require_start_inline
+import_report.mark("engine modules")
 
 
 # ==========================================
@@ -138,19 +137,60 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Setup Spotify
-try:
-    sp_client = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-        client_id=SPOTIPY_CLIENT_ID,
-        client_secret=SPOTIPY_CLIENT_SECRET
-    ))
-    print("✅ Spotify API: Connected")
-except Exception as e:
-    print(f"⚠️ Spotify Error: {e}")
-    sp_client = None
+# Setup Spotify (client dibuat saat pertama dipakai)
+_sp_client = None
+
+def get_spotify_client():
+    """Spotify client lazy: spotipy baru di-load saat fitur musik pertama kali dipakai"""
+    global _sp_client
+    if _sp_client is None:
+        try:
+            spotipy = lazy_import("spotipy")
+            oauth2 = lazy_import("spotipy.oauth2")
+            _sp_client = spotipy.Spotify(auth_manager=oauth2.SpotifyClientCredentials(
+                client_id=SPOTIPY_CLIENT_ID,
+                client_secret=SPOTIPY_CLIENT_SECRET
+            ))
+            logger.info("[SPOTIFY] Client ready")
+        except Exception as e:
+            logger.error(f"[SPOTIFY] Init error: {e}")
+    return _sp_client
+
+# 🗄️ DB POOL: 1 writer + reader pool (dibuka di init_db, ditutup saat shutdown)
+db_pool = SQLitePool(DB_NAME, readers=4)
+
+# 📝 AUDIT QUEUE: log user_actions & cloudflare_stats ditulis batch di background
+audit_queue = WriteBehindQueue(db_pool, flush_interval=0.5, max_batch=200)
+
+# 🌐 HTTP: 1 registry client untuk semua request keluar (keep-alive + HTTP/2)
+http_clients = HttpClientRegistry(http2=True)
+
+# ⚡ RESPONSE CACHE: cache fetch_json per endpoint (L1 memory, L2 SQLite)
+response_cache = ResponseCache(max_entries=2048, pool=db_pool, write_queue=audit_queue)
+
+# 🔗 URL CANON: link user -> content key per platform (key media_cache), short link di-resolve sekali
+url_canon = UrlCanonicalizer(http_clients, pool=db_pool, write_queue=audit_queue)
+
+# 🛫 MEDIA FLIGHT: /dl & sp_dl yang sama bersamaan -> 1 download, semua dapat file_id yang sama.
+# Butuh handler dl/sp_dl terdaftar block=False (lihat main): kalau update diproses satu-satu,
+# request kedua baru masuk setelah leader selesai dan tidak pernah menunggu di sini.
+media_flight = InflightRegistry()
+MEDIA_FLIGHT_TIMEOUT = 180
+
+# 🏁 IG RACER: scraper Instagram di-race (health score + hedge + circuit breaker)
+ig_racer = ProviderRacer("instagram", hedge_delay=2.5, attempt_timeout=20.0)
+
+# 🖼️ ALBUM: hasil multi-item dikirim sebagai send_media_group (HEAD probe per item)
+album_sender = AlbumSender(http_clients)
 
 # 🛡️ ADGUARD: Initialize System
-adguard = AdguardSystem(DB_NAME)
+adguard = AdguardSystem(DB_NAME, pool=db_pool)
+
+# 👑 ENTITLEMENTS: plan/expiry/subscriber per user di memory (invalidate saat berubah)
+entitlements = EntitlementService(db_pool, owner_id=OWNER_ID, ttl=300)
+
+# 💳 CREDIT LEDGER: potong credits atomik, reset harian user free via job 00:00 WIB
+credit_ledger = CreditLedger(db_pool, free_daily=50)
 
 # ==========================================
 # ⚙️ GLOBAL CONFIGURATION (EXECUTOR & UTILITIES)
@@ -159,28 +199,49 @@ adguard = AdguardSystem(DB_NAME)
 # Global executor untuk blocking operations
 executor = ThreadPoolExecutor(max_workers=5)
 
+# 📥 yt-dlp worker pool (max 3 download paralel, 1 job aktif per user)
+download_pool = DownloadPool(max_workers=3, per_user=1, max_queue=50)
+
+# 📄 PDF worker: merge/split/extract di proses terpisah (2-4 paralel sesuai CPU, limit 120s & 768MB per job)
+pdf_engine = PdfEngine(max_workers=max(2, min(4, os.cpu_count() or 2)), max_queue=20, timeout=120, memory_mb=768)
+
+# 🎧 Audio effects: source mp3 di-cache lokal, ffmpeg async maks 2 paralel
+audio_fx = AudioEffectsEngine(cache_dir="audio_cache", max_sources=50, max_renders=2)
+
 
 # ==========================================
 # 🚀 NETWORK & DB ENGINE
 # ==========================================
 async def fetch_json(url, method="GET", payload=None, headers=None):
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+    # ⚡ GET ke endpoint di CACHE_TTL_RULES lewat cache (LRU + SQLite + single-flight)
+    if method == "GET":
+        ttl = response_cache.ttl_for(url)
+        if ttl:
+            return await response_cache.get_or_fetch(
+                response_cache.key_for(url), ttl,
+                lambda: _fetch_json_direct(url, method, payload, headers, cached=True)
+            )
+    return await _fetch_json_direct(url, method, payload, headers)
+
+async def _fetch_json_direct(url, method="GET", payload=None, headers=None, cached=False):
+    # Timeout ikut HOST_TIMEOUTS di httpclients.py (per host)
+    async with http_clients.client(follow_redirects=True) as client:
         try:
             if method == "GET":
                 resp = await client.get(url, headers=headers)
             else:
                 resp = await client.post(url, json=payload, headers=headers)
-            return resp.json()
+            data = resp.json()
         except:
             return None
+        # Body error (401/404/429...) tetap dikembalikan ke caller, tapi jangan masuk cache
+        return NoCache(data) if cached and not resp.is_success else data
 
 # ✅ DB HELPERS (HARUS ADA DULU)
 async def db_execute(query, params=()):
     """Execute query tanpa return"""
     try:
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(query, params)
-            await db.commit()
+        await db_pool.execute(query, params)
         return True
     except Exception as e:
         logger.error(f"[DB_EXECUTE] Error: {str(e)}")
@@ -189,9 +250,7 @@ async def db_execute(query, params=()):
 async def db_fetch_one(query, params=()):
     """Fetch 1 row"""
     try:
-        async with aiosqlite.connect(DB_NAME) as db:
-            cursor = await db.execute(query, params)
-            return await cursor.fetchone()
+        return await db_pool.fetch_one(query, params)
     except Exception as e:
         logger.error(f"[DB_FETCH_ONE] Error: {str(e)}")
         return None
@@ -199,9 +258,7 @@ async def db_fetch_one(query, params=()):
 async def db_fetch_all(query, params=()):
     """Fetch semua rows"""
     try:
-        async with aiosqlite.connect(DB_NAME) as db:
-            cursor = await db.execute(query, params)
-            return await cursor.fetchall()
+        return await db_pool.fetch_all(query, params)
     except Exception as e:
         logger.error(f"[DB_FETCH_ALL] Error: {str(e)}")
         return []
@@ -212,9 +269,7 @@ async def db_insert(table, data):
         columns = ", ".join(data.keys())
         placeholders = ", ".join(["?" for _ in data])
         query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(query, tuple(data.values()))
-            await db.commit()
+        await db_pool.execute(query, tuple(data.values()))
         return True
     except Exception as e:
         logger.error(f"[DB_INSERT] Error: {str(e)}")
@@ -227,9 +282,7 @@ async def db_update(table, data, where):
         where_clause = " AND ".join([f"{k}=?" for k in where.keys()])
         query = f"UPDATE {table} SET {set_clause} WHERE {where_clause}"
         params = tuple(data.values()) + tuple(where.values())
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(query, params)
-            await db.commit()
+        await db_pool.execute(query, params)
         return True
     except Exception as e:
         logger.error(f"[DB_UPDATE] Error: {str(e)}")
@@ -242,12 +295,10 @@ async def db_update(table, data, where):
 async def save_media_cache(url: str, file_id: str, media_type: str) -> bool:
     """Simpan media ke cache untuk reuse"""
     try:
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(
-                "INSERT OR REPLACE INTO media_cache (url, file_id, media_type, timestamp) VALUES (?, ?, ?, ?)",
-                (url, file_id, media_type, time.time())
-            )
-            await db.commit()
+        await db_pool.execute(
+            "INSERT OR REPLACE INTO media_cache (url, file_id, media_type, timestamp) VALUES (?, ?, ?, ?)",
+            (url, file_id, media_type, time.time())
+        )
         return True
     except Exception as e:
         logger.error(f"[CACHE] Save error: {str(e)}")
@@ -275,12 +326,10 @@ async def clear_old_media_cache(days: int = 365) -> bool:
     """Hapus cache yang sudah lama"""
     try:
         old_timestamp = time.time() - (days * 24 * 3600)
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(
-                "DELETE FROM media_cache WHERE timestamp < ?",
-                (old_timestamp,)
-            )
-            await db.commit()
+        await db_pool.execute(
+            "DELETE FROM media_cache WHERE timestamp < ?",
+            (old_timestamp,)
+        )
         return True
     except Exception as e:
         logger.error(f"[CACHE] Clear error: {str(e)}")
@@ -301,19 +350,20 @@ async def get_cached_media(track_id: str):
 async def save_cached_media(track_id: str, file_id: str):
     """Simpan media ke cache berdasarkan track_id (untuk Spotify)"""
     try:
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(
-                "INSERT OR REPLACE INTO media_cache (url, file_id, media_type, timestamp) VALUES (?, ?, ?, ?)",
-                (f"spotify:{track_id}", file_id, "audio", time.time())
-            )
-            await db.commit()
+        await db_pool.execute(
+            "INSERT OR REPLACE INTO media_cache (url, file_id, media_type, timestamp) VALUES (?, ?, ?, ?)",
+            (f"spotify:{track_id}", file_id, "audio", time.time())
+        )
         return True
     except Exception as e:
         logger.error(f"[CACHE] Save cached media error: {str(e)}")
         return False
 
 async def init_db():
-    async with aiosqlite.connect(DB_NAME) as db:
+    # 🗄️ DB POOL: buka koneksi persisten (WAL + pragma di-set sekali di sini)
+    await db_pool.open()
+
+    async with db_pool.writer() as db:
         # Tabel Subscribers
         await db.execute(
             "CREATE TABLE IF NOT EXISTS subscribers (user_id INTEGER PRIMARY KEY)"
@@ -502,6 +552,18 @@ async def init_db():
         
         await db.commit()
     
+    # ⚡ RESPONSE CACHE: tabel L2 http_cache
+    await response_cache.init_table()
+
+    # 🔗 URL CANON: tabel alias short link
+    await url_canon.init_table()
+
+    # 🧠 AI HISTORY: tabel spill percakapan
+    await ai_conversation_history.init_table()
+
+    # 📢 BROADCAST: tabel checkpoint job
+    await broadcast_engine.init_table()
+
     # 🛡️ ADGUARD: Initialize table
     await adguard.init_table()
     print("✅ Database Initialized")
@@ -524,46 +586,30 @@ CREDIT_COSTS = {
     "default": 2
 }
 
+async def expire_premium_user(user_id: int):
+    """Hapus premium yang sudah expired + invalidate cache entitlement"""
+    await db_execute("DELETE FROM premium_users WHERE user_id = ?", (user_id,))
+    entitlements.invalidate(user_id)
+
 async def get_user_credits(user_id: int) -> tuple:
     """Get user credits and premium status"""
     try:
-        # Check premium first
-        premium = await db_fetch_one(
-            "SELECT credits, expires_at, plan FROM premium_users WHERE user_id = ?",
-            (user_id,)
-        )
-        if premium:
-            expires_at = premium[1]
-            if expires_at:
-                exp_dt = datetime.datetime.fromisoformat(expires_at)
-                if exp_dt > datetime.datetime.now():
-                    return (premium[0], True, premium[2], expires_at)
-                else:
-                    # Expired - remove premium
-                    await db_execute("DELETE FROM premium_users WHERE user_id = ?", (user_id,))
-        
-        # Check regular user credits
-        user_credit = await db_fetch_one(
-            "SELECT credits, last_reset FROM user_credits WHERE user_id = ?",
-            (user_id,)
-        )
-        if user_credit:
-            last_reset = datetime.datetime.fromisoformat(user_credit[1]) if user_credit[1] else datetime.datetime.now()
-            # Reset daily if 24h passed
-            if (datetime.datetime.now() - last_reset).days >= 1:
-                await db_execute(
-                    "UPDATE user_credits SET credits = 50, last_reset = ? WHERE user_id = ?",
-                    (datetime.datetime.now().isoformat(), user_id)
-                )
-                return (50, False, "free", None)
-            return (user_credit[0], False, "free", None)
-        else:
-            # Create new user credits
-            await db_execute(
-                "INSERT INTO user_credits (user_id, credits, last_reset) VALUES (?, 50, ?)",
-                (user_id, datetime.datetime.now().isoformat())
+        # Check premium first (status dari cache entitlement, credits dari DB)
+        ent = await entitlements.get(user_id)
+        if ent.is_premium and ent.expires_at:
+            premium = await db_fetch_one(
+                "SELECT credits FROM premium_users WHERE user_id = ?",
+                (user_id,)
             )
-            return (50, False, "free", None)
+            if premium:
+                return (premium[0], True, ent.plan, ent.expires_at)
+        elif ent.premium_expired:
+            # Expired - remove premium
+            await expire_premium_user(user_id)
+        
+        # Regular user credits (reset harian lewat job daily_credit_reset, bukan di sini)
+        credits = await credit_ledger.get_free(user_id)
+        return (credits, False, "free", None)
     except Exception as e:
         logger.error(f"[CREDITS] Error: {e}")
         return (0, False, "free", None)
@@ -572,38 +618,48 @@ async def deduct_credits(user_id: int, command: str) -> tuple:
     """Deduct credits for command usage. Returns (success, remaining, cost)"""
     cost = CREDIT_COSTS.get(command, CREDIT_COSTS["default"])
     
+    # Owner always unlimited
+    if user_id == OWNER_ID:
+        return (True, 999999, 0)
+    
     try:
-        credits, is_premium, plan, _ = await get_user_credits(user_id)
-        
-        # Owner always unlimited
-        if user_id == OWNER_ID:
-            return (True, 999999, 0)
-        
-        # Premium users with unlimited plan
-        if is_premium and plan == "unlimited":
-            return (True, credits, 0)
-        
-        # Check if enough credits
-        if credits < cost:
-            return (False, credits, cost)
-        
-        # Deduct from appropriate table
-        if is_premium:
-            await db_execute(
-                "UPDATE premium_users SET credits = credits - ? WHERE user_id = ?",
-                (cost, user_id)
-            )
-        else:
-            await db_execute(
-                "UPDATE user_credits SET credits = credits - ? WHERE user_id = ?",
-                (cost, user_id)
-            )
+        ent = await entitlements.get(user_id)
+        if ent.is_premium and ent.expires_at:
+            # Premium users with unlimited plan
+            if ent.plan == "unlimited":
+                credits, _, _, _ = await get_user_credits(user_id)
+                return (True, credits, 0)
+            
+            # Cek saldo + potong dalam 1 UPDATE bersyarat
+            success, remaining = await credit_ledger.deduct(user_id, cost, premium=True)
+            if remaining is not None:
+                return (success, remaining, cost)
+        elif ent.premium_expired:
+            await expire_premium_user(user_id)
         
-        return (True, credits - cost, cost)
+        success, remaining = await credit_ledger.deduct(user_id, cost, premium=False)
+        return (success, remaining or 0, cost)
     except Exception as e:
         logger.error(f"[DEDUCT] Error: {e}")
         return (True, 0, 0)  # Allow on error
 
+async def daily_credit_reset(context: ContextTypes.DEFAULT_TYPE):
+    """Job 00:00 WIB: reset saldo semua user free sekaligus"""
+    try:
+        await credit_ledger.reset_daily()
+    except Exception as e:
+        logger.error(f"[LEDGER] Daily reset error: {e}")
+
+async def catch_up_credit_reset():
+    """Saat boot: reset user free yang terlewat reset 00:00 WIB (bot mati saat tengah malam)"""
+    midnight_wib = datetime.datetime.now(TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+    # last_reset disimpan sebagai waktu lokal server (naive isoformat)
+    cutoff = midnight_wib.astimezone().replace(tzinfo=None).isoformat()
+    try:
+        await credit_ledger.reset_daily(before=cutoff)
+    except Exception as e:
+        logger.error(f"[LEDGER] Catch-up reset error: {e}")
+
 async def generate_redeem_code(plan: str = "premium", credits: int = 500, duration_days: int = 30) -> str:
     """Generate a new redeem code (Owner only)"""
     import secrets
@@ -646,6 +702,8 @@ async def redeem_code(user_id: int, code: str) -> tuple:
                 (user_id, plan, credits, expires_at)
             )
         
+        entitlements.invalidate(user_id)
+        
         # Mark code as used
         await db_execute(
             "UPDATE redeem_codes SET used_by = ?, used_at = ? WHERE code = ?",
@@ -750,12 +808,11 @@ async def get_total_revenue_all_time():
 async def add_subscriber(user_id):
     """Add user ke subscribers table"""
     try:
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(
-                "INSERT OR IGNORE INTO subscribers (user_id) VALUES (?)", 
-                (user_id,)
-            )
-            await db.commit()
+        await db_pool.execute(
+            "INSERT OR IGNORE INTO subscribers (user_id) VALUES (?)", 
+            (user_id,)
+        )
+        entitlements.invalidate(user_id)
         return True
     except:
         return False
@@ -763,12 +820,11 @@ async def add_subscriber(user_id):
 async def remove_subscriber(user_id):
     """Remove user dari subscribers table"""
     try:
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(
-                "DELETE FROM subscribers WHERE user_id=?", 
-                (user_id,)
-            )
-            await db.commit()
+        await db_pool.execute(
+            "DELETE FROM subscribers WHERE user_id=?", 
+            (user_id,)
+        )
+        entitlements.invalidate(user_id)
         return True
     except:
         return False
@@ -838,14 +894,12 @@ async def get_price_for_plan(plan: str) -> str:
 # ==========================================
 
 async def log_user_action(user_id: int, action: str, details: str = "") -> bool:
-    """Log user action"""
+    """Log user action (write-behind, tidak menunggu DB)"""
     try:
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(
-                "INSERT INTO user_actions (user_id, action, details, timestamp) VALUES (?, ?, ?, ?)",
-                (user_id, action, details, datetime.datetime.now().isoformat())
-            )
-            await db.commit()
+        audit_queue.push(
+            "INSERT INTO user_actions (user_id, action, details, timestamp) VALUES (?, ?, ?, ?)",
+            (user_id, action, details, datetime.datetime.now().isoformat())
+        )
         logger.info(f"[ACTION] User {user_id}: {action}")
         return True
     except Exception as e:
@@ -954,33 +1008,6 @@ def cc_gen(cc, mes='x', ano='x', cvv='x', amount=10):
 # 🛠️ SESSION & RATE LIMIT HELPERS
 # ==========================================
 
-user_sessions = {}
-user_cooldowns = {}
-
-def rate_limit(seconds=2):
-    """Decorator untuk rate limit"""
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            user_id = update.effective_user.id
-            current_time = time.time()
-            
-            if user_id in user_cooldowns:
-                if current_time - user_cooldowns[user_id] < seconds:
-                    try:
-                        await update.message.reply_text(
-                            f"⏱️ Rate limited. Wait {seconds}s",
-                            parse_mode=ParseMode.HTML
-                        )
-                    except:
-                        pass
-                    return
-            
-            user_cooldowns[user_id] = current_time
-            return await func(update, context)
-        return wrapper
-    return decorator
-
 async def create_session(user_id: int) -> str:
     """Create user session"""
     session_id = str(uuid.uuid4())
@@ -1151,11 +1178,7 @@ def escape_md(text):
 async def is_registered(user_id: int) -> bool:
     """Check apakah user sudah terdaftar di subscribers"""
     try:
-        result = await db_fetch_one(
-            "SELECT user_id FROM subscribers WHERE user_id=?",
-            (user_id,)
-        )
-        return bool(result)
+        return (await entitlements.get(user_id)).is_subscriber
     except Exception as e:
         logger.error(f"[REGISTER CHECK] Error: {str(e)}")
         return False
@@ -1164,31 +1187,58 @@ async def is_registered(user_id: int) -> bool:
 # ==========================================
 # 🛡️ RATE LIMITING & SESSION MANAGEMENT
 # ==========================================
-user_cooldowns = {}
-user_sessions = {}
+# Session user: idle 6 jam dibuang, maks 50k user (LRU)
+user_sessions = BoundedStore("sessions", ttl=6 * 3600, max_entries=50000)
+
+# Class rate limit per command (bucket terpisah per class); yang tidak ada -> "general"
+RATE_LIMIT_CLASSES = {
+    "ai": "ai", "gpt5": "ai", "code": "ai", "think": "ai",
+    "scan": "scan", "research": "scan",
+    "dl": "dl", "tiktok": "dl", "ig": "dl", "yt": "dl", "fb": "dl", "tw": "dl",
+    "spotify": "dl", "song": "dl",
+}
+
+# 🚦 Token bucket per (user, class): 30 unit, isi 1 unit/detik; budget paralel global untuk class berat
+rate_limiter = TokenBucketLimiter(
+    capacity=30, refill_per_sec=1.0, idle_ttl=600, max_buckets=100000,
+    concurrency={"dl": 10, "ai": 8, "scan": 3}
+)
+
+def rate_limit(command: str = "default"):
+    """Decorator rate limit: cost dari CREDIT_COSTS, bucket per (user, class command)"""
+    cls = RATE_LIMIT_CLASSES.get(command, "general")
+    cost = CREDIT_COSTS.get(command, CREDIT_COSTS["default"])
 
-def rate_limit(seconds=2):
-    """Decorator untuk rate limit command"""
     def decorator(func):
         @wraps(func)
         async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
             user_id = update.effective_user.id
-            current_time = time.time()
             
-            if user_id in user_cooldowns:
-                if current_time - user_cooldowns[user_id] < seconds:
+            if user_id != OWNER_ID:
+                allowed, retry_after = rate_limiter.consume(user_id, cls, cost)
+                if not allowed:
                     try:
-                        await update.message.reply_text(
+                        await update.effective_message.reply_text(
                             f"⏱️ <b>RATE LIMITED</b>\n\n"
-                            f"Please wait {seconds} seconds before using this command again.",
+                            f"Please wait {max(1, math.ceil(retry_after))} seconds before using this command again.",
                             parse_mode=ParseMode.HTML
                         )
                     except:
                         pass
                     return
             
-            user_cooldowns[user_id] = current_time
-            return await func(update, context)
+            async with rate_limiter.budget(cls) as has_slot:
+                if not has_slot:
+                    try:
+                        await update.effective_message.reply_text(
+                            "🚦 <b>SERVER BUSY</b>\n\n"
+                            "Too many heavy requests are running right now. Please try again in a moment.",
+                            parse_mode=ParseMode.HTML
+                        )
+                    except:
+                        pass
+                    return
+                return await func(update, context)
         return wrapper
     return decorator
 
@@ -1210,23 +1260,23 @@ async def get_session(user_id: int):
 
 async def update_session_data(user_id: int, key: str, value):
     """Update session data"""
-    if user_id in user_sessions:
-        user_sessions[user_id]["data"][key] = value
-        user_sessions[user_id]["last_action"] = datetime.datetime.now()
+    session = user_sessions.get(user_id)
+    if session is not None:
+        session["data"][key] = value
+        session["last_action"] = datetime.datetime.now()
+        user_sessions.set(user_id, session)  # hitung ulang ukuran entry
 
 # ==========================================
 # 📊 ANALYTICS & LOGGING
 # ==========================================
 
 async def log_user_action(user_id: int, action: str, details: str = "") -> bool:
-    """Log setiap aksi user untuk analytics"""
-    try:
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute("""
-                INSERT INTO user_actions (user_id, action, details, timestamp)
-                VALUES (?, ?, ?, ?)
-            """, (user_id, action, details, datetime.datetime.now().isoformat()))
-            await db.commit()
+    """Log setiap aksi user untuk analytics (write-behind, tidak menunggu DB)"""
+    try:
+        audit_queue.push(
+            "INSERT INTO user_actions (user_id, action, details, timestamp) VALUES (?, ?, ?, ?)",
+            (user_id, action, details, datetime.datetime.now().isoformat())
+        )
         logger.info(f"[ACTION] User {user_id}: {action} - {details}")
         return True
     except Exception as e:
@@ -1309,7 +1359,7 @@ def require_owner(func):
 # 👋 START COMMAND (UPGRADED)
 # ==========================================
 
-@rate_limit(seconds=2)
+@rate_limit("start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start command dengan logging & session creation"""
     user = update.effective_user
@@ -1398,7 +1448,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ==========================================
 
 @require_start
-@rate_limit(seconds=2)
+@rate_limit("help")
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Help command dengan organized inline buttons"""
     if not await premium_lock_handler(update, context): return
@@ -1519,7 +1569,7 @@ async def locked_register_handler(update: Update, context: ContextTypes.DEFAULT_
 # ==========================================
 
 @require_owner
-@rate_limit(seconds=5)
+@rate_limit("stats")
 async def admin_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Admin dashboard untuk owner"""
     user_id = update.effective_user.id
@@ -1613,7 +1663,7 @@ async def safe_edit_message(msg, text: str, kb: list):
         )
 
 @require_start
-@rate_limit(seconds=2)
+@rate_limit("cmd")
 async def cmd_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Main menu command dengan dynamic content"""
     if not await premium_lock_handler(update, context): return
@@ -1765,11 +1815,9 @@ async def premium_lock_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     if user_id == OWNER_ID:
         return True
         
-    # 2. Check premium status from DB
-    async with aiosqlite.connect(DB_NAME) as db:
-        async with db.execute("SELECT user_id FROM premium_users WHERE user_id = ?", (user_id,)) as cursor:
-            if await cursor.fetchone():
-                return True
+    # 2. Check premium status (cache entitlement, tanpa query DB kalau hit)
+    if (await entitlements.get(user_id)).has_premium_row:
+        return True
 
     # 3. Exclude main commands from text-lock (allow menu access)
     if update.message and update.message.text:
@@ -1957,6 +2005,10 @@ GIMITA_ENDPOINTS = {
     "xnxx": "https://api.gimita.id/api/downloader/xnxx",
 }
 
+# Field response per platform: mediaextract.GIMITA_EXTRACTORS (fixture test di tests/).
+# Platform tanpa spec / media utama tidak ketemu -> fallback collect_urls (walk generik).
+gimita_extractors = ExtractorRegistry(GIMITA_EXTRACTORS)
+
 # ==========================================
 # 📸 INSTAGRAM SCRAPER (NO COOKIES) - FULL SUPPORT
 # Post, Video, Reels, Story, Highlights
@@ -1986,9 +2038,102 @@ def _detect_ig_content_type(url: str) -> str:
     else:
         return "post"
 
+IG_FALLBACK_APIS = [
+    "https://www.saveig.app/api/ajaxSearch",
+    "https://igdownloader.app/api/ajaxSearch",
+]
+
+def _ig_parse_scraper_json(data) -> dict | None:
+    """Parse response JSON scraper API (format beda-beda per provider)"""
+    if not isinstance(data, dict):
+        return None
+    if not (data.get("status") == True or data.get("success") == True or data.get("statusCode") == 200):
+        return None
+
+    media_items = []
+    username = data.get("author", {}).get("username", "") or data.get("username", "") or data.get("user", "")
+    caption = data.get("caption", "") or data.get("title", "") or data.get("desc", "")
+
+    # Check various data structures
+    items = data.get("result", []) or data.get("data", []) or data.get("medias", []) or data.get("media", [])
+
+    if isinstance(items, list):
+        for item in items:
+            if isinstance(item, dict):
+                media_url = item.get("url") or item.get("download") or item.get("downloadUrl") or item.get("video") or item.get("image")
+                media_type = item.get("type", "").lower()
+
+                if media_url:
+                    if not media_type:
+                        if any(ext in media_url.lower() for ext in [".mp4", ".mov", ".webm"]):
+                            media_type = "video"
+                        else:
+                            media_type = "image"
+
+                    media_items.append({
+                        "url": media_url,
+                        "type": media_type,
+                        "thumbnail": item.get("thumbnail", "")
+                    })
+            elif isinstance(item, str) and item.startswith("http"):
+                if any(ext in item.lower() for ext in [".mp4", ".mov"]):
+                    media_items.append({"url": item, "type": "video"})
+                else:
+                    media_items.append({"url": item, "type": "image"})
+
+    # Single item format
+    elif isinstance(items, str) and items.startswith("http"):
+        media_items.append({"url": items, "type": "video" if ".mp4" in items else "image"})
+
+    # Direct video/image URLs in response
+    if not media_items:
+        video_url = data.get("video") or data.get("videoUrl") or data.get("video_url")
+        image_url = data.get("image") or data.get("imageUrl") or data.get("image_url") or data.get("thumbnail")
+
+        if video_url:
+            media_items.append({"url": video_url, "type": "video"})
+        if image_url and not video_url:
+            media_items.append({"url": image_url, "type": "image"})
+
+    if not media_items:
+        return None
+    return {"data": media_items, "username": username, "caption": caption}
+
+def _ig_parse_ajax_html(data) -> dict | None:
+    """Parse response ajaxSearch (saveig/igdownloader): HTML berisi link download"""
+    if not isinstance(data, dict) or data.get("status") != "ok":
+        return None
+    html_content = data.get("data", "")
+
+    video_urls = re.findall(r'href="([^"]+\.mp4[^"]*)"', html_content)
+    image_urls = re.findall(r'href="([^"]+\.jpg[^"]*)"', html_content)
+    # Also look for download buttons
+    download_urls = re.findall(r'download="[^"]*"\s+href="([^"]+)"', html_content)
+
+    media_items = []
+    for v_url in video_urls[:5]:
+        if v_url.startswith("http"):
+            media_items.append({"url": v_url, "type": "video"})
+
+    if not media_items:
+        for i_url in image_urls[:10]:
+            if i_url.startswith("http"):
+                media_items.append({"url": i_url, "type": "image"})
+
+    seen = {m["url"] for m in media_items}
+    for d_url in download_urls[:5]:
+        if d_url.startswith("http") and d_url not in seen:
+            seen.add(d_url)
+            m_type = "video" if ".mp4" in d_url.lower() else "image"
+            media_items.append({"url": d_url, "type": m_type})
+
+    return {"data": media_items, "username": "", "caption": ""} if media_items else None
+
 async def instagram_scrape(url: str) -> dict:
     """
-    Instagram scraper without cookies - supports all content types
+    Instagram scraper without cookies - supports all content types.
+    Semua provider (scraper API + ajaxSearch) di-race lewat ig_racer:
+    provider tercepat/tersehat duluan, cadangan di-hedge, circuit open dilewati.
     Returns: {"success": bool, "data": list, "type": str, "error": str}
     """
     headers = {
@@ -2001,133 +2146,37 @@ async def instagram_scrape(url: str) -> dict:
     content_type = _detect_ig_content_type(url)
     result = {"success": False, "data": [], "type": content_type, "error": None, "username": "", "caption": ""}
     
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, headers=headers) as client:
-        # Try multiple scraper APIs
-        for api_url in IG_SCRAPER_APIS:
-            try:
-                params = {"url": url}
-                r = await client.get(api_url, params=params)
-                
-                if r.status_code == 200:
-                    data = r.json()
-                    
-                    # Parse different API response formats
-                    media_items = []
-                    
-                    # Format 1: data.result array
-                    if isinstance(data, dict):
-                        if data.get("status") == True or data.get("success") == True or data.get("statusCode") == 200:
-                            # Extract username/caption
-                            result["username"] = data.get("author", {}).get("username", "") or data.get("username", "") or data.get("user", "")
-                            result["caption"] = data.get("caption", "") or data.get("title", "") or data.get("desc", "")
-                            
-                            # Check various data structures
-                            items = data.get("result", []) or data.get("data", []) or data.get("medias", []) or data.get("media", [])
-                            
-                            if isinstance(items, list):
-                                for item in items:
-                                    if isinstance(item, dict):
-                                        media_url = item.get("url") or item.get("download") or item.get("downloadUrl") or item.get("video") or item.get("image")
-                                        media_type = item.get("type", "").lower()
-                                        
-                                        if media_url:
-                                            if not media_type:
-                                                if any(ext in media_url.lower() for ext in [".mp4", ".mov", ".webm"]):
-                                                    media_type = "video"
-                                                else:
-                                                    media_type = "image"
-                                            
-                                            media_items.append({
-                                                "url": media_url,
-                                                "type": media_type,
-                                                "thumbnail": item.get("thumbnail", "")
-                                            })
-                                    elif isinstance(item, str) and item.startswith("http"):
-                                        if any(ext in item.lower() for ext in [".mp4", ".mov"]):
-                                            media_items.append({"url": item, "type": "video"})
-                                        else:
-                                            media_items.append({"url": item, "type": "image"})
-                            
-                            # Single item format
-                            elif isinstance(items, str) and items.startswith("http"):
-                                media_items.append({"url": items, "type": "video" if ".mp4" in items else "image"})
-                            
-                            # Direct video/image URLs in response
-                            if not media_items:
-                                video_url = data.get("video") or data.get("videoUrl") or data.get("video_url")
-                                image_url = data.get("image") or data.get("imageUrl") or data.get("image_url") or data.get("thumbnail")
-                                
-                                if video_url:
-                                    media_items.append({"url": video_url, "type": "video"})
-                                if image_url and not video_url:
-                                    media_items.append({"url": image_url, "type": "image"})
-                    
-                    if media_items:
-                        result["success"] = True
-                        result["data"] = media_items
-                        return result
-                        
-            except Exception as e:
-                logger.debug(f"[IG Scraper] API {api_url} failed: {e}")
-                continue
-        
-        # Fallback: Try alternative scraping endpoints
-        fallback_apis = [
-            f"https://www.saveig.app/api/ajaxSearch",
-            f"https://igdownloader.app/api/ajaxSearch",
-        ]
-        
-        for fb_api in fallback_apis:
+    async with http_clients.client(timeout=30.0, follow_redirects=True, headers=headers) as client:
+        async def fetch_json(request):
+            # Error transport / 5xx = provider down (circuit breaker); 4xx / bukan JSON = tidak ada hasil
             try:
-                form_data = {"q": url, "t": "media", "lang": "en"}
-                r = await client.post(fb_api, data=form_data)
-                
-                if r.status_code == 200:
-                    data = r.json()
-                    if data.get("status") == "ok":
-                        # Parse HTML response for download links
-                        html_content = data.get("data", "")
-                        
-                        # Extract URLs using regex
-                        import re
-                        video_urls = re.findall(r'href="([^"]+\.mp4[^"]*)"', html_content)
-                        image_urls = re.findall(r'href="([^"]+\.jpg[^"]*)"', html_content)
-                        
-                        # Also look for download buttons
-                        download_urls = re.findall(r'download="[^"]*"\s+href="([^"]+)"', html_content)
-                        
-                        media_items = []
-                        for v_url in video_urls[:5]:
-                            if v_url.startswith("http"):
-                                media_items.append({"url": v_url, "type": "video"})
-                        
-                        if not media_items:
-                            for i_url in image_urls[:10]:
-                                if i_url.startswith("http"):
-                                    media_items.append({"url": i_url, "type": "image"})
-                        
-                        for d_url in download_urls[:5]:
-                            if d_url.startswith("http") and d_url not in [m["url"] for m in media_items]:
-                                m_type = "video" if ".mp4" in d_url.lower() else "image"
-                                media_items.append({"url": d_url, "type": m_type})
-                        
-                        if media_items:
-                            result["success"] = True
-                            result["data"] = media_items
-                            return result
-                            
-            except Exception as e:
-                logger.debug(f"[IG Fallback] {fb_api} failed: {e}")
-                continue
-        
-        # Final fallback: rapidapi instagram scrapers
-        rapid_apis = [
-            ("https://instagram-scraper-api2.p.rapidapi.com/v1/post_info", "instagram-scraper-api2.p.rapidapi.com"),
-        ]
-        
-        result["error"] = "Unable to fetch Instagram content. Link might be private or invalid."
+                r = await request
+            except httpx.TransportError as e:
+                raise ProviderUnavailable(str(e)) from e
+            if r.status_code >= 500:
+                raise ProviderUnavailable(f"HTTP {r.status_code}")
+            return r.json() if r.status_code == 200 else None
+
+        async def scraper_api(api_url):
+            return _ig_parse_scraper_json(await fetch_json(client.get(api_url, params={"url": url})))
+
+        async def ajax_search(api_url):
+            return _ig_parse_ajax_html(await fetch_json(client.post(api_url, data={"q": url, "t": "media", "lang": "en"})))
+
+        providers = {api_url: (lambda u=api_url: scraper_api(u)) for api_url in IG_SCRAPER_APIS}
+        providers.update({api_url: (lambda u=api_url: ajax_search(u)) for api_url in IG_FALLBACK_APIS})
+
+        provider, parsed = await ig_racer.race(providers)
+
+    if parsed:
+        logger.debug(f"[IG Scraper] Served by {provider}")
+        result.update(parsed)
+        result["success"] = True
         return result
 
+    result["error"] = "Unable to fetch Instagram content. Link might be private or invalid."
+    return result
+
 async def ig_download_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Instagram downloader command - /ig"""
     if not await premium_lock_handler(update, context): 
@@ -2163,6 +2212,20 @@ async def ig_download_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             parse_mode=ParseMode.HTML
         )
     
+    # Cache check (key = content key, misal instagram:<shortcode>)
+    try:
+        cache_key = await url_canon.content_key(url)
+    except Exception:
+        cache_key = url
+    try:
+        cached = await get_media_cache(cache_key)
+        if cached and cached.get("cached"):
+            await reply_cached_media(msg, cached.get("file_id"), cached.get("media_type", "video"),
+                                     "✅ <b>Cached Delivery</b>\n⚡ <i>Instant</i>")
+            return
+    except Exception:
+        pass
+    
     status_msg = await msg.reply_text(
         "⏳ <b>Scraping Instagram...</b>\n"
         "<i>Extracting media tanpa cookies...</i>",
@@ -2214,45 +2277,20 @@ async def ig_download_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             caption += f"📝 {html.escape(caption_text)}...\n"
         caption += f"⚡ <i>Scraped by Oktacomel</i>"
         
-        sent_count = 0
-        videos_sent = []
-        images_sent = []
-        
-        # Separate videos and images
-        for item in result["data"]:
-            if item["type"] == "video":
-                videos_sent.append(item["url"])
-            else:
-                images_sent.append(item["url"])
-        
-        # Send videos first
-        for i, video_url in enumerate(videos_sent[:5]):
-            try:
-                cap = caption if i == 0 else None
-                await msg.reply_video(
-                    video_url,
-                    caption=cap,
-                    parse_mode=ParseMode.HTML,
-                    supports_streaming=True
-                )
-                sent_count += 1
-            except Exception as e:
-                logger.warning(f"[IG] Failed to send video: {e}")
-                try:
-                    await msg.reply_document(video_url, caption=cap, parse_mode=ParseMode.HTML)
-                    sent_count += 1
-                except:
-                    pass
+        videos = [item["url"] for item in result["data"] if item["type"] == "video"]
+        images = [item["url"] for item in result["data"] if item["type"] != "video"]
         
-        # Send images (if no videos or it's a carousel)
-        for i, img_url in enumerate(images_sent[:10]):
+        # Video dulu lalu gambar, dikirim sebagai album (maks 10 per album)
+        items = [(u, "video") for u in videos[:5]] + [(u, "image") for u in images[:10]]
+        album = await album_sender.send_items(msg, items, caption)
+        sent_count = len(album)
+        # Hanya album lengkap yang di-cache (replay = 1 kali send album)
+        if album and sent_count == len(items):
+            file_id, m_type = album_cache_entry(album)
             try:
-                cap = caption if (sent_count == 0 and i == 0) else None
-                await msg.reply_photo(img_url, caption=cap, parse_mode=ParseMode.HTML)
-                sent_count += 1
-            except Exception as e:
-                logger.warning(f"[IG] Failed to send image: {e}")
-                continue
+                await save_media_cache(cache_key, file_id, m_type)
+            except Exception:
+                pass
         
         if sent_count == 0:
             await msg.reply_text(
@@ -2287,90 +2325,6 @@ def _first_str(*vals):
             return v.strip()
     return ""
 
-def _collect_urls(obj, platform: str = None):
-    """
-    Smart URL collector that categorizes media URLs.
-    Improved to handle TikTok/Instagram better - avoid duplicate thumbnails when video exists.
-    """
-    out = {"video": [], "audio": [], "image": [], "other": [], "music_info": None}
-    
-    # Track if we found a real video (not thumbnail)
-    has_real_video = False
-
-    def push(url: str, bucket: str):
-        nonlocal has_real_video
-        if not isinstance(url, str):
-            return
-        url = url.strip()
-        if not url.startswith(("http://", "https://")):
-            return
-        if url not in out[bucket]:
-            out[bucket].append(url)
-            if bucket == "video":
-                has_real_video = True
-
-    def walk(x, parent_key=""):
-        if isinstance(x, dict):
-            for k, v in x.items():
-                lk = str(k).lower()
-                full_key = f"{parent_key}.{lk}" if parent_key else lk
-                
-                if isinstance(v, str) and v.startswith(("http://", "https://")):
-                    # Priority: Video detection
-                    if any(w in lk for w in ["video", "play", "nowatermark", "hdplay", "wmplay"]):
-                        push(v, "video")
-                    # Music/Audio detection
-                    elif any(w in lk for w in ["music", "audio", "mp3", "sound"]) or ".mp3" in v.lower():
-                        push(v, "audio")
-                    # Skip thumbnails/covers if we're likely a video post
-                    elif any(w in lk for w in ["thumb", "thumbnail", "cover", "origin_cover", "dynamic_cover", "avatar"]):
-                        # Don't add thumbnails to image bucket - skip them
-                        pass
-                    # Real images (TikTok slideshow, IG carousel)
-                    elif any(w in lk for w in ["images", "image_post", "display_url", "image_url"]):
-                        push(v, "image")
-                    # Fallback with extension check
-                    elif ".mp4" in v.lower() or ".webm" in v.lower():
-                        push(v, "video")
-                    else:
-                        push(v, "other")
-                else:
-                    walk(v, full_key)
-                    
-            # Extract music info from TikTok response
-            if "music" in x and isinstance(x.get("music"), dict):
-                music = x["music"]
-                out["music_info"] = {
-                    "title": music.get("title", "Unknown"),
-                    "author": music.get("author", "Unknown"),
-                    "url": music.get("play_url", {}).get("uri") if isinstance(music.get("play_url"), dict) else music.get("play_url", "")
-                }
-                
-        elif isinstance(x, list):
-            for it in x:
-                walk(it, parent_key)
-
-    walk(obj)
-
-    # Fallback heuristics
-    if not out["video"]:
-        for u in out["other"]:
-            if any(t in u.lower() for t in [".mp4", ".mkv", ".webm"]):
-                push(u, "video")
-                
-    if not out["audio"]:
-        for u in out["other"]:
-            if any(t in u.lower() for t in [".mp3", ".m4a", ".aac"]):
-                push(u, "audio")
-
-    # SMART: If we have video, clear images (they're likely just thumbnails)
-    # Exception: Instagram carousel and TikTok slideshows explicitly have "images" array
-    if has_real_video and platform in ["tiktok", "pornhub", "xnxx"]:
-        # For video platforms, thumbnails are not useful
-        out["image"] = []
-
-    return out
-
 async def gimita_fetch(platform: str, target_url: str) -> tuple[dict | None, str | None]:
     """
     Fetch dari GiMiTA API
@@ -2385,7 +2339,7 @@ async def gimita_fetch(platform: str, target_url: str) -> tuple[dict | None, str
         "Accept": "application/json,text/plain,*/*",
     }
 
-    async with httpx.AsyncClient(timeout=45.0, follow_redirects=True, headers=headers) as client:
+    async with http_clients.client(timeout=45.0, follow_redirects=True, headers=headers) as client:
         try:
             r = await client.get(endpoint, params={"url": target_url})
             
@@ -2424,7 +2378,27 @@ async def gimita_fetch(platform: str, target_url: str) -> tuple[dict | None, str
             logger.debug(f"[DL] GiMiTA error: {e}")
             return None, f"Error: {type(e).__name__}"
 
-@rate_limit(seconds=2)
+def album_cache_entry(album: list) -> tuple:
+    """Hasil AlbumSender -> (file_id, media_type) untuk media_cache; >1 item disimpan sebagai album"""
+    if len(album) > 1:
+        return dump_album(album), "album"
+    kind, file_id = album[0]
+    return file_id, kind
+
+async def reply_cached_media(msg, file_id: str, media_type: str, caption: str):
+    """Kirim ulang media dari file_id Telegram (cache / hasil request lain)"""
+    if media_type == "video":
+        await msg.reply_video(file_id, caption=caption, parse_mode=ParseMode.HTML)
+    elif media_type == "audio":
+        await msg.reply_audio(file_id, caption=caption, parse_mode=ParseMode.HTML)
+    elif media_type == "photo":
+        await msg.reply_photo(file_id, caption=caption, parse_mode=ParseMode.HTML)
+    elif media_type == "document":
+        await msg.reply_document(file_id, caption=caption, parse_mode=ParseMode.HTML)
+    elif media_type == "album":
+        await album_sender.replay(msg, load_album(file_id), caption)
+
+@rate_limit("dl")
 async def dl_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await premium_lock_handler(update, context): return
     user_id = update.effective_user.id
@@ -2468,19 +2442,16 @@ async def dl_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if platform == "instagram_scrape":
         return await ig_download_command(update, context)
 
-    # Cache check
+    # Cache check (key = content key, bukan URL mentah)
+    try:
+        cache_key = await url_canon.content_key(url)
+    except Exception:
+        cache_key = url
     try:
-        cached = await get_media_cache(url)
+        cached = await get_media_cache(cache_key)
         if cached and cached.get("cached"):
-            file_id = cached.get("file_id")
-            m_type = cached.get("media_type", "video")
-            caption = "✅ <b>Cached Delivery</b>\n⚡ <i>Instant</i>"
-            if m_type == "video":
-                await msg.reply_video(file_id, caption=caption, parse_mode=ParseMode.HTML)
-            elif m_type == "audio":
-                await msg.reply_audio(file_id, caption=caption, parse_mode=ParseMode.HTML)
-            elif m_type == "photo":
-                await msg.reply_photo(file_id, caption=caption, parse_mode=ParseMode.HTML)
+            await reply_cached_media(msg, cached.get("file_id"), cached.get("media_type", "video"),
+                                     "✅ <b>Cached Delivery</b>\n⚡ <i>Instant</i>")
             return
     except Exception:
         pass
@@ -2491,18 +2462,49 @@ async def dl_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode=ParseMode.HTML,
     )
 
+    # Link yang sama sedang diproses request lain -> tunggu file_id-nya, jangan download ulang
+    shared = await media_flight.wait(cache_key, MEDIA_FLIGHT_TIMEOUT)
+    if shared:
+        try:
+            await status_msg.delete()
+        except Exception:
+            pass
+        try:
+            await reply_cached_media(msg, shared[0], shared[1], "✅ <b>Shared Delivery</b>\n⚡ <i>Instant</i>")
+            return
+        except Exception as e:
+            logger.warning(f"[DL] Shared file_id send failed: {e}")
+            status_msg = None
+    # claim langsung setelah wait (tanpa await di antaranya) supaya request paralel lain jadi follower
+    is_leader = media_flight.claim(cache_key)
+
     try:
+        # Leader sebelumnya bisa selesai (cache tersimpan, key dilepas) selama reply status di atas:
+        # cek cache ulang setelah claim, sebelum download
+        try:
+            cached = await get_media_cache(cache_key) if is_leader else None
+        except Exception:
+            cached = None
+        if cached and cached.get("cached"):
+            file_id, media_type = cached.get("file_id"), cached.get("media_type", "video")
+            media_flight.publish(cache_key, (file_id, media_type))
+            if status_msg is not None:
+                try:
+                    await status_msg.delete()
+                except Exception:
+                    pass
+                status_deleted = True
+            await reply_cached_media(msg, file_id, media_type, "✅ <b>Cached Delivery</b>\n⚡ <i>Instant</i>")
+            return
+
+        if status_msg is None:
+            status_msg = await msg.reply_text(
+                f"⏳ <b>PROCESSING {platform.upper()}...</b>", parse_mode=ParseMode.HTML
+            )
         data, error_msg = await gimita_fetch(platform, url)
         
-        # 🔧 FIX: Robust Instagram & Twitter list response handling
-        if isinstance(data, list) and len(data) > 0:
-            data = data[0]
-        elif isinstance(data, dict) and data.get("data") and isinstance(data["data"], list) and len(data["data"]) > 0:
-            # Handle cases where "data" is a list (Instagram slide/carousel)
-            media_list = data["data"]
-            data = {"data": media_list[0], "media_list": media_list} # Keep reference to all media
-        elif isinstance(data, dict) and data.get("result") and isinstance(data["result"], list) and len(data["result"]) > 0:
-            data = data["result"][0]
+        # List response (carousel Instagram / multi media Twitter) -> {"data": item pertama, "media_list": [...]}
+        data = unwrap_response(data)
 
         if not data or not isinstance(data, dict):
             # Fallback for platform-specific response keys
@@ -2511,23 +2513,27 @@ async def dl_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             else:
                 raise Exception(error_msg or "Invalid API response matrix")
 
-        # metadata best-effort
         res_data = data.get("data") or data.get("result") or data
         if not isinstance(res_data, dict): res_data = {}
 
+        # Extractor per platform dulu (field langsung), walk generik hanya kalau tidak ketemu
+        urls = gimita_extractors.extract(platform, data) or collect_urls(data, platform)
+
+        # metadata best-effort
         title = _first_str(
+            urls.get("title"),
             res_data.get("title"),
             data.get("title"),
             "Oktacomel Media"
         )
         uploader = _first_str(
+            urls.get("uploader"),
             res_data.get("author", {}).get("name") if isinstance(res_data.get("author"), dict) else "",
             res_data.get("author"),
             res_data.get("uploader"),
             "Oktacomel System"
         )
 
-        urls = _collect_urls(data, platform)
         if not (urls["video"] or urls["image"] or urls["audio"]):
             # Specific check for XNXX/PornHub/Twitter which might have different structures
             if "url" in res_data:
@@ -2593,7 +2599,8 @@ async def dl_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 v = await msg.reply_video(urls["video"][0], caption=caption_base, parse_mode=ParseMode.HTML)
                 sent = True
                 try:
-                    await save_media_cache(url, v.video.file_id, "video")
+                    media_flight.publish(cache_key, (v.video.file_id, "video"))
+                    await save_media_cache(cache_key, v.video.file_id, "video")
                 except Exception:
                     pass
             except Exception as ve:
@@ -2607,19 +2614,16 @@ async def dl_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # then images ONLY if no video was sent (smart detection)
         # For video posts, images are just thumbnails - skip them
         if urls["image"] and not sent:
-            for i, purl in enumerate(urls["image"][:8]):
+            # Slideshow/carousel -> 1 album (probe HEAD dulu), file_id semua item di-cache
+            album = await album_sender.send_items(msg, [(u, "image") for u in urls["image"][:10]], caption_base)
+            if album:
+                sent = True
+                file_id, m_type = album_cache_entry(album)
+                media_flight.publish(cache_key, (file_id, m_type))
                 try:
-                    cap = caption_base if (not sent and i == 0) else None
-                    p = await msg.reply_photo(purl, caption=cap, parse_mode=ParseMode.HTML)
-                    sent = True
-                    if cap:
-                        try:
-                            await save_media_cache(url, p.photo[-1].file_id, "photo")
-                        except Exception:
-                            pass
-                except Exception as pe:
-                    logger.warning(f"[DL] Failed to send photo {i}: {pe}")
-                    continue
+                    await save_media_cache(cache_key, file_id, m_type)
+                except Exception:
+                    pass
 
         # then audio (untuk Spotify, TikTok music)
         if urls["audio"]:
@@ -2631,9 +2635,12 @@ async def dl_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             try:
                 a = await msg.reply_audio(urls["audio"][0], caption=audio_caption, parse_mode=ParseMode.HTML)
+                # Media audio-only (misal Spotify): audio ini hasil utamanya
+                if not sent:
+                    media_flight.publish(cache_key, (a.audio.file_id, "audio"))
                 sent = True
                 try:
-                    await save_media_cache(f"{url}_audio", a.audio.file_id, "audio")
+                    await save_media_cache(f"{cache_key}_audio", a.audio.file_id, "audio")
                 except Exception:
                     pass
             except Exception as ae:
@@ -2677,6 +2684,9 @@ async def dl_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await msg.reply_text(error_message, parse_mode=ParseMode.HTML)
         else:
             await msg.reply_text(error_message, parse_mode=ParseMode.HTML)
+    finally:
+        if is_leader:
+            media_flight.release(cache_key)
 
 # ==========================================
 # 👤 PROFILE (/ME) - SIMPLE
@@ -2928,8 +2938,7 @@ async def userinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     is_sub = await is_registered(user_id)
     is_premium_user = False
     try:
-        pr = await db_fetch_one("SELECT user_id FROM premium_users WHERE user_id=?", (user_id,))
-        is_premium_user = bool(pr)
+        is_premium_user = (await entitlements.get(user_id)).has_premium_row
     except:
         pass
 
@@ -3537,7 +3546,8 @@ async def bf_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         try:
             # Delete all premium users and reset user_credits to 50
             await db_execute("DELETE FROM premium_users")
-            await db_execute("UPDATE user_credits SET credits = 50, last_reset = ?", (datetime.datetime.now().isoformat(),))
+            entitlements.invalidate_all()
+            await credit_ledger.reset_daily()
             reset_status = "✅ <b>User credits reset to 50 (Free).</b>\n"
         except Exception as e:
             reset_status = f"⚠️ <b>Credit reset failed:</b> {e}\n"
@@ -3610,6 +3620,32 @@ async def unsubscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ==========================================
 # 📢 SYSTEM BROADCAST (OWNER ONLY)
 # ==========================================
+def format_broadcast_status(job) -> str:
+    """Teks status broadcast (dipakai engine untuk update live)"""
+    pct = job.done / job.total * 100 if job.total else 100.0
+    filled = int(pct // 10)
+    bar = "█" * filled + "░" * (10 - filled)
+    if job.status == "done":
+        return (
+            "✅ <b>Broadcast Completed.</b>\n"
+            f"📨 Delivered to: <code>{job.sent}</code> users.\n"
+            f"🗑️ Removed inactive: <code>{job.removed}</code>\n"
+            f"⚠️ Failed: <code>{job.failed}</code>\n"
+            f"👥 Original list: <code>{job.total}</code>\n"
+            f"⚡ Throughput: <code>{job.rate:.1f} msg/s</code>"
+        )
+    return (
+        f"⏳ <b>Sending broadcast #{job.id}...</b>\n"
+        f"<code>[{bar}] {pct:.0f}%</code>\n"
+        f"📨 Sent: <code>{job.sent}</code> | 🗑️ Removed: <code>{job.removed}</code> | ⚠️ Failed: <code>{job.failed}</code>\n"
+        f"👥 Target: <code>{job.total}</code>\n"
+        f"⚡ <code>{job.rate:.1f} msg/s</code> | ETA <code>{int(job.eta)}s</code>"
+    )
+
+# 📢 Broadcast engine: paralel, rate-limited (~25 msg/s), checkpoint ke DB (resume setelah restart)
+broadcast_engine = BroadcastEngine(db_pool, formatter=format_broadcast_status, rate_per_sec=25, concurrency=20,
+                                   entitlements=entitlements)
+
 async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.effective_user.id != OWNER_ID:
         return  # Diam saja kalau bukan owner
@@ -3622,38 +3658,20 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     msg_text = " ".join(context.args)
-    users = await get_subscribers()
-    total = len(users)
-    sent = 0
-    removed = 0
-
     status_msg = await update.message.reply_text(
-        f"⏳ <b>Sending broadcast...</b>\n"
-        f"Target: <code>{total}</code> users.",
+        "⏳ <b>Sending broadcast...</b>",
         parse_mode=ParseMode.HTML
     )
 
-    for uid in users:
-        try:
-            await context.bot.send_message(
-                uid,
-                f"📢 <b>OKTACOMEL BROADCAST</b>\n"
-                "━━━━━━━━━━━━━━━━\n\n"
-                f"{msg_text}",
-                parse_mode=ParseMode.HTML
-            )
-            sent += 1
-        except Exception:
-            # User mungkin block bot / chat hilang → hapus dari DB
-            await remove_subscriber(uid)
-            removed += 1
-
-    await status_msg.edit_text(
-        "✅ <b>Broadcast Completed.</b>\n"
-        f"📨 Delivered to: <code>{sent}</code> users.\n"
-        f"🗑️ Removed inactive: <code>{removed}</code>\n"
-        f"👥 Original list: <code>{total}</code>",
-        parse_mode=ParseMode.HTML
+    # Jalan di background; status_msg di-update engine sampai selesai
+    await broadcast_engine.launch(
+        context.bot,
+        f"📢 <b>OKTACOMEL BROADCAST</b>\n"
+        "━━━━━━━━━━━━━━━━\n\n"
+        f"{msg_text}",
+        kind="manual",
+        status_chat_id=status_msg.chat_id,
+        status_message_id=status_msg.message_id
     )
 
 
@@ -3680,12 +3698,7 @@ async def morning_broadcast(context: ContextTypes.DEFAULT_TYPE):
         "💡 <i>Tip:</i> Stay hydrated, stay productive, and have a great day!"
     )
 
-    users = await get_subscribers()
-    for uid in users:
-        try:
-            await context.bot.send_message(uid, text, parse_mode=ParseMode.HTML)
-        except Exception:
-            await remove_subscriber(uid)
+    await broadcast_engine.launch(context.bot, text, kind="morning")
 
 
 # ==========================================
@@ -3881,7 +3894,7 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     parse_mode=ParseMode.HTML,
                 )
 
-            async with httpx.AsyncClient(timeout=15) as client:
+            async with http_clients.client(timeout=15) as client:
                 resp = await client.get(
                     "https://www.omdbapi.com/",
                     params={"apikey": omdb_key, "t": q, "plot": "short"},
@@ -3966,8 +3979,8 @@ async def http_ping(url: str = "https://1.1.1.1/cdn-cgi/trace") -> float:
     t0 = time.perf_counter()
     timeout = aiohttp.ClientTimeout(total=3)
 
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.get(url) as r:
+    async with http_clients.aiohttp_session() as session:
+        async with session.get(url, timeout=timeout) as r:
             await r.read()
 
     return (time.perf_counter() - t0) * 1000
@@ -4091,6 +4104,7 @@ async def qr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         # Buat QR Code
+        qrcode = lazy_import("qrcode")
         qr = qrcode.QRCode(box_size=10, border=4)
         qr.add_data(text_data)
         qr.make(fit=True)
@@ -4259,7 +4273,7 @@ async def process_wallet_check(update, user_id, wallet_code, phone):
     
     try:
         api_url = f"https://api.gimita.id/api/stalker/ewallet?ewallet_code={wallet_code}&phone_number={phone}"
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_clients.client(timeout=30) as client:
             resp = await client.get(api_url)
             result = resp.json()
         
@@ -4361,7 +4375,7 @@ async def wallet_callback_handler(update: Update, context: ContextTypes.DEFAULT_
     
     try:
         api_url = f"https://api.gimita.id/api/stalker/ewallet?ewallet_code={wallet_code}&phone_number={phone}"
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_clients.client(timeout=30) as client:
             resp = await client.get(api_url)
             result = resp.json()
         
@@ -4448,7 +4462,7 @@ async def pln_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         api_url = f"https://api.gimita.id/api/info/pln?id={pln_id}"
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_clients.client(timeout=30) as client:
             resp = await client.get(api_url)
             result = resp.json()
         
@@ -4517,7 +4531,7 @@ async def bola_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         api_url = "https://api.gimita.id/api/info/jadwalbola"
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_clients.client(timeout=30) as client:
             resp = await client.get(api_url)
             result = resp.json()
         
@@ -4595,7 +4609,7 @@ async def bola_refresh_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     
     try:
         api_url = "https://api.gimita.id/api/info/jadwalbola"
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_clients.client(timeout=30) as client:
             resp = await client.get(api_url)
             result = resp.json()
         
@@ -5083,6 +5097,10 @@ WORD_CHAIN_WORDS = {
     }
 }
 
+# 🔤 Index kamus shared (dibangun sekali per bahasa+level); kamus tambahan opsional di file
+WORD_CHAIN_FILE = "wordchain_words.txt.gz"
+word_index = WordIndex(WORD_CHAIN_WORDS, path=WORD_CHAIN_FILE)
+
 # ==========================================
 # WORD GAME STATS (DUMMY / NO DATABASE)
 # ==========================================
@@ -5114,14 +5132,18 @@ active_word_games = {}
 class WordChainGame:
     """Word Chain Game State Manager"""
     
-    def __init__(self, chat_id: int, user_id: int, lang: str, level: str, word_list: list):
+    def __init__(self, chat_id: int, user_id: int, lang: str, level: str, vocab: LevelVocab):
         self.chat_id = chat_id
         self.lang = lang
         self.level = level
-        self.word_list = word_list.copy()
-        self.used_words = []
-        self.current_word = random.choice(word_list)
-        self.used_words.append(self.current_word)
+        # Vocabulary shared read-only dari word_index (tidak di-copy per game)
+        self.words = vocab.words
+        self.vocab = vocab.lookup
+        self.used_words = []  # urutan tebakan (untuk tampilan)
+        self.used_set = set()
+        self._remaining = None
+        self.current_word = None
+        self._take_word(random.choice(self.words))
         
         self.players = {}  # {user_id: {name, xp, words, last_answer_time}}
         self.started_by = user_id
@@ -5158,27 +5180,40 @@ class WordChainGame:
         self.last_answer_times[user_id] = now
         return True, ""
     
+    def _take_word(self, word: str):
+        self.used_words.append(word)
+        self.used_set.add(word)
+        self.current_word = word
+
     def is_valid_word(self, word: str) -> bool:
         """Validate word - check if it's in word list and not used"""
         word_lower = word.lower().strip()
-        used_lower = [w.lower() for w in self.used_words]
-        
-        if word_lower not in [w.lower() for w in self.word_list]:
-            return False
-        if word_lower in used_lower:
-            return False
-        return True
-    
+        return word_lower in self.vocab and word_lower not in self.used_set
+    
+    def _pick_unused(self):
+        """Random pick kata yang belum dipakai, O(1) (expected)"""
+        if self._remaining is None:
+            if len(self.used_set) * 2 < len(self.words):
+                # Sisa kata >= separuh kamus: rejection sampling, tanpa copy list
+                while True:
+                    word = self.words[random.randrange(len(self.words))]
+                    if word not in self.used_set:
+                        return word
+            # Kamus tinggal separuh: bangun list sisa sekali, lalu swap-pop O(1)
+            self._remaining = [w for w in self.words if w not in self.used_set]
+        if not self._remaining:
+            return None
+        idx = random.randrange(len(self._remaining))
+        self._remaining[idx], self._remaining[-1] = self._remaining[-1], self._remaining[idx]
+        return self._remaining.pop()
+
     def get_next_word(self) -> tuple:
         """Get next word and check if kamus habis"""
-        available = [w for w in self.word_list if w.lower() not in [uw.lower() for uw in self.used_words]]
-        
-        if not available:
+        next_word = self._pick_unused()
+        if next_word is None:
             return None, True  # Kamus habis
         
-        next_word = random.choice(available)
-        self.used_words.append(next_word)
-        self.current_word = next_word
+        self._take_word(next_word)
         return next_word, False
     
     def hide_word(self, word: str, reveal_percentage: float = 0.35) -> str:
@@ -5307,12 +5342,12 @@ async def kata_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
             await query.answer("🚀 Starting game...")
             
             # Initialize game
-            word_list = WORD_CHAIN_WORDS.get(lang, {}).get(level, [])
-            if not word_list:
+            vocab = word_index.get(lang, level)
+            if not vocab:
                 await query.message.edit_text("❌ Error: Word list not available.", parse_mode=ParseMode.HTML)
                 return
             
-            game = WordChainGame(chat_id, user_id, lang, level, word_list)
+            game = WordChainGame(chat_id, user_id, lang, level, vocab)
             active_word_games[chat_id] = game
             
             # Start timer
@@ -5761,7 +5796,7 @@ async def sms_bus_api(endpoint: str, params: dict = None) -> dict:
     url = f"{SMS_BUS_BASE_URL}/{endpoint}"
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_clients.client(timeout=30.0) as client:
             r = await client.get(url, params=params)
             return r.json()
     except asyncio.TimeoutError:
@@ -6469,7 +6504,7 @@ async def drama_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = await update.message.reply_text(f"🔍 Searching for: <b>{query}</b>...", parse_mode=ParseMode.HTML)
     
     try:
-        async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
+        async with http_clients.client(timeout=30, follow_redirects=True) as client:
             r = await client.get(f"{DRAMA_API_URL}/api/search/{query}/1")
             
             # Check if empty response or not JSON
@@ -6550,7 +6585,7 @@ async def drama_callback_handler(update: Update, context: ContextTypes.DEFAULT_T
         type_labels = {"foryou": "🔥 Popular", "new": "🆕 New", "rank": "🏆 Ranking"}
         
         try:
-            async with httpx.AsyncClient(timeout=20) as client:
+            async with http_clients.client(timeout=20) as client:
                 r = await client.get(f"{DRAMA_API_URL}/api/{api_type}/{page}")
                 result = r.json()
                 dramas = result.get("data", [])
@@ -6596,7 +6631,7 @@ async def drama_callback_handler(update: Update, context: ContextTypes.DEFAULT_T
         await query.answer("Fetching details...")
         
         try:
-            async with httpx.AsyncClient(timeout=20) as client:
+            async with http_clients.client(timeout=20) as client:
                 r = await client.get(f"{DRAMA_API_URL}/api/drama/{drama_id}")
                 drama = r.json().get("data", {})
                 
@@ -6655,7 +6690,7 @@ async def drama_watch_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer(f"Loading Episode {ep}...")
     
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_clients.client(timeout=30) as client:
             r = await client.get(f"{DRAMA_API_URL}/api/chapters/{drama_id}")
             chapters = r.json().get("data", [])
             
@@ -6735,7 +6770,7 @@ async def scrape_stripe_command(update: Update, context: ContextTypes.DEFAULT_TY
     )
 
     try:
-        async with httpx.AsyncClient(timeout=20, follow_redirects=True) as client:
+        async with http_clients.client(timeout=20, follow_redirects=True) as client:
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
                 "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
@@ -6993,6 +7028,7 @@ async def fake_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await context.bot.send_chat_action(update.effective_chat.id, ChatAction.TYPING)
 
     try:
+        Faker = lazy_import("faker").Faker
         fake = Faker(locales[code])
         
         name = fake.name()
@@ -7212,7 +7248,7 @@ async def img_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Accept": "application/json,text/plain,*/*",
         }
 
-        async with httpx.AsyncClient(timeout=60.0, follow_redirects=True, headers=headers) as client:
+        async with http_clients.client(timeout=60.0, follow_redirects=True, headers=headers) as client:
             response = await client.get(GIMITA_IMG_API, params={"prompt": prompt})
             
             if response.status_code == 200:
@@ -7255,7 +7291,7 @@ async def img_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             fallback_url = f"https://image.pollinations.ai/prompt/{urllib.parse.quote(prompt)}?width=1024&height=1024&seed={seed}&enhance=true&nologo=true&model={model}"
             
-            async with httpx.AsyncClient(timeout=45.0) as client:
+            async with http_clients.client(timeout=45.0) as client:
                 response = await client.get(fallback_url, follow_redirects=True)
                 
                 if response.status_code == 200:
@@ -7367,6 +7403,7 @@ async def tts_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         # Generate Suara
+        gTTS = lazy_import("gtts").gTTS
         tts = gTTS(text=text, lang=lang)
         filename = f"voice_{update.effective_user.id}.mp3"
         tts.save(filename)
@@ -7406,6 +7443,7 @@ async def tr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         # 2. Proses Translate (Otomatis deteksi bahasa asal)
+        GoogleTranslator = lazy_import("deep_translator").GoogleTranslator
         translator = GoogleTranslator(source='auto', target=target_lang)
         translated = translator.translate(text_to_tr)
         
@@ -7479,8 +7517,8 @@ async def convert_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # 3. Request ke API Coinbase (Gratis & Akurat untuk USDT)
         url = f"https://api.coinbase.com/v2/exchange-rates?currency={base_curr}"
         
-        # Gunakan requests (sesuai library yang kamu punya)
-        r = requests.get(url)
+        async with http_clients.client(timeout=15) as client:
+            r = await client.get(url)
         data = r.json()
 
         # 4. Validasi Response
@@ -7765,7 +7803,7 @@ async def crypto_alert_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 
         # Simpan ke SQLite (table crypto_alerts) — jika tabel belum ada, buat otomatis
         try:
-            async with aiosqlite.connect(DB_NAME) as db:
+            async with db_pool.writer() as db:
                 await db.execute("""
                     CREATE TABLE IF NOT EXISTS crypto_alerts (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -7794,41 +7832,38 @@ async def crypto_alert_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 # --- OPTIONAL: Checker job — panggil ini via job_queue.run_repeating(check_price_alerts, interval=60, first=30) ---
 async def check_price_alerts(context: ContextTypes.DEFAULT_TYPE):
     try:
-        async with aiosqlite.connect(DB_NAME) as db:
-            async with db.execute("SELECT id, chat_id, symbol, target FROM crypto_alerts") as cur:
-                rows = await cur.fetchall()
-                if not rows:
-                    return
+        rows = await db_pool.fetch_all("SELECT id, chat_id, symbol, target FROM crypto_alerts")
+        if not rows:
+            return
 
-                # group by symbol untuk efisiensi
-                by_symbol = {}
-                for r in rows:
-                    _id, chat_id, sym, target = r
-                    sym = sym.upper()
-                    by_symbol.setdefault(sym, []).append(( _id, chat_id, target ))
-
-                for sym, alerts in by_symbol.items():
-                    pair = f"{sym}USDT"
-                    url = f"https://api.binance.com/api/v3/ticker/24hr?symbol={pair}"
-                    d = await fetch_json(url)
-                    if not d or 'lastPrice' not in d: 
-                        continue
-                    last = float(d.get('lastPrice', 0))
-                    # peringatan bila last >= target (simple logic)
-                    for (_id, chat_id, target) in alerts:
-                        try:
-                            if target > 0 and last >= float(target):
-                                text = (f"🚨 <b>Price Alert</b>\n"
-                                        f"Pair: <code>{pair}</code>\n"
-                                        f"Current: <code>${last:,.6f}</code>\n"
-                                        f"Target: <code>${float(target):,.6f}</code>\n"
-                                        f"ID Alert: <code>{_id}</code>")
-                                await context.bot.send_message(chat_id, text, parse_mode=ParseMode.HTML)
-                                # hapus alert setelah trigger (opsional)
-                                await db.execute("DELETE FROM crypto_alerts WHERE id=?", (_id,))
-                                await db.commit()
-                        except:
-                            pass
+        # group by symbol untuk efisiensi
+        by_symbol = {}
+        for r in rows:
+            _id, chat_id, sym, target = r
+            sym = sym.upper()
+            by_symbol.setdefault(sym, []).append(( _id, chat_id, target ))
+
+        for sym, alerts in by_symbol.items():
+            pair = f"{sym}USDT"
+            url = f"https://api.binance.com/api/v3/ticker/24hr?symbol={pair}"
+            d = await fetch_json(url)
+            if not d or 'lastPrice' not in d: 
+                continue
+            last = float(d.get('lastPrice', 0))
+            # peringatan bila last >= target (simple logic)
+            for (_id, chat_id, target) in alerts:
+                try:
+                    if target > 0 and last >= float(target):
+                        text = (f"🚨 <b>Price Alert</b>\n"
+                                f"Pair: <code>{pair}</code>\n"
+                                f"Current: <code>${last:,.6f}</code>\n"
+                                f"Target: <code>${float(target):,.6f}</code>\n"
+                                f"ID Alert: <code>{_id}</code>")
+                        await context.bot.send_message(chat_id, text, parse_mode=ParseMode.HTML)
+                        # hapus alert setelah trigger (opsional)
+                        await db_pool.execute("DELETE FROM crypto_alerts WHERE id=?", (_id,))
+                except:
+                    pass
     except Exception:
         pass
 
@@ -8231,21 +8266,19 @@ async def addprem_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         target_id = int(context.args[0])
 
-        async with aiosqlite.connect(DB_NAME) as db:
-            # Cek apakah sudah premium
-            async with db.execute("SELECT 1 FROM premium_users WHERE user_id = ? LIMIT 1", (target_id,)) as cur:
-                exists = await cur.fetchone()
+        # Cek apakah sudah premium
+        exists = await db_pool.fetch_one("SELECT 1 FROM premium_users WHERE user_id = ? LIMIT 1", (target_id,))
 
-            if exists:
-                await update.message.reply_text(
-                    f"ℹ️ User <code>{target_id}</code> is already <b>PREMIUM</b>.",
-                    parse_mode=ParseMode.HTML
-                )
-                return
+        if exists:
+            await update.message.reply_text(
+                f"ℹ️ User <code>{target_id}</code> is already <b>PREMIUM</b>.",
+                parse_mode=ParseMode.HTML
+            )
+            return
 
-            # Masukkan ke DB
-            await db.execute("INSERT OR IGNORE INTO premium_users (user_id) VALUES (?)", (target_id,))
-            await db.commit()
+        # Masukkan ke DB
+        await db_pool.execute("INSERT OR IGNORE INTO premium_users (user_id) VALUES (?)", (target_id,))
+        entitlements.invalidate(target_id)
 
         # Format waktu (pakai TZ jika tersedia)
         try:
@@ -8323,7 +8356,7 @@ async def okta_ai_process(
     }
 
     try:
-        async with httpx.AsyncClient(timeout=60.0, follow_redirects=True, headers=headers) as client:
+        async with http_clients.client(timeout=60.0, follow_redirects=True, headers=headers) as client:
             # GiMiTA GPT5 menggunakan GET dengan parameter 'text'
             resp = await client.get(GIMITA_GPT5_API, params={"text": query})
             
@@ -8386,9 +8419,25 @@ async def okta_ai_process(
 # --- COMMAND ---
 
 # Store AI conversation history per user
-ai_conversation_history = {}
+# (idle 1 jam / lewat 20k user / 64MB -> spill ke SQLite, masih bisa dilanjut sampai 7 hari)
+ai_conversation_history = BoundedStore(
+    "ai_history", ttl=3600, max_entries=20000, max_bytes=64 * 1024 * 1024,
+    pool=db_pool, write_queue=audit_queue, spill_table="ai_conversations", spill_ttl=86400 * 7
+)
+
+async def push_ai_history(user_id: int, role: str, content: str) -> list:
+    """Tambah 1 pesan ke history user (maks 10 pesan terakhir) dan return history-nya"""
+    history = await ai_conversation_history.load(user_id, [])
+    history.append({"role": role, "content": content})
+    
+    # Keep only last 10 messages for context
+    if len(history) > 10:
+        history = history[-10:]
+    ai_conversation_history.set(user_id, history)
+    return history
 
 # /ai - Tanya Jawab dengan GPT-5 (Conversational Mode)
+@rate_limit("ai")
 async def ai_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await premium_lock_handler(update, context): return
     
@@ -8422,18 +8471,10 @@ async def ai_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    # Initialize conversation history for user
-    if user_id not in ai_conversation_history:
-        ai_conversation_history[user_id] = []
-    
     # Add user message to history
-    ai_conversation_history[user_id].append({"role": "user", "content": query})
-    
-    # Keep only last 10 messages for context
-    if len(ai_conversation_history[user_id]) > 10:
-        ai_conversation_history[user_id] = ai_conversation_history[user_id][-10:]
+    history = await push_ai_history(user_id, "user", query)
     
-    await okta_ai_process_conversational(update, context, ai_conversation_history[user_id], "GPT-5", user_id)
+    await okta_ai_process_conversational(update, context, history, "GPT-5", user_id)
 
 async def okta_ai_process_conversational(update: Update, context: ContextTypes.DEFAULT_TYPE, messages: list, model_name: str, user_id: int):
     """Process AI with conversation history"""
@@ -8441,7 +8482,7 @@ async def okta_ai_process_conversational(update: Update, context: ContextTypes.D
     bot_msg = await message.reply_text(f"🤖 <b>{model_name} BRAIN</b> sedang berpikir...", parse_mode=ParseMode.HTML)
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with http_clients.aiohttp_session() as session:
             payload = {
                 "messages": messages,
                 "model": "openai"
@@ -8473,7 +8514,7 @@ async def okta_ai_process_conversational(update: Update, context: ContextTypes.D
             answer = "Tidak ada respons dari AI."
         
         # Add assistant response to history
-        ai_conversation_history[user_id].append({"role": "assistant", "content": answer})
+        await push_ai_history(user_id, "assistant", answer)
         
         # Format response
         final_text = f"🧠 <b>{model_name} BRAIN</b>\n━━━━━━━━━━━━━━━━━━━━━━\n\n{html.escape(answer)}"
@@ -8513,20 +8554,13 @@ async def ai_reply_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not query:
         return
     
-    # Initialize conversation history for user if not exists
-    if user_id not in ai_conversation_history:
-        ai_conversation_history[user_id] = []
-    
     # Add user message to history
-    ai_conversation_history[user_id].append({"role": "user", "content": query})
+    history = await push_ai_history(user_id, "user", query)
     
-    # Keep only last 10 messages for context
-    if len(ai_conversation_history[user_id]) > 10:
-        ai_conversation_history[user_id] = ai_conversation_history[user_id][-10:]
-    
-    await okta_ai_process_conversational(update, context, ai_conversation_history[user_id], "GPT-5", user_id)
+    await okta_ai_process_conversational(update, context, history, "GPT-5", user_id)
 
 # /code - Khusus untuk coding/programming
+@rate_limit("code")
 async def code_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await premium_lock_handler(update, context): return
     query = " ".join(context.args)
@@ -8547,6 +8581,7 @@ async def code_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await okta_ai_process(update, context, code_query, "GPT-5 Code")
 
 # /think - Untuk analisa mendalam
+@rate_limit("think")
 async def think_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await premium_lock_handler(update, context): return
     query = " ".join(context.args)
@@ -9535,7 +9570,7 @@ async def scr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
                 }
                 
-                async with httpx.AsyncClient(timeout=20) as client:
+                async with http_clients.client(timeout=20) as client:
                     r = await client.get(web_url, headers=headers)
                     
                     if "is not accessible" in r.text or "Access Denied" in r.text or r.status_code == 404:
@@ -9585,7 +9620,7 @@ async def scr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
                 }
                 
-                async with httpx.AsyncClient(timeout=20) as client:
+                async with http_clients.client(timeout=20) as client:
                     r = await client.get(web_url, headers=headers)
                     
                     if "is not accessible" in r.text or "Access Denied" in r.text or r.status_code == 404:
@@ -9895,7 +9930,7 @@ async def scr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 web_url = f"https://t.me/s/{username}"
                 headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
                 
-                async with httpx.AsyncClient(timeout=20) as client:
+                async with http_clients.client(timeout=20) as client:
                     r = await client.get(web_url, headers=headers)
                     target_text = r.text
             except Exception as e:
@@ -9964,6 +9999,7 @@ async def scr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ==========================================
 
 async def show_music_search(update, context, query, offset=0):
+    sp_client = get_spotify_client()
     if not sp_client:
         await context.bot.send_message(chat_id=update.effective_chat.id, text="❌ <b>System Error:</b> Spotify API invalid.", parse_mode=ParseMode.HTML)
         return
@@ -10091,6 +10127,63 @@ async def song_nav_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     _, offset_str, query = q.data.split("|", 2)
     await show_music_search(update, context, query, int(offset_str))
 
+# ==========================================
+# 📥 DOWNLOAD QUEUE HELPERS (YT-DLP WORKER POOL)
+# ==========================================
+def format_download_progress(job, label: str) -> str:
+    """Teks status untuk pesan progress download"""
+    if job.status == "queued":
+        return (
+            f"⏳ <b>{label}</b>\n"
+            f"📋 Queue position: <code>#{job.position}</code>"
+        )
+    if job.stage == "processing":
+        return f"🎛 <b>{label}</b>\n⚙️ <i>Converting audio...</i>"
+    speed = f"{job.speed / 1024 / 1024:.1f} MB/s" if job.speed else "-"
+    eta = f"{int(job.eta)}s" if job.eta is not None else "-"
+    return (
+        f"📥 <b>{label}</b>\n"
+        f"<code>[{make_bar(job.percent)}] {job.percent:.0f}%</code>\n"
+        f"⚡ {speed} | ⏱ ETA {eta}"
+    )
+
+async def run_download_job(msg, user_id: int, ydl_opts: dict, query: str, label: str) -> bool:
+    """
+    Jalankan yt-dlp lewat download_pool sambil update `msg` (posisi antrian, progress, tombol cancel).
+    Return False kalau job ditolak / dibatalkan (pesan sudah di-edit).
+    """
+    state = {"text": None, "kb": None}
+
+    async def _edit(job):
+        text = format_download_progress(job, label)
+        if text == state["text"]:
+            return
+        state["text"] = text
+        await msg.edit_text(text, parse_mode=ParseMode.HTML, reply_markup=state["kb"])
+
+    async def on_job(job):
+        state["kb"] = InlineKeyboardMarkup([[InlineKeyboardButton("🛑 Cancel", callback_data=f"dlq_cancel|{job.id}")]])
+        await _edit(job)
+
+    try:
+        await download_pool.run(user_id, ydl_opts, query, on_progress=_edit, on_job=on_job)
+        return True
+    except DownloadRejected as e:
+        await msg.edit_text(f"⚠️ <b>{html.escape(str(e))}</b>", parse_mode=ParseMode.HTML)
+        return False
+    except DownloadCancelled:
+        await msg.edit_text("🛑 <b>Download cancelled.</b>", parse_mode=ParseMode.HTML)
+        return False
+
+async def download_cancel_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Tombol 🛑 Cancel di pesan progress download"""
+    q = update.callback_query
+    job_id = int(q.data.split("|")[1])
+    if download_pool.cancel(job_id, user_id=q.from_user.id):
+        await q.answer("🛑 Cancelling download...")
+    else:
+        await q.answer("This download is not yours or already finished.", show_alert=True)
+
 # ==========================================
 # 📥 DOWNLOAD HANDLER (SPEED DEMON + ANTI-BLOCK)
 # ==========================================
@@ -10105,7 +10198,7 @@ async def song_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     # 1. AMBIL METADATA SPOTIFY (Wajib buat Caption)
     try:
-        track = sp_client.track(track_id)
+        track = get_spotify_client().track(track_id)
         song_name = track['name']
         artist_name = track['artists'][0]['name']
         album_name = track['album']['name']
@@ -10150,7 +10243,40 @@ async def song_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     # 3. DOWNLOAD BARU (CONFIG NGEBUT)
     msg = await context.bot.send_message(chat_id=q.message.chat_id, text="⏳ <b>Downloading High Quality Audio...</b>", parse_mode=ParseMode.HTML)
 
+    # Lagu yang sama sedang di-download request lain -> pakai file_id hasilnya
+    flight_key = f"spotify:track:{track_id}"
+    shared = await media_flight.wait(flight_key, MEDIA_FLIGHT_TIMEOUT)
+    if shared and shared[1] == "audio":
+        try:
+            await context.bot.send_audio(
+                chat_id=q.message.chat_id,
+                audio=shared[0],
+                caption=caption,
+                parse_mode=ParseMode.HTML,
+                reply_markup=InlineKeyboardMarkup(kb_effects)
+            )
+            await msg.delete()
+            return
+        except Exception as e:
+            logger.warning(f"[SPDL] Shared file_id send failed: {e}")
+    is_leader = media_flight.claim(flight_key)
+
+    temp_dir = None
     try:
+        # Download lain bisa selesai (file_id tersimpan) selama pesan status dikirim: cek ulang setelah claim
+        cached = await get_cached_media(track_id) if is_leader else None
+        if cached:
+            media_flight.publish(flight_key, (cached[0], "audio"))
+            await context.bot.send_audio(
+                chat_id=q.message.chat_id,
+                audio=cached[0],
+                caption=caption,
+                parse_mode=ParseMode.HTML,
+                reply_markup=InlineKeyboardMarkup(kb_effects)
+            )
+            await msg.delete()
+            return
+
         search_query = f"{artist_name} - {song_name} audio"
         temp_dir = f"music_{uuid.uuid4()}"
         
@@ -10189,35 +10315,44 @@ async def song_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         }
 
         file_path = None
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.extract_info(search_query, download=True)
-            if os.path.exists(temp_dir):
-                for f in os.listdir(temp_dir):
-                    if f.endswith('.mp3'): file_path = os.path.join(temp_dir, f)
+        if not await run_download_job(msg, q.from_user.id, ydl_opts, search_query, "Downloading High Quality Audio..."):
+            if os.path.exists(temp_dir): shutil.rmtree(temp_dir)
+            return
+        if os.path.exists(temp_dir):
+            for f in os.listdir(temp_dir):
+                if f.endswith('.mp3'): file_path = os.path.join(temp_dir, f)
 
         if file_path:
-            sent_msg = await context.bot.send_audio(
-                chat_id=q.message.chat_id,
-                audio=open(file_path, 'rb'),
-                title=song_name, performer=artist_name,
-                caption=caption, parse_mode=ParseMode.HTML,
-                thumbnail=requests.get(cover_url).content,
-                reply_markup=InlineKeyboardMarkup(kb_effects)
-            )
+            async with http_clients.client(timeout=15, follow_redirects=True) as client:
+                thumb_bytes = (await client.get(cover_url)).content
+            with open(file_path, 'rb') as audio_file:
+                sent_msg = await context.bot.send_audio(
+                    chat_id=q.message.chat_id,
+                    audio=audio_file,
+                    title=song_name, performer=artist_name,
+                    caption=caption, parse_mode=ParseMode.HTML,
+                    thumbnail=thumb_bytes,
+                    reply_markup=InlineKeyboardMarkup(kb_effects)
+                )
             
-            # Simpan ke Database
+            # Simpan ke Database (key spotify:{track_id}, sama dengan get_cached_media)
             new_file_id = sent_msg.audio.file_id
-            await save_media_cache(track_id, new_file_id, "audio")
+            media_flight.publish(flight_key, (new_file_id, "audio"))
+            await save_cached_media(track_id, new_file_id)
             
-            os.remove(file_path)
-            if os.path.exists(temp_dir): os.rmdir(temp_dir)
+            # Source mp3 disimpan untuk tombol efek (tidak perlu download ulang)
+            audio_fx.store_source(track_id, file_path)
+            if os.path.exists(temp_dir): shutil.rmtree(temp_dir)
             await msg.delete()
         else:
             await msg.edit_text("❌ <b>Download Failed.</b> Stream restricted.", parse_mode=ParseMode.HTML)
 
     except Exception as e:
         await msg.edit_text(f"❌ <b>System Error:</b> {e}", parse_mode=ParseMode.HTML)
-        if os.path.exists(temp_dir): shutil.rmtree(temp_dir)
+        if temp_dir and os.path.exists(temp_dir): shutil.rmtree(temp_dir)
+    finally:
+        if is_leader:
+            media_flight.release(flight_key)
 
 # ==========================================
 # 📝 LYRICS HANDLER (SMART SEARCH + ENGLISH UI)
@@ -10230,7 +10365,7 @@ async def lyrics_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         # 1. Info Lagu (Spotify)
-        track = sp_client.track(track_id)
+        track = get_spotify_client().track(track_id)
         raw_title = track['name']
         raw_artist = track['artists'][0]['name']
         duration = track['duration_ms'] / 1000
@@ -10249,7 +10384,7 @@ async def lyrics_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         lirik_raw = None
         
-        async with httpx.AsyncClient(timeout=20) as client:
+        async with http_clients.client(timeout=20) as client:
             # A. Coba cari spesifik (Paling Akurat)
             params = {"artist_name": raw_artist, "track_name": raw_title, "duration": duration}
             resp = await client.get(url_get, params=params)
@@ -10308,7 +10443,45 @@ async def lyrics_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ==========================================
 # 🎧 REAL AUDIO EFFECT ENGINE (CLEAN SIMPLE)
 # ==========================================
-import subprocess
+async def get_effect_source(q, context, msg, track_id: str, artist_name: str, song_name: str, temp_dir: str):
+    """
+    Cari source mp3 untuk track_id, urutan termurah dulu:
+    1. cache lokal audio_fx  2. file_id Telegram di media_cache  3. download yt-dlp
+    Return path lokal atau None.
+    """
+    source = audio_fx.get_source(track_id)
+    if source:
+        return source
+
+    os.makedirs(temp_dir, exist_ok=True)
+
+    cached = await get_cached_media(track_id)
+    if cached:
+        try:
+            tg_file = await context.bot.get_file(cached[0])
+            tmp_path = os.path.join(temp_dir, "source.mp3")
+            await tg_file.download_to_drive(tmp_path)
+            return audio_fx.store_source(track_id, tmp_path)
+        except Exception as e:
+            logger.warning(f"[AUDIOFX] Telegram source fetch failed for {track_id}: {e}")
+
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': f'{temp_dir}/input.%(ext)s',
+        'postprocessors': [{'key': 'FFmpegExtractAudio','preferredcodec': 'mp3','preferredquality': '192'}],
+        'quiet': True, 'default_search': 'ytsearch1:',
+        'proxy': MY_PROXY,
+        'extractor_args': {'youtube': {'player_client': ['android', 'ios']}}
+    }
+    search_query = f"{artist_name} - {song_name} audio"
+    if not await run_download_job(msg, q.from_user.id, ydl_opts, search_query, "Fetching Source Audio..."):
+        return None
+
+    input_path = f"{temp_dir}/input.mp3"
+    if not os.path.exists(input_path):
+        await msg.edit_text("❌ <b>Source Error.</b> Failed to download audio.", parse_mode=ParseMode.HTML)
+        return None
+    return audio_fx.store_source(track_id, input_path)
 
 async def real_effect_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
@@ -10317,92 +10490,73 @@ async def real_effect_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     data = q.data.split("|")
     effect_type = data[0]
     track_id = data[1]
-    
-    msg = await context.bot.send_message(chat_id=q.message.chat_id, text="⏳ <b>Processing Audio...</b>", parse_mode=ParseMode.HTML)
+    effect_key, tag_display, filter_cmd = audio_fx.resolve(effect_type)
+    variant_key = f"spotify:{track_id}:{effect_key}"
+    temp_dir = f"remix_{uuid.uuid4()}"
 
     try:
-        # 1. Get Info & Download Raw
-        track = sp_client.track(track_id)
-        song_name = track['name']
-        artist_name = track['artists'][0]['name']
-        
-        search_query = f"{artist_name} - {song_name} audio"
-        temp_dir = f"remix_{uuid.uuid4()}"
-        output_path = f"{temp_dir}/remix_output.mp3"
-        
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': f'{temp_dir}/input.%(ext)s',
-            'postprocessors': [{'key': 'FFmpegExtractAudio','preferredcodec': 'mp3','preferredquality': '192'}],
-            'quiet': True, 'default_search': 'ytsearch1:',
-            'proxy': MY_PROXY,
-            'extractor_args': {'youtube': {'player_client': ['android', 'ios']}}
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.extract_info(search_query, download=True)
-            input_path = f"{temp_dir}/input.mp3"
-
-        if not os.path.exists(input_path):
-            await msg.edit_text("❌ <b>Source Error.</b> Failed to download audio.")
-            return
-
-        # 2. FFmpeg Processing
-        cmd = []
-        tag_display = ""
-        
-        if effect_type == "eff_8d":
-            tag_display = "8D Audio"
-            filter_cmd = "apulsator=hz=0.125"
-        elif effect_type == "eff_bass":
-            tag_display = "Bass Boosted"
-            filter_cmd = "equalizer=f=60:width_type=h:width=50:g=15"
-        elif effect_type == "eff_slow":
-            tag_display = "Slowed + Reverb"
-            filter_cmd = "atempo=0.85,aecho=0.8:0.9:1000:0.3"
-        elif effect_type == "eff_night":
-            tag_display = "Nightcore"
-            filter_cmd = "asetrate=44100*1.25,atempo=1.0"
-        elif effect_type == "eff_reverb":
-            tag_display = "Reverb"
-            filter_cmd = "aecho=0.8:0.9:1000:0.3"
-        elif effect_type == "eff_speed":
-            tag_display = "Speed Up"
-            filter_cmd = "atempo=1.25"
+        # 1. Judul & artis dari pesan audio asal (tanpa hit Spotify API)
+        src_audio = q.message.audio if q.message else None
+        if src_audio and src_audio.title:
+            song_name = src_audio.title
+            artist_name = src_audio.performer or "Unknown"
         else:
-            # Default effect if unknown type
-            tag_display = "Normal"
-            filter_cmd = "anull"
+            track = await asyncio.get_running_loop().run_in_executor(executor, get_spotify_client().track, track_id)
+            song_name = track['name']
+            artist_name = track['artists'][0]['name']
 
-        cmd = ['ffmpeg', '-i', input_path, '-af', filter_cmd, '-y', output_path]
-        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        caption = (
+            f"🎧 <b>{html.escape(song_name)}</b>\n"
+            f"👤 {html.escape(artist_name)}\n"
+            f"🎛 <b>Effect:</b> {tag_display}\n\n"
+            f"⚡ <i>Powered by Oktacomel</i>"
+        )
 
-        # 3. Send Result (Tampilan Simple Normal)
-        if os.path.exists(output_path):
-            caption = (
-                f"🎧 <b>{html.escape(song_name)}</b>\n"
-                f"👤 {html.escape(artist_name)}\n"
-                f"🎛 <b>Effect:</b> {tag_display}\n\n"
-                f"⚡ <i>Powered by Oktacomel</i>"
-            )
-            
+        # 2. Variant sudah pernah dirender -> kirim file_id langsung
+        cached_variant = await db_fetch_one("SELECT file_id FROM media_cache WHERE url=?", (variant_key,))
+        if cached_variant:
             await context.bot.send_audio(
                 chat_id=q.message.chat_id,
-                audio=open(output_path, 'rb'),
-                title=f"{song_name} ({tag_display})",
-                performer=artist_name,
+                audio=cached_variant[0],
                 caption=caption,
                 parse_mode=ParseMode.HTML,
                 reply_to_message_id=q.message.id
             )
+            return
+
+        msg = await context.bot.send_message(chat_id=q.message.chat_id, text="⏳ <b>Processing Audio...</b>", parse_mode=ParseMode.HTML)
+
+        # 3. Source audio (cache lokal / Telegram / yt-dlp)
+        input_path = await get_effect_source(q, context, msg, track_id, artist_name, song_name, temp_dir)
+        if not input_path:
+            return
+
+        # 4. FFmpeg Processing (async, dibatasi semaphore engine)
+        await msg.edit_text(f"🎛 <b>Rendering {tag_display}...</b>", parse_mode=ParseMode.HTML)
+        os.makedirs(temp_dir, exist_ok=True)
+        output_path = f"{temp_dir}/remix_output.mp3"
+        rendered = await audio_fx.render(input_path, filter_cmd, output_path)
+
+        # 5. Send Result (Tampilan Simple Normal) + simpan file_id variant
+        if rendered:
+            with open(output_path, 'rb') as audio_file:
+                sent_msg = await context.bot.send_audio(
+                    chat_id=q.message.chat_id,
+                    audio=audio_file,
+                    title=f"{song_name} ({tag_display})",
+                    performer=artist_name,
+                    caption=caption,
+                    parse_mode=ParseMode.HTML,
+                    reply_to_message_id=q.message.id
+                )
+            await save_media_cache(variant_key, sent_msg.audio.file_id, "audio")
             await msg.delete()
         else:
-            await msg.edit_text("❌ <b>Render Failed.</b>")
-
-        shutil.rmtree(temp_dir)
+            await msg.edit_text("❌ <b>Render Failed.</b>", parse_mode=ParseMode.HTML)
 
     except Exception as e:
-        await msg.edit_text(f"❌ <b>Error:</b> {str(e)}", parse_mode=ParseMode.HTML)
+        await context.bot.send_message(chat_id=q.message.chat_id, text=f"❌ <b>Error:</b> {html.escape(str(e))}", parse_mode=ParseMode.HTML)
+    finally:
         if os.path.exists(temp_dir): shutil.rmtree(temp_dir)
 
 # ==========================================
@@ -10561,6 +10715,73 @@ async def log_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 # 📊 SYSTEM HEALTH CHECK (ULTIMATE PREMIUM V6)
 # ==========================================
 
+def build_engine_metrics_text() -> str:
+    """Ringkasan metrik engine internal (pool, queue, cache) untuk /status"""
+    aq = audit_queue.stats()
+    hc = http_clients.stats()
+    rc = response_cache.stats()
+    dp = download_pool.stats()
+    pe = pdf_engine.stats()
+    fx = audio_fx.stats()
+    bc = broadcast_engine.stats()
+    wi = word_index.stats()
+    ir = import_report.stats()
+    ag = adguard.stats()
+    en = entitlements.stats()
+    cl = credit_ledger.stats()
+    rl = rate_limiter.stats()
+    us = user_sessions.stats()
+    ah = ai_conversation_history.stats()
+    uc = url_canon.stats()
+    mf = media_flight.stats()
+    ig = ig_racer.stats()
+    gx = gimita_extractors.stats()
+    ab = album_sender.stats()
+    rl_busy = " ".join(f"{cls} {v}" for cls, v in rl["in_flight"].items())
+    lazy_loaded = ", ".join(f"{name} {ms:.0f}ms/+{rss:.0f}MB" for name, (ms, rss, _) in ir["lazy"].items()) or "none"
+    pool_state = "🟢 OPEN" if db_pool.is_open else "⚪ CLOSED"
+    lines = [
+        f"DB Pool: {pool_state} <code>1W/{db_pool.reader_count}R WAL</code>",
+        f"Audit Queue: <code>depth {aq['queue_depth']} | {aq['flushed_rows']} rows/{aq['flushes']} flush | "
+        f"last {aq['last_flush_ms']}ms avg {aq['avg_flush_ms']}ms | drop {aq['dropped']}</code>",
+        f"HTTP Pool: <code>{hc['clients']} client | HTTP/2 {'on' if hc['http2'] else 'off'} | {hc['requests']} req</code>",
+        f"API Cache: <code>{rc['entries']} keys | hit {rc['hits']}+{rc['l2_hits']} miss {rc['misses']} | "
+        f"evict {rc['evictions']} | coalesced {rc['coalesced']} | {rc['hit_rate']}%</code>",
+        f"Download Pool: <code>{dp['running']}/{dp['workers']} running | {dp['queued']} queued | "
+        f"ok {dp['completed']} fail {dp['failed']} cancel {dp['cancelled']}</code>",
+        f"PDF Engine: <code>{pe['running']}/{pe['workers']} running | {pe['queued']} queued | "
+        f"ok {pe['completed']} fail {pe['failed']} timeout {pe['timeouts']} | shards {pe['shards']} | avg {pe['avg_ms']}ms</code>",
+        f"Audio FX: <code>{fx['renders']} renders avg {fx['avg_render_ms']}ms | fail {fx['failures']} | "
+        f"source hit {fx['source_hits']}/{fx['source_hits'] + fx['source_misses']}</code>",
+        f"Broadcast: <code>{bc['active']} active | {bc['throughput']}/{bc['rate_limit']:.0f} msg/s | "
+        f"{bc['concurrency']} workers | RetryAfter {bc['retry_after']}</code>",
+        f"Word Index: <code>{wi['levels']} levels | {wi['words']} words shared | file {'on' if wi['file'] else 'off'}</code>",
+        f"Adguard: <code>{ag['sessions']} sessions in memory | {ag['dirty']} pending | "
+        f"flushed {ag['flushed_rows']} | swept {ag['swept']}</code>",
+        f"Entitlements: <code>{en['entries']} users | hit {en['hits']} miss {en['misses']} | "
+        f"invalidated {en['invalidations']} | {en['hit_rate']}%</code>",
+        f"Credit Ledger: <code>ok {cl['deductions']} | rejected {cl['rejections']} | "
+        f"daily reset {cl['resets']}x ({cl['last_reset_rows']} users)</code>",
+        f"Rate Limit: <code>{rl['buckets']}/{rl['max_buckets']} buckets | rejected {rl['rejected']} | "
+        f"busy {rl['busy_rejected']} | {rl_busy}</code>",
+        f"Sessions: <code>{us['entries']} | {us['bytes'] / 1024:.0f}KB | expired {us['expired']} evict {us['evictions']}</code>",
+        f"AI History: <code>{ah['entries']} | {ah['bytes'] / 1024:.0f}KB | spilled {ah['spilled']} restored {ah['restored']}</code>",
+        f"URL Canon: <code>{uc['platform_keys']} platform keys | {uc['resolved']} resolved | "
+        f"alias hit {uc['alias_hits']} | fallback {uc['fallback_keys']}</code>",
+        f"Media Flight: <code>{mf['in_flight']} in flight | {mf['leaders']} jobs | "
+        f"coalesced {mf['coalesced']} | failed {mf['failed']}</code>",
+        f"IG Racer: <code>p50 {ig['p50_ms']}ms p99 {ig['p99_ms']}ms | {ig['races']} races | "
+        f"hedged {ig['hedged']} | exhausted {ig['exhausted']} | open {len(ig['open'])}</code>",
+        f"DL Extractors: <code>{gx['platforms']} platforms | direct {gx['hits']} | "
+        f"fallback walk {gx['fallbacks']} | {gx['hit_rate']}%</code>",
+        f"Albums: <code>{ab['albums']} sent | {ab['items_sent']} items | replay {ab['replays']} | "
+        f"fallback {ab['fallbacks']} | probe fail {ab['probe_failures']}/{ab['probes']}</code>",
+        f"Startup: <code>{ir['boot_ms']:.0f}ms | RSS boot {ir['boot_rss_mb']}MB now {ir['rss_mb']}MB</code>",
+        f"Lazy Imports: <code>{html.escape(lazy_loaded)}</code>",
+    ]
+    body = "\n".join(("└─ " if i == len(lines) - 1 else "├─ ") + line for i, line in enumerate(lines))
+    return f"⚙️ <b>ENGINE METRICS</b>\n{body}\n\n"
+
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Ultimate Premium System Health Monitor"""
     user_id = update.effective_user.id
@@ -10582,6 +10803,7 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # 1. SPOTIFY API CHECK
         spotify_latency = 0
         try:
+            sp_client = get_spotify_client()
             if sp_client:
                 start_time = current_time()
                 sp_client.search(q="test", limit=1, type="track")
@@ -10595,7 +10817,7 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # 2. AI ENGINE (EMERGENT) CHECK
         ai_latency = 0
         try:
-            async with httpx.AsyncClient(timeout=5) as client:
+            async with http_clients.client(timeout=5) as client:
                 start_time = current_time()
                 resp = await client.get("https://api.emergent.sh/health", follow_redirects=True)
                 ai_latency = int((current_time() - start_time) * 1000)
@@ -10612,7 +10834,7 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         proxy_latency = 0
         try:
             if MY_PROXY:
-                async with httpx.AsyncClient(proxy=MY_PROXY, timeout=8, follow_redirects=True) as client:
+                async with http_clients.client(proxy=MY_PROXY, timeout=8, follow_redirects=True) as client:
                     start_time = current_time()
                     resp = await client.get("https://www.google.com")
                     proxy_latency = int((current_time() - start_time) * 1000)
@@ -10631,7 +10853,7 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         mail_latency = 0
         try:
             if TEMPMAIL_API_KEY:
-                async with httpx.AsyncClient(timeout=5) as client:
+                async with http_clients.client(timeout=5) as client:
                     headers = {"X-API-Key": TEMPMAIL_API_KEY}
                     start_time = current_time()
                     resp = await client.get("https://api.temp-mail.io/v1/domains", headers=headers)
@@ -10756,6 +10978,8 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"├─ Proxy: <code>{proxy_latency}ms</code>\n"
             f"└─ Mail: <code>{mail_latency}ms</code>\n\n"
             
+            f"{build_engine_metrics_text()}"
+            
             "═════════════════════════════════════════\n"
             "✨ <i>Premium diagnostics by Oktacomel v6</i>\n"
             "💡 <i>Monitor regularly for optimal performance</i>\n"
@@ -10778,6 +11002,10 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # 📧 TEMP MAIL PREMIUM V5 — GOD MODE (Auto-Refresh + Attachment)
 # ============================================================
 
+def get_tempmail_client():
+    """TempMailClient (library tempmail di-load lazy)"""
+    return lazy_import("tempmail").TempMailClient(api_key=TEMPMAIL_API_KEY)
+
 # --- SAFE DATE PARSER ---
 def tm_safe_date(obj):
     if hasattr(obj, "date"): return str(obj.date)
@@ -10845,14 +11073,14 @@ async def tm_dashboard(update, context, new=False, chosen_domain=None):
         msg_load = await context.bot.send_message(chat, "💎 <b>Generating secure address...</b>", parse_mode=ParseMode.HTML)
 
         try:
-            client = TempMailClient(api_key=TEMPMAIL_API_KEY)
+            client = get_tempmail_client()
             
             # --- MULAI PERBAIKAN: PROTEKSI SERVER DOWN ---
             try:
                 if chosen_domain:
                     mail_obj = client.create_email(domain=chosen_domain)
                 else:
-                    mail_obj = client.create_email(domain_type=DomainType.PREMIUM)
+                    mail_obj = client.create_email(domain_type=lazy_import("tempmail.models").DomainType.PREMIUM)
             except Exception as e:
                 # Jika errornya "Expecting value", berarti server TempMail lagi down/sibuk
                 if "Expecting value" in str(e):
@@ -11022,7 +11250,7 @@ async def tm_inbox(update, context, auto=False):
         return await update.callback_query.answer("❌ No active email", show_alert=True)
 
     try:
-        client = TempMailClient(api_key=TEMPMAIL_API_KEY)
+        client = get_tempmail_client()
         
         # --- PERBAIKAN DISINI (PROTEKSI SERVER DOWN) ---
         try:
@@ -11090,7 +11318,7 @@ async def tm_autorefresh(update, context):
     email = context.user_data.get("tm_email")
     cache = context.user_data.get("tm_cache", {})
 
-    client = TempMailClient(api_key=TEMPMAIL_API_KEY)
+    client = get_tempmail_client()
 
     try:
         msgs = client.list_email_messages(email=email)
@@ -11116,7 +11344,7 @@ async def tm_autorefresh(update, context):
 # ============================================================
 async def tm_read(update, context, msg_id):
     try:
-        client = TempMailClient(api_key=TEMPMAIL_API_KEY)
+        client = get_tempmail_client()
         m = client.get_message(message_id=msg_id)
 
         sender  = html.escape(m.from_addr or "Unknown")
@@ -11264,12 +11492,10 @@ async def note_add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await msg.edit_text("<code>[🔄] ENCRYPTING BYTES... ▰▰▰▱▱</code>", parse_mode=ParseMode.HTML)
     
     # 2. Simpan ke DB
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute(
-            "INSERT INTO user_notes (user_id, content, date_added) VALUES (?, ?, ?)",
-            (user.id, note_content, date_now)
-        )
-        await db.commit()
+    await db_pool.execute(
+        "INSERT INTO user_notes (user_id, content, date_added) VALUES (?, ?, ?)",
+        (user.id, note_content, date_now)
+    )
 
     await asyncio.sleep(0.5)
 
@@ -11294,7 +11520,7 @@ async def note_add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # 2. LIST NOTES (PREMIUM AUDIT LOG)
 # Fungsi Helper untuk Pagination
 async def get_notes_page(user_id, page, per_page=5):
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with db_pool.reader() as db:
         # Hitung total
         async with db.execute("SELECT COUNT(*) FROM user_notes WHERE user_id=?", (user_id,)) as c:
             total = (await c.fetchone())[0]
@@ -11441,9 +11667,7 @@ async def notes_callback_handler(update: Update, context: ContextTypes.DEFAULT_T
         await asyncio.sleep(0.8)
         
         # Hapus DB
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute("DELETE FROM user_notes WHERE user_id=?", (user_id,))
-            await db.commit()
+        await db_pool.execute("DELETE FROM user_notes WHERE user_id=?", (user_id,))
             
         final_txt = (
             "<b>♻️ SYSTEM CLEANSED</b>\n"
@@ -11493,7 +11717,7 @@ async def pdf_menu_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "<i>Professional PDF processing tools</i>\n\n"
         "📌 <b>Available Tools:</b>\n\n"
         "🔗 <b>Merge PDF</b>\n"
-        "   <code>/pdfmerge</code> - Gabung 2 file PDF\n\n"
+        "   <code>/pdfmerge</code> - Gabung banyak file PDF\n\n"
         "✂️ <b>Split PDF</b>\n"
         "   <code>/pdfsplit</code> - Pisah PDF per halaman\n\n"
         "📝 <b>PDF to Text</b>\n"
@@ -11541,10 +11765,10 @@ async def pdf_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYP
             "🔗 <b>PDF MERGE</b>\n"
             "━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
             "<b>Cara Pakai:</b>\n"
-            "1️⃣ Kirim PDF pertama\n"
-            "2️⃣ Reply PDF pertama dengan PDF kedua\n"
-            "3️⃣ Set caption: <code>/pdfmerge</code>\n\n"
-            "✅ Bot akan menggabungkan kedua PDF"
+            "1️⃣ Ketik <code>/pdfmerge</code>\n"
+            "2️⃣ Kirim PDF satu per satu (urutan = urutan halaman)\n"
+            "3️⃣ Ketik <code>/pdfmerge done</code>\n\n"
+            "✅ Bot akan menggabungkan semua PDF"
         ),
         "split": (
             "✂️ <b>PDF SPLIT</b>\n"
@@ -11552,8 +11776,8 @@ async def pdf_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYP
             "<b>Cara Pakai:</b>\n"
             "1️⃣ Kirim file PDF\n"
             "2️⃣ Reply PDF tersebut dengan:\n"
-            "   <code>/pdfsplit</code>\n\n"
-            "✅ Bot akan memisahkan per halaman (ZIP)"
+            "   <code>/pdfsplit</code> atau <code>/pdfsplit 1-3,10</code>\n\n"
+            "✅ Bot akan memisahkan per halaman (ZIP / PDF terpisah)"
         ),
         "text": (
             "📝 <b>PDF TO TEXT</b>\n"
@@ -11609,7 +11833,7 @@ async def pdf_menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "<i>Professional PDF processing tools</i>\n\n"
         "📌 <b>Available Tools:</b>\n\n"
         "🔗 <b>Merge PDF</b>\n"
-        "   <code>/pdfmerge</code> - Gabung 2 file PDF\n\n"
+        "   <code>/pdfmerge</code> - Gabung banyak file PDF\n\n"
         "✂️ <b>Split PDF</b>\n"
         "   <code>/pdfsplit</code> - Pisah PDF per halaman\n\n"
         "📝 <b>PDF to Text</b>\n"
@@ -11634,90 +11858,175 @@ async def pdf_menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.message.edit_text(text, parse_mode=ParseMode.HTML, reply_markup=InlineKeyboardMarkup(buttons))
 
 # ==========================================
-# 📥 /pdfmerge — Merge 2 PDFs into One
+# ⚙️ PDF WORKER HELPER (antrian + posisi di pesan status)
+# ==========================================
+def pdf_status_editor(status, label: str):
+    """Callback on_progress pdf_engine: posisi antrian / sedang diproses di pesan `status`"""
+    state = {"text": None}
+
+    async def _edit(job):
+        if job.status == "queued":
+            text = f"⏳ <b>{label}</b>\n📋 Queue position: <code>#{job.position}</code>"
+        else:
+            text = f"⚙️ <b>{label}</b>\n<i>Please wait a moment.</i>"
+        if text == state["text"]:
+            return
+        state["text"] = text
+        await status.edit_text(text, parse_mode=ParseMode.HTML)
+
+    return _edit
+
+async def run_pdf_job(status, user_id: int, label: str, op: str, *args):
+    """
+    Jalankan operasi PDF di pdf_engine sambil update `status` (posisi antrian).
+    Return dict hasil, atau None kalau antrian penuh (pesan sudah di-edit).
+    PdfJobFailed diteruskan ke handler.
+    """
+    try:
+        return await pdf_engine.run(op, *args, user_id=user_id, on_progress=pdf_status_editor(status, label))
+    except PdfJobRejected as e:
+        await status.edit_text(f"⚠️ <b>{html.escape(str(e))}</b>", parse_mode=ParseMode.HTML)
+        return None
+
+# ==========================================
+# 📥 /pdfmerge — Merge Multiple PDFs (Streaming Session)
 # ==========================================
+# Sesi merge aktif per user; dibuang kalau idle > PDF_MERGE_IDLE detik
+pdf_merge_sessions = {}
+PDF_MERGE_IDLE = 1800
+# Tiap sesi memesan 1 tempat antrian pdf_engine; sisanya tetap untuk job PDF lain
+PDF_MERGE_MAX_SESSIONS = 5
+
+def expire_pdf_merge_sessions():
+    now = time.time()
+    for uid, session in list(pdf_merge_sessions.items()):
+        if now - session.touched_at > PDF_MERGE_IDLE:
+            pdf_merge_sessions.pop(uid, None)
+            session.close()
+
+def add_pdf_to_merge(session: MergeSession, doc):
+    """Download `doc` + append ke sesi (jalan di background, urutan dijaga sesi)"""
+    async def download(path):
+        f = await doc.get_file()
+        await f.download_to_drive(custom_path=path)
+
+    return session.add(doc.file_name or "document.pdf", download)
+
 async def pdf_merge_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
+    user_id = msg.from_user.id
+    expire_pdf_merge_sessions()
+    action = context.args[0].lower() if context.args else ""
+    session = pdf_merge_sessions.get(user_id)
 
-    # Harus reply ke PDF pertama
-    if not msg.reply_to_message or not msg.reply_to_message.document:
-        await msg.reply_text(
-            "⚠️ <b>How to use /pdfmerge</b>\n\n"
-            "1️⃣ Send the <b>first PDF</b>.\n"
-            "2️⃣ Reply to that PDF with the <b>second PDF</b> attached,\n"
-            "   and set the caption to <code>/pdfmerge</code>.\n\n"
-            "I will merge those 2 PDFs into a single file.",
+    if action == "cancel":
+        if session:
+            pdf_merge_sessions.pop(user_id, None)
+            session.close()
+        await msg.reply_text("🛑 <b>Merge session cancelled.</b>", parse_mode=ParseMode.HTML)
+        return
+
+    if action in ("done", "finish"):
+        if not session:
+            await msg.reply_text(
+                "❌ <b>No active merge session.</b>\nStart one with <code>/pdfmerge</code>.",
+                parse_mode=ParseMode.HTML
+            )
+            return
+        pdf_merge_sessions.pop(user_id, None)
+        status = await msg.reply_text(
+            f"⏳ <b>Finalizing merged PDF...</b>\n<i>{session.accepted} file(s) received.</i>",
             parse_mode=ParseMode.HTML
         )
+        # Append yang masih antri -> posisi antrian tampil di pesan status
+        session.on_progress = pdf_status_editor(status, "Merging PDFs...")
+        try:
+            result = await session.finish()
+            notes = ""
+            if session.errors:
+                notes = "\n⚠️ Skipped:\n" + "\n".join(f"• {html.escape(err[:80])}" for err in session.errors[:5])
+            with open(session.out_path, "rb") as fh:
+                await msg.reply_document(
+                    document=fh,
+                    filename="merged_oktacomel.pdf",
+                    caption=(
+                        f"✅ <b>Merged PDF Ready.</b>\n"
+                        f"📚 Files: <b>{result['files']}</b> | 📄 Pages: <b>{result['pages']}</b>{notes}\n"
+                        f"⚡ <i>Powered by OKTACOMEL PDF Engine</i>"
+                    ),
+                    parse_mode=ParseMode.HTML
+                )
+            await status.delete()
+        except Exception as e:
+            await status.edit_text(
+                f"❌ <b>Merge failed:</b> <code>{html.escape(str(e))}</code>",
+                parse_mode=ParseMode.HTML
+            )
+        finally:
+            session.close()
         return
 
-    doc1 = msg.reply_to_message.document
-    doc2 = msg.document
-
-    if not doc2:
+    if session:
         await msg.reply_text(
-            "❌ <b>No second PDF detected.</b>\n"
-            "Please attach the second PDF in the same message as <code>/pdfmerge</code>.",
+            f"📚 <b>Merge session active</b> — {session.accepted} PDF(s) received.\n"
+            "Send more PDFs, then <code>/pdfmerge done</code> (or <code>/pdfmerge cancel</code>).",
             parse_mode=ParseMode.HTML
         )
         return
 
-    if doc1.mime_type != "application/pdf" or doc2.mime_type != "application/pdf":
+    if len(pdf_merge_sessions) >= PDF_MERGE_MAX_SESSIONS:
         await msg.reply_text(
-            "❌ <b>Both files must be PDF documents.</b>",
+            "⚠️ <b>Too many merge sessions running.</b>\nPlease try again in a moment.",
             parse_mode=ParseMode.HTML
         )
         return
-
-    status = await msg.reply_text(
-        "⏳ <b>Merging PDFs...</b>\n<i>Please wait a moment.</i>",
-        parse_mode=ParseMode.HTML
-    )
-
-    tmp_dir = tempfile.mkdtemp(prefix="mergepdf_")
-
+    work_dir = tempfile.mkdtemp(prefix="mergepdf_")
     try:
-        # Download both PDFs
-        f1 = os.path.join(tmp_dir, "file1.pdf")
-        f2 = os.path.join(tmp_dir, "file2.pdf")
-
-        file1 = await doc1.get_file()
-        await file1.download_to_drive(custom_path=f1)
-
-        file2 = await doc2.get_file()
-        await file2.download_to_drive(custom_path=f2)
-
-        # Merge using PyPDF2
-        merger = PdfMerger()
-        merger.append(f1)
-        merger.append(f2)
-
-        output_path = os.path.join(tmp_dir, "merged.pdf")
-        with open(output_path, "wb") as out_f:
-            merger.write(out_f)
-        merger.close()
+        session = MergeSession(pdf_engine, user_id, work_dir)
+    except PdfJobRejected as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        await msg.reply_text(f"⚠️ <b>{html.escape(str(e))}</b>", parse_mode=ParseMode.HTML)
+        return
+    pdf_merge_sessions[user_id] = session
 
-        # Send result
-        with open(output_path, "rb") as fh:
-            await msg.reply_document(
-                document=fh,
-                filename="merged_oktacomel.pdf",
-                caption="✅ <b>Merged PDF Ready.</b>\n⚡ <i>Powered by OKTACOMEL PDF Engine</i>",
-                parse_mode=ParseMode.HTML
-            )
+    # Mulai dengan PDF yang di-reply (kalau ada)
+    replied = msg.reply_to_message.document if msg.reply_to_message else None
+    added = ""
+    if replied and replied.mime_type == "application/pdf":
+        add_pdf_to_merge(session, replied)
+        added = "📥 Replied PDF added as #1.\n"
 
-        await status.delete()
+    await msg.reply_text(
+        "🔗 <b>PDF Merge Session Started</b>\n\n"
+        f"{added}"
+        "1️⃣ Send your PDFs one by one (page order = send order).\n"
+        "2️⃣ Type <code>/pdfmerge done</code> to get the merged file.\n\n"
+        "<i>Each PDF is merged as soon as it arrives. /pdfmerge cancel to abort.</i>",
+        parse_mode=ParseMode.HTML
+    )
 
-    except Exception as e:
-        await status.edit_text(
-            f"❌ <b>Merge failed:</b> <code>{html.escape(str(e))}</code>",
+async def pdf_merge_document_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """PDF yang dikirim selama sesi /pdfmerge aktif -> langsung di-download & di-append"""
+    msg = update.message
+    if not msg or not msg.from_user or not msg.document:
+        return
+    session = pdf_merge_sessions.get(msg.from_user.id)
+    if not session:
+        return
+    if session.full:
+        await msg.reply_text(
+            f"⚠️ <b>Max {session.max_files} PDFs per merge.</b>\nType <code>/pdfmerge done</code>.",
             parse_mode=ParseMode.HTML
         )
-    finally:
-        try:
-            shutil.rmtree(tmp_dir)
-        except:
-            pass
+        return
+    add_pdf_to_merge(session, msg.document)
+    await msg.reply_text(
+        f"📥 <b>PDF #{session.accepted} added.</b> Send more or <code>/pdfmerge done</code>.",
+        parse_mode=ParseMode.HTML
+    )
+
+# Seleksi /pdfsplit sampai segini halaman dikirim sebagai PDF terpisah (bukan ZIP)
+PDF_SPLIT_SINGLE_MAX = 3
 
 # ==========================================
 # ✂️ /pdfsplit — Split PDF into per-page files (ZIP)
@@ -11729,8 +12038,9 @@ async def pdf_split_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await msg.reply_text(
             "⚠️ <b>How to use /pdfsplit</b>\n\n"
             "Reply to a <b>single PDF document</b> with the command:\n"
-            "<code>/pdfsplit</code>\n\n"
-            "I will split it into one PDF per page and send a ZIP file.",
+            "<code>/pdfsplit</code> — all pages (ZIP)\n"
+            "<code>/pdfsplit 1-3,10,20-25</code> — selected pages only\n\n"
+            f"Up to {PDF_SPLIT_SINGLE_MAX} pages are sent as separate PDFs, more as a ZIP file.",
             parse_mode=ParseMode.HTML
         )
         return
@@ -11743,6 +12053,21 @@ async def pdf_split_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
+    ranges = None
+    if context.args:
+        try:
+            ranges = parse_page_ranges("".join(context.args))
+        except ValueError as e:
+            await msg.reply_text(
+                f"❌ <b>{html.escape(str(e))}</b>\nExample: <code>/pdfsplit 1-3,10,20-25</code>",
+                parse_mode=ParseMode.HTML
+            )
+            return
+
+    # Seleksi kecil (semua range tertutup) -> kirim PDF per halaman, bukan ZIP
+    as_files = bool(ranges) and all(last is not None for _, last in ranges) and \
+        sum(last - first + 1 for first, last in ranges) <= PDF_SPLIT_SINGLE_MAX
+
     status = await msg.reply_text(
         "⏳ <b>Splitting PDF into pages...</b>",
         parse_mode=ParseMode.HTML
@@ -11755,35 +12080,36 @@ async def pdf_split_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f = await doc.get_file()
         await f.download_to_drive(custom_path=pdf_path)
 
-        reader = PdfReader(pdf_path)
-        num_pages = len(reader.pages)
-
-        # Create per-page PDFs and add to ZIP
-        zip_path = os.path.join(tmp_dir, "split_pages.zip")
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for i in range(num_pages):
-                writer = PdfWriter()
-                writer.add_page(reader.pages[i])
-
-                page_filename = f"page_{i+1}.pdf"
-                page_path = os.path.join(tmp_dir, page_filename)
-                with open(page_path, "wb") as pf:
-                    writer.write(pf)
-
-                zf.write(page_path, arcname=page_filename)
-
-        with open(zip_path, "rb") as fh:
-            await msg.reply_document(
-                document=fh,
-                filename="split_pages_oktacomel.zip",
-                caption=(
-                    f"✅ <b>PDF Split Complete.</b>\n"
-                    f"📄 Pages: <b>{num_pages}</b>\n"
-                    f"📦 All pages are inside this ZIP.\n\n"
-                    f"⚡ <i>Powered by OKTACOMEL PDF Engine</i>"
-                ),
-                parse_mode=ParseMode.HTML
-            )
+        # Halaman terpilih ditulis di PDF worker langsung ke ZIP (atau file per halaman)
+        out_path = tmp_dir if as_files else os.path.join(tmp_dir, "split_pages.zip")
+        result = await run_pdf_job(status, msg.from_user.id, "Splitting PDF into pages...", "split",
+                                   pdf_path, out_path, ranges, as_files)
+        if not result:
+            return
+        num_pages = result["pages"]
+
+        if as_files:
+            for file_path in result["files"]:
+                with open(file_path, "rb") as fh:
+                    await msg.reply_document(
+                        document=fh,
+                        filename=os.path.basename(file_path),
+                        caption=f"📄 <b>{os.path.basename(file_path)[:-4].replace('_', ' ').title()}</b> / {result['total']}",
+                        parse_mode=ParseMode.HTML
+                    )
+        else:
+            with open(out_path, "rb") as fh:
+                await msg.reply_document(
+                    document=fh,
+                    filename="split_pages_oktacomel.zip",
+                    caption=(
+                        f"✅ <b>PDF Split Complete.</b>\n"
+                        f"📄 Pages: <b>{num_pages}</b> of {result['total']}\n"
+                        f"📦 Selected pages are inside this ZIP.\n\n"
+                        f"⚡ <i>Powered by OKTACOMEL PDF Engine</i>"
+                    ),
+                    parse_mode=ParseMode.HTML
+                )
 
         await status.delete()
 
@@ -11823,6 +12149,25 @@ async def pdf_to_text_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return
 
+    # PDF yang sama (forward dari user lain) -> hasil lama langsung dikirim
+    text_cache_key = f"pdftext:{doc.file_unique_id}"
+    cached = await get_media_cache(text_cache_key)
+    if cached.get("cached"):
+        if cached["media_type"] == "document":
+            await msg.reply_document(
+                document=cached["file_id"],
+                caption="✅ <b>Text extracted as .txt file.</b>\n⚡ <i>Cached Delivery</i>",
+                parse_mode=ParseMode.HTML
+            )
+        else:
+            # media_type "text": kolom file_id berisi teks pendek itu sendiri
+            await msg.reply_text(
+                "?? <b>PDF Text Extracted:</b>\n\n"
+                f"<code>{html.escape(cached['file_id'])}</code>",
+                parse_mode=ParseMode.HTML
+            )
+        return
+
     status = await msg.reply_text(
         "⏳ <b>Extracting text from PDF...</b>",
         parse_mode=ParseMode.HTML
@@ -11830,22 +12175,30 @@ async def pdf_to_text_command(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     tmp_dir = tempfile.mkdtemp(prefix="pdftotext_")
 
+    async def on_pages(done, total, chars):
+        await status.edit_text(
+            f"⚙️ <b>Extracting text from PDF...</b>\n"
+            f"<code>[{make_bar(done / total * 100)}] {done}/{total} pages</code>",
+            parse_mode=ParseMode.HTML
+        )
+
     try:
         pdf_path = os.path.join(tmp_dir, "source.pdf")
         f = await doc.get_file()
         await f.download_to_drive(custom_path=pdf_path)
 
-        reader = PdfReader(pdf_path)
-        all_text = []
-
-        for page in reader.pages:
-            txt = page.extract_text() or ""
-            if txt.strip():
-                all_text.append(txt)
-
-        full_text = "\n\n".join(all_text).strip()
+        # Extract per range halaman paralel di PDF worker, disambung urut ke file .txt
+        txt_path = os.path.join(tmp_dir, "extracted_text.txt")
+        try:
+            result = await pdf_engine.extract_text(
+                pdf_path, txt_path, user_id=msg.from_user.id,
+                on_progress=pdf_status_editor(status, "Extracting text from PDF..."), on_pages=on_pages
+            )
+        except PdfJobRejected as e:
+            await status.edit_text(f"⚠️ <b>{html.escape(str(e))}</b>", parse_mode=ParseMode.HTML)
+            return
 
-        if not full_text:
+        if not result["chars"]:
             await status.edit_text(
                 "❌ <b>No text found in this PDF.</b>\n"
                 "This file may be scanned or image-only.",
@@ -11853,28 +12206,30 @@ async def pdf_to_text_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             )
             return
 
-        # Kalau singkat, kirim langsung di chat
-        if len(full_text) <= 3800:
+        # Kalau singkat, kirim langsung di chat (panjang file asli, termasuk pemisah antar halaman)
+        full_text = None
+        if os.path.getsize(txt_path) <= 3800 * 4:  # UTF-8 maks 4 byte per karakter
+            with open(txt_path, "r", encoding="utf-8") as tf:
+                full_text = tf.read()
+        if full_text is not None and len(full_text) <= 3800:
             await status.delete()
             await msg.reply_text(
                 "?? <b>PDF Text Extracted:</b>\n\n"
                 f"<code>{html.escape(full_text)}</code>",
                 parse_mode=ParseMode.HTML
             )
+            await save_media_cache(text_cache_key, full_text, "text")
         else:
-            # Teks terlalu panjang → kirim sebagai file .txt
-            txt_path = os.path.join(tmp_dir, "extracted_text.txt")
-            with open(txt_path, "w", encoding="utf-8") as tf:
-                tf.write(full_text)
-
+            # Teks terlalu panjang → kirim file .txt hasil worker
             with open(txt_path, "rb") as fh:
                 await status.delete()
-                await msg.reply_document(
+                sent = await msg.reply_document(
                     document=fh,
                     filename="pdf_text_oktacomel.txt",
                     caption="✅ <b>Text extracted as .txt file.</b>\n⚡ <i>Powered by OKTACOMEL PDF Engine</i>",
                     parse_mode=ParseMode.HTML
                 )
+            await save_media_cache(text_cache_key, sent.document.file_id, "document")
 
     except Exception as e:
         await status.edit_text(
@@ -12085,60 +12440,22 @@ async def imgpdf_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
 
-        # --- 5. Open images with Pillow, fix orientation & convert to RGB ---
-        pil_images = []
-        for p in image_paths:
-            try:
-                im = Image.open(p)
-
-                # Auto-rotate if EXIF orientation exists
-                try:
-                    im = ImageOps.exif_transpose(im)
-                except Exception:
-                    pass
-
-                # Convert all to RGB (required for PDF)
-                if im.mode in ("RGBA", "P"):
-                    im = im.convert("RGB")
-
-                # Optional: simple auto-resize if extremely large
-                max_dim = 2500
-                if max(im.size) > max_dim:
-                    im.thumbnail((max_dim, max_dim))
-
-                pil_images.append(im)
-            except Exception as e:
-                print(f"Image open error: {e}")
-
-        if not pil_images:
-            await status.edit_text(
-                "❌ <b>Failed to process the image.</b>",
-                parse_mode=ParseMode.HTML
-            )
-            return
-
-        # --- 6. Save to PDF (single or multi-page) ---
+        # --- 5. Build PDF in the PDF worker ---
+        # JPEG di-embed apa adanya (orientasi EXIF lewat transform halaman),
+        # hanya non-JPEG / gambar raksasa yang di-decode & di-resize
         base_pdf_path = os.path.join(tmp_dir, "output_raw.pdf")
-
-        first_img = pil_images[0]
-        if len(pil_images) == 1:
-            first_img.save(base_pdf_path, "PDF", resolution=150.0)
-        else:
-            # Multi-page PDF (future-proof if you add album support)
-            first_img.save(
-                base_pdf_path,
-                "PDF",
-                resolution=150.0,
-                save_all=True,
-                append_images=pil_images[1:]
-            )
+        result = await run_pdf_job(status, msg.from_user.id, "Generating PDF from image...",
+                                   "images", image_paths, base_pdf_path)
+        if not result:
+            return
 
         final_pdf_path = os.path.join(tmp_dir, "output_final.pdf")
 
-        # --- 7. Optional: add password protection (D) ---
+        # --- 6. Optional: add password protection (D) ---
         if password:
-            reader = PdfReader(base_pdf_path)
-            writer = PdfWriter()
+            PyPDF2 = lazy_import("PyPDF2")
+            reader = PyPDF2.PdfReader(base_pdf_path)
+            writer = PyPDF2.PdfWriter()
             for page in reader.pages:
                 writer.add_page(page)
 
@@ -12150,8 +12467,8 @@ async def imgpdf_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # No password → just use base PDF
             shutil.copy(base_pdf_path, final_pdf_path)
 
-        # --- 8. Send result to user ---
-        pages_info = "1 page" if len(pil_images) == 1 else f"{len(pil_images)} pages"
+        # --- 7. Send result to user ---
+        pages_info = "1 page" if result["pages"] == 1 else f"{result['pages']} pages"
         pass_info = "🔓 <b>Unprotected PDF</b>" if not password else "🔐 <b>Password-Protected PDF</b>"
 
         with open(final_pdf_path, "rb") as fh:
@@ -12219,7 +12536,7 @@ class UserInfoCache:
         }
         
         try:
-            async with aiosqlite.connect(DB_NAME) as db:
+            async with db_pool.reader() as db:
                 async with db.execute("SELECT 1 FROM subscribers WHERE user_id=?", (user_id,)) as c:
                     db_data["is_sub"] = bool(await c.fetchone())
                 
@@ -12590,9 +12907,9 @@ async def cf_delete_user_api(user_id: int) -> bool:
         return False
 
 async def cf_log_action(user_id: int, action: str, domain: str = "", details: str = ""):
-    """Log Cloudflare action for stats"""
+    """Log Cloudflare action for stats (write-behind, tidak menunggu DB)"""
     try:
-        await db_execute(
+        audit_queue.push(
             "INSERT INTO cloudflare_stats (user_id, action, domain, details, timestamp) VALUES (?, ?, ?, ?, ?)",
             (user_id, action, domain, details, datetime.datetime.now().isoformat())
         )
@@ -12626,7 +12943,7 @@ async def cf_api_request(method: str, endpoint: str, api_key: str, email: str, d
             "X-Auth-Key": api_key,
             "Content-Type": "application/json"
         }
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_clients.client(timeout=30) as client:
             url = f"{CF_API_BASE}{endpoint}"
             if method == "GET":
                 r = await client.get(url, headers=headers)
@@ -12711,7 +13028,7 @@ async def cf_ping_host(hostname: str) -> str:
 async def cf_get_domain_info(domain: str) -> dict:
     """Get domain WHOIS info"""
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
+        async with http_clients.client(timeout=15) as client:
             r = await client.get(f"https://api.api-ninjas.com/v1/whois?domain={domain}")
             if r.status_code == 200:
                 return r.json()
@@ -13656,12 +13973,10 @@ async def sholat_reminder_callback(update: Update, context: ContextTypes.DEFAULT
             
             # Store user's preferred prayer city
             try:
-                async with aiosqlite.connect(DB_NAME) as db:
-                    await db.execute("""
-                        INSERT OR REPLACE INTO user_preferences (user_id, prayer_city)
-                        VALUES (?, ?)
-                    """, (user_id, city))
-                    await db.commit()
+                await db_pool.execute("""
+                    INSERT OR REPLACE INTO user_preferences (user_id, prayer_city)
+                    VALUES (?, ?)
+                """, (user_id, city))
             except Exception as e:
                 logger.debug(f"[SHOLAT] DB update error: {e}")
             
@@ -13708,12 +14023,10 @@ async def sholat_reminder_callback(update: Update, context: ContextTypes.DEFAULT
             
             # Store reminder preferences
             try:
-                async with aiosqlite.connect(DB_NAME) as db:
-                    await db.execute("""
-                        INSERT OR REPLACE INTO user_preferences (user_id, prayer_reminder, prayer_type)
-                        VALUES (?, 1, ?)
-                    """, (user_id, prayer_type))
-                    await db.commit()
+                await db_pool.execute("""
+                    INSERT OR REPLACE INTO user_preferences (user_id, prayer_reminder, prayer_type)
+                    VALUES (?, 1, ?)
+                """, (user_id, prayer_type))
             except Exception as e:
                 logger.debug(f"[SHOLAT] Reminder DB error: {e}")
             
@@ -13914,7 +14227,7 @@ async def proxy_scrape_command(update: Update, context: ContextTypes.DEFAULT_TYP
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
     }
 
-    async with httpx.AsyncClient(headers=headers, timeout=15, follow_redirects=True) as client:
+    async with http_clients.client(headers=headers, timeout=15, follow_redirects=True) as client:
         # Kita buat list tasks untuk semua URL sekaligus
         tasks = []
         map_url_proto = {} # Mapping untuk tahu URL mana milik protokol apa
@@ -14046,12 +14359,10 @@ async def setsholat_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # Simpan Database
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute(
-            "INSERT OR REPLACE INTO prayer_subs (chat_id, city) VALUES (?, ?)",
-            (chat_id, city),
-        )
-        await db.commit()
+    await db_pool.execute(
+        "INSERT OR REPLACE INTO prayer_subs (chat_id, city) VALUES (?, ?)",
+        (chat_id, city),
+    )
 
     await update.message.reply_text(
         (
@@ -14081,9 +14392,7 @@ async def stopsholat_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if context.job_queue:
         for job in context.job_queue.get_jobs_by_name(f"{chat_id}_Fajr_rem"): pass  # placeholder safety
 
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute("DELETE FROM prayer_subs WHERE chat_id=?", (chat_id,))
-        await db.commit()
+    await db_pool.execute("DELETE FROM prayer_subs WHERE chat_id=?", (chat_id,))
 
     # Hapus job yang namanya diawali chat_id_
     if context.job_queue:
@@ -14252,14 +14561,12 @@ async def daily_prayer_scheduler(context: ContextTypes.DEFAULT_TYPE):
     if not context.job_queue:
         return
 
-    async with aiosqlite.connect(DB_NAME) as db:
-        async with db.execute("SELECT chat_id, city FROM prayer_subs") as cursor:
-            rows = await cursor.fetchall()
-            for chat_id, city in rows:
-                try:
-                    await schedule_prayers_for_user(context, chat_id, city)
-                except Exception as e:
-                    print(f"daily_prayer_scheduler error ({chat_id}, {city}): {e}")
+    rows = await db_pool.fetch_all("SELECT chat_id, city FROM prayer_subs")
+    for chat_id, city in rows:
+        try:
+            await schedule_prayers_for_user(context, chat_id, city)
+        except Exception as e:
+            print(f"daily_prayer_scheduler error ({chat_id}, {city}): {e}")
 
 # ==========================================
 # 🔄 CALLBACK ROUTER (FIXED & SAFE + REGISTER LOCK + PDF MENU)
@@ -14869,7 +15176,7 @@ async def stripe_check_command(update: Update, context: ContextTypes.DEFAULT_TYP
     msg = await update.message.reply_text("⏳ <b>OKTACOMEL ANALYZING STRIPE LINK...</b>", parse_mode=ParseMode.HTML)
 
     try:
-        async with httpx.AsyncClient(timeout=25, follow_redirects=True) as client:
+        async with http_clients.client(timeout=25, follow_redirects=True) as client:
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
                 "Accept-Language": "en-US,en;q=0.9",
@@ -15285,6 +15592,7 @@ async def clear_cache_command(update: Update, context: ContextTypes.DEFAULT_TYPE
 # application.add_handler(CommandHandler("clearcache", clear_cache_command))
 # application.add_handler(CommandHandler("clean", clear_cache_command))
 
+@rate_limit("scan")
 async def scan_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Autonomous Research Agent - Deep Web Analysis"""
     if not await premium_lock_handler(update, context): return
@@ -15392,7 +15700,7 @@ Please provide:
 Format your response professionally with clear sections. Use facts, statistics, and specific examples where possible. Write in a formal analytical tone."""
         
         # Use existing AI function
-        async with aiohttp.ClientSession() as session:
+        async with http_clients.aiohttp_session() as session:
             payload = {
                 "messages": [{"role": "user", "content": research_prompt}],
                 "model": "gpt-4o-mini"
@@ -15504,21 +15812,46 @@ async def scan_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
     elif action == "scan_close":
         await q.message.delete()
 
+# ==========================================
+# 🛑 STARTUP & SHUTDOWN HOOKS (RESOURCE GLOBAL)
+# ==========================================
+async def post_init(application: Application):
+    """Dipanggil PTB sebelum polling mulai (di dalam event loop)"""
+    audit_queue.start()
+    adguard.start()
+    await catch_up_credit_reset()
+    await http_clients.start()
+    resumed = await broadcast_engine.resume_pending(application.bot)
+    if resumed:
+        print(f"📢 Resumed {resumed} unfinished broadcast(s)")
+
+async def post_shutdown(application: Application):
+    """Dipanggil PTB setelah polling berhenti"""
+    download_pool.shutdown()
+    await broadcast_engine.stop()
+    await adguard.stop()
+    ai_conversation_history.flush_spill()
+    await audit_queue.stop()
+    await http_clients.close()
+    await db_pool.close()
+
 # ==========================================
 # 🚀 MAIN PROGRAM (MESIN UTAMA)
 # ==========================================
 def main():
+    import_report.mark("module init")
     print("🚀 ULTRA GOD MODE v12.0 STARTED...")
 
     # 1. Inisialisasi Database (sync di awal)
     loop = asyncio.get_event_loop()
     loop.run_until_complete(init_db())
+    import_report.mark("init_db")
     
     # 🛡️ ADGUARD: Set global instance
     set_adguard_instance(adguard)
 
     # 2. Build Bot
-    app = Application.builder().token(TOKEN).build()
+    app = Application.builder().token(TOKEN).post_init(post_init).post_shutdown(post_shutdown).build()
 
     # ==========================================
     # 🎮 COMMAND HANDLERS
@@ -15585,9 +15918,11 @@ def main():
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, word_chain_message_wrapper), group=1)
 
     # --- Downloader ---
-    app.add_handler(CommandHandler("dl", dl_command))
-    app.add_handler(CommandHandler("ig", ig_download_command))
-    app.add_handler(CommandHandler("instagram", ig_download_command))
+    # block=False: download lama jalan sebagai task, update user lain (dan tombol Cancel) tetap diproses;
+    # /dl & sp_dl yang sama jadi bisa bertemu di media_flight (single-flight)
+    app.add_handler(CommandHandler("dl", dl_command, block=False))
+    app.add_handler(CommandHandler("ig", ig_download_command, block=False))
+    app.add_handler(CommandHandler("instagram", ig_download_command, block=False))
     app.add_handler(CommandHandler("gl", gallery_command))
     app.add_handler(CommandHandler("gallery", gallery_command))
 
@@ -15673,15 +16008,18 @@ def main():
     app.add_handler(CallbackQueryHandler(notes_callback_handler, pattern="^notes_"))
 
     # --- PDF Tools ---
+    # block=False: job pdf_engine ditunggu sebagai task, update lain tetap diproses;
+    # job user lain bisa antri bersamaan (posisi antrian / progress halaman jalan)
     app.add_handler(CommandHandler("pdf", pdf_menu_command))
     app.add_handler(CommandHandler("pdftools", pdf_menu_command))
     app.add_handler(CallbackQueryHandler(pdf_callback_handler, pattern=r"^pdf_help\|"))
     app.add_handler(CallbackQueryHandler(pdf_menu_callback, pattern=r"^pdf_menu\|"))
-    app.add_handler(CommandHandler("pdfmerge", pdf_merge_command))
-    app.add_handler(CommandHandler("pdfsplit", pdf_split_command))
-    app.add_handler(CommandHandler("pdftotext", pdf_to_text_command))
-    app.add_handler(CommandHandler("compresspdf", pdf_compress_command))
-    app.add_handler(CommandHandler("imgpdf", imgpdf_command))
+    app.add_handler(CommandHandler("pdfmerge", pdf_merge_command, block=False))
+    app.add_handler(MessageHandler(filters.Document.PDF, pdf_merge_document_handler), group=2)
+    app.add_handler(CommandHandler("pdfsplit", pdf_split_command, block=False))
+    app.add_handler(CommandHandler("pdftotext", pdf_to_text_command, block=False))
+    app.add_handler(CommandHandler("compresspdf", pdf_compress_command, block=False))
+    app.add_handler(CommandHandler("imgpdf", imgpdf_command, block=False))
     
     # --- Backfree Mode ---
     app.add_handler(CommandHandler("bf", bf_command))
@@ -15712,10 +16050,11 @@ def main():
     # --- Music Suite (Spotify/Etc) ---
     app.add_handler(CommandHandler("song", song_command))
     app.add_handler(CommandHandler("music", song_command))
-    app.add_handler(CallbackQueryHandler(song_button_handler, pattern=r"^sp_dl\|"))
+    app.add_handler(CallbackQueryHandler(song_button_handler, pattern=r"^sp_dl\|", block=False))
     app.add_handler(CallbackQueryHandler(song_nav_handler, pattern=r"^sp_nav\|"))
     app.add_handler(CallbackQueryHandler(lyrics_handler, pattern=r"^lyr_get\|"))
-    app.add_handler(CallbackQueryHandler(real_effect_handler, pattern=r"^eff_"))
+    app.add_handler(CallbackQueryHandler(real_effect_handler, pattern=r"^eff_", block=False))
+    app.add_handler(CallbackQueryHandler(download_cancel_handler, pattern=r"^dlq_cancel\|"))
 
     # ==========================================
     # 🚀 SPEED TEST (PISAH)
@@ -15766,12 +16105,20 @@ def main():
             jq.run_repeating(check_price_alerts, interval=60, first=30, name="price_alert_checker")
         except NameError: pass
         
+        try:
+            jq.run_daily(daily_credit_reset, time=datetime.time(hour=0, minute=0, tzinfo=TZ), name="daily_credit_reset")
+        except NameError: pass
+
         try:
             jq.run_daily(check_premium_expiry_reminder, time=datetime.time(hour=9, minute=0, tzinfo=TZ), name="premium_expiry_reminder")
         except NameError: pass
     else:
         print("\n❌ WARNING: JobQueue TIDAK AKTIF! (pip install python-telegram-bot[job-queue])\n")
 
+    import_report.mark("handlers")
+    import_report.finish()
+    print(f"⏱️ Startup report:\n{import_report.format_boot()}")
+
     print("✅ SYSTEM ONLINE (FULL FEATURES + FACTORY MODE)")
     app.run_polling()
 
@@ -0,0 +1,139 @@
+# ==========================================
+# 👑 ENTITLEMENT SERVICE - PLAN / EXPIRY / SUBSCRIBER CACHE
+# ==========================================
+
+import datetime
+import logging
+import time
+from collections import OrderedDict
+
+from respcache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class Entitlement:
+    """Snapshot hak akses 1 user (plan premium, expiry, subscriber, owner)"""
+
+    __slots__ = ("user_id", "is_owner", "has_premium_row", "plan", "expires_at", "is_subscriber", "loaded_at")
+
+    def __init__(self, user_id: int, is_owner: bool, has_premium_row: bool, plan: str,
+                 expires_at: str, is_subscriber: bool):
+        self.user_id = user_id
+        self.is_owner = is_owner
+        self.has_premium_row = has_premium_row
+        self.plan = plan
+        self.expires_at = expires_at
+        self.is_subscriber = is_subscriber
+        self.loaded_at = time.time()
+
+    @property
+    def premium_expired(self) -> bool:
+        if not (self.has_premium_row and self.expires_at):
+            return False
+        try:
+            return datetime.datetime.fromisoformat(self.expires_at) <= datetime.datetime.now()
+        except (TypeError, ValueError):
+            return False
+
+    @property
+    def is_premium(self) -> bool:
+        """Punya baris premium_users yang belum expired (tanpa expires_at = permanen)"""
+        return self.has_premium_row and not self.premium_expired
+
+
+class EntitlementService:
+    """
+    Cache entitlement per user di memory (LRU + TTL).
+    - Miss: 1 query premium_users + 1 query subscribers, digabung per user lewat SingleFlight
+    - Perubahan (addprem, redeem, expiry, backfree) WAJIB panggil invalidate()/invalidate_all()
+    - TTL hanya jaring pengaman untuk perubahan yang tidak lewat bot ini
+    - Generasi per user: invalidate() saat load masih jalan -> hasil load itu tidak disimpan,
+      dan get() berikutnya tidak ikut menunggu load lama (key SingleFlight = (user, generasi))
+    """
+
+    def __init__(self, pool, owner_id: int, ttl: float = 300.0, max_entries: int = 50000):
+        self.pool = pool
+        self.owner_id = owner_id
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._flight = SingleFlight()
+        # Jam invalidate: _stamps hanya dicatat (dan dibutuhkan) selama ada load berjalan
+        self._clock = 0
+        self._epoch = 0
+        self._stamps = {}
+        self._loading = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.dropped_loads = 0
+
+    def _generation(self, user_id: int) -> int:
+        return max(self._stamps.get(user_id, 0), self._epoch)
+
+    async def _load(self, user_id: int, generation: int) -> Entitlement:
+        self._loading += 1
+        try:
+            premium = await self.pool.fetch_one(
+                "SELECT plan, expires_at FROM premium_users WHERE user_id = ?", (user_id,)
+            )
+            subscriber = await self.pool.fetch_one(
+                "SELECT 1 FROM subscribers WHERE user_id = ?", (user_id,)
+            )
+        finally:
+            self._loading -= 1
+        ent = Entitlement(
+            user_id,
+            is_owner=user_id == self.owner_id,
+            has_premium_row=bool(premium),
+            plan=(premium[0] or "basic") if premium else "free",
+            expires_at=premium[1] if premium else None,
+            is_subscriber=bool(subscriber),
+        )
+        if self._generation(user_id) != generation:
+            # Di-invalidate selama query: row ini mungkin sudah basi, jangan masuk cache
+            self.dropped_loads += 1
+        else:
+            self._cache[user_id] = ent
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        if not self._loading:
+            self._stamps.clear()
+        return ent
+
+    async def get(self, user_id: int) -> Entitlement:
+        ent = self._cache.get(user_id)
+        if ent is not None and time.time() - ent.loaded_at < self.ttl:
+            self._cache.move_to_end(user_id)
+            self.hits += 1
+            return ent
+        self.misses += 1
+        generation = self._generation(user_id)
+        return await self._flight.do((user_id, generation), lambda: self._load(user_id, generation))
+
+    def invalidate(self, user_id: int):
+        self._clock += 1
+        if self._loading:
+            self._stamps[user_id] = self._clock
+        if self._cache.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_all(self):
+        self._clock += 1
+        self._epoch = self._clock
+        self.invalidations += len(self._cache)
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self._flight.coalesced,
+            "invalidations": self.invalidations,
+            "dropped_loads": self.dropped_loads,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+        }
@@ -0,0 +1,197 @@
+# ==========================================
+# 🌐 HTTP CLIENT REGISTRY - SHARED KEEP-ALIVE POOLS
+# ==========================================
+
+import asyncio
+import http.cookiejar
+import importlib.util
+import logging
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+import aiohttp
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Timeout default per host (detik) kalau call-site tidak kasih timeout sendiri
+HOST_TIMEOUTS = {
+    "api.gimita.id": 45.0,
+    "api.binance.com": 10.0,
+    "api.aladhan.com": 15.0,
+    "api.cloudflare.com": 30.0,
+    "api.openweathermap.org": 15.0,
+    "data.bmkg.go.id": 15.0,
+    "text.pollinations.ai": 120.0,
+}
+
+DEFAULT_TIMEOUT = 30.0
+
+
+class _RejectAllCookies(http.cookiejar.CookiePolicy):
+    """Client shared dipakai semua user: jar-nya tidak pernah menyimpan / mengirim cookie"""
+
+    netscape = True
+    rfc2965 = False
+    hide_cookie2 = True
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+    def domain_return_ok(self, domain, request):
+        return False
+
+    def path_return_ok(self, path, request):
+        return False
+
+
+class _ClientView:
+    """
+    Wrapper tipis di atas client shared.
+    Menyimpan default timeout / headers / redirect milik call-site tanpa bikin client baru.
+    Cookie hanya hidup selama 1 blok `async with` (seperti client lama per call-site),
+    tidak pernah bocor ke request user lain lewat client shared.
+    """
+
+    def __init__(self, registry, client: httpx.AsyncClient, timeout=None, follow_redirects=False, headers=None):
+        self._registry = registry
+        self._client = client
+        self._timeout = timeout
+        self._follow_redirects = follow_redirects
+        self._headers = dict(headers) if headers else None
+        self._cookies = httpx.Cookies()
+
+    async def request(self, method: str, url: str, stream: bool = False, **kwargs) -> httpx.Response:
+        """`stream=True`: body tidak dibaca, caller wajib `await response.aclose()`"""
+        if "timeout" not in kwargs:
+            kwargs["timeout"] = self._timeout if self._timeout is not None else self._registry.timeout_for(url)
+        follow_redirects = kwargs.pop("follow_redirects", self._follow_redirects)
+        if self._headers:
+            kwargs["headers"] = {**self._headers, **(kwargs.get("headers") or {})}
+        cookies = kwargs.pop("cookies", None)
+        if cookies:
+            self._cookies.update(cookies)
+        self._registry.request_count += 1
+        request = self._client.build_request(method, url, cookies=self._cookies, **kwargs)
+        history = []
+        while True:
+            # Redirect diikuti di sini supaya cookie jar blok ini ikut ke tiap hop
+            response = await self._client.send(request, follow_redirects=False, stream=stream)
+            self._cookies.extract_cookies(response)
+            if not (follow_redirects and response.next_request):
+                response.history = history
+                return response
+            await response.aclose()
+            if len(history) >= self._client.max_redirects:
+                raise httpx.TooManyRedirects("Exceeded maximum allowed redirects.", request=request)
+            history.append(response)
+            request = response.next_request
+            self._cookies.set_cookie_header(request)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("HEAD", url, **kwargs)
+
+
+class HttpClientRegistry:
+    """
+    Satu registry HTTP untuk seluruh proses.
+    - 1 httpx.AsyncClient shared (pool keep-alive per host, HTTP/2 kalau `h2` terpasang)
+    - client terpisah per proxy (contoh: MY_PROXY)
+    - 1 aiohttp.ClientSession shared untuk call-site yang butuh aiohttp
+    Dibuat saat startup, ditutup saat shutdown.
+    """
+
+    def __init__(self, http2: bool = True, max_connections: int = 100, max_keepalive: int = 20,
+                 keepalive_expiry: float = 30.0, host_timeouts: dict = None):
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.host_timeouts = dict(HOST_TIMEOUTS)
+        if host_timeouts:
+            self.host_timeouts.update(host_timeouts)
+        self._clients = {}
+        self._aiohttp = None
+        self._lock = asyncio.Lock()
+        self.request_count = 0
+
+    def timeout_for(self, url: str) -> float:
+        host = (urlparse(url).hostname or "").lower()
+        return self.host_timeouts.get(host, DEFAULT_TIMEOUT)
+
+    def _build_client(self, proxy: str = None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=self.limits,
+            timeout=DEFAULT_TIMEOUT,
+            proxy=proxy,
+            cookies=http.cookiejar.CookieJar(policy=_RejectAllCookies()),
+        )
+
+    def get_client(self, proxy: str = None) -> httpx.AsyncClient:
+        """Ambil (atau buat) client shared untuk proxy tertentu (None = direct)"""
+        client = self._clients.get(proxy)
+        if client is None or client.is_closed:
+            client = self._build_client(proxy)
+            self._clients[proxy] = client
+        return client
+
+    @asynccontextmanager
+    async def client(self, timeout=None, follow_redirects: bool = False, headers: dict = None, proxy: str = None):
+        """
+        Drop-in pengganti `async with httpx.AsyncClient(...) as client:`.
+        Client TIDAK ditutup saat keluar blok; koneksi tetap di pool.
+        """
+        yield _ClientView(self, self.get_client(proxy), timeout, follow_redirects, headers)
+
+    @asynccontextmanager
+    async def aiohttp_session(self):
+        """Drop-in pengganti `async with aiohttp.ClientSession() as session:` (session shared)"""
+        async with self._lock:
+            if self._aiohttp is None or self._aiohttp.closed:
+                connector = aiohttp.TCPConnector(limit=100, limit_per_host=20, ttl_dns_cache=300)
+                self._aiohttp = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+        yield self._aiohttp
+
+    async def start(self):
+        """Siapkan client direct di awal supaya request pertama tidak bayar setup"""
+        self.get_client()
+        logger.info(f"[HTTP] Client registry ready (http2={self.http2})")
+
+    async def close(self):
+        """Tutup semua client & session (dipanggil saat shutdown)"""
+        for proxy, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"[HTTP] Close client error ({proxy or 'direct'}): {e}")
+        self._clients.clear()
+        if self._aiohttp is not None and not self._aiohttp.closed:
+            await self._aiohttp.close()
+        self._aiohttp = None
+        logger.info("[HTTP] Client registry closed")
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._clients),
+            "aiohttp": self._aiohttp is not None and not self._aiohttp.closed,
+            "http2": self.http2,
+            "requests": self.request_count,
+        }
@@ -0,0 +1,90 @@
+# ==========================================
+# 🐢 LAZY IMPORTS + STARTUP REPORT
+# ==========================================
+
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_mb() -> float:
+    if psutil is None:
+        return 0.0
+    try:
+        return psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
+    except Exception:
+        return 0.0
+
+
+class ImportReport:
+    """
+    Catat waktu & RSS startup:
+    - `mark(label)` untuk tiap fase boot (ms sejak mark sebelumnya + RSS saat itu)
+    - `load(name)` untuk import berat yang baru di-load saat handler pertama kali butuh
+    """
+
+    def __init__(self):
+        self._t0 = time.perf_counter()
+        self._last = self._t0
+        self._lock = threading.Lock()
+        self.boot = []       # [(label, ms, rss_mb)]
+        self.lazy = {}       # name -> (ms, rss_delta_mb, loaded_at)
+        self.boot_total_ms = None
+        self.boot_rss_mb = None
+
+    def mark(self, label: str):
+        now = time.perf_counter()
+        self.boot.append((label, round((now - self._last) * 1000, 1), round(_rss_mb(), 1)))
+        self._last = now
+
+    def finish(self):
+        self.boot_total_ms = round((time.perf_counter() - self._t0) * 1000, 1)
+        self.boot_rss_mb = round(_rss_mb(), 1)
+
+    def load(self, name: str):
+        """Import modul saat pertama dibutuhkan (dicatat di report); berikutnya langsung dari sys.modules"""
+        module = sys.modules.get(name)
+        if module is not None and name in self.lazy:
+            return module
+        with self._lock:
+            if name in self.lazy:
+                return sys.modules[name]
+            rss_before = _rss_mb()
+            started = time.perf_counter()
+            module = importlib.import_module(name)
+            ms = round((time.perf_counter() - started) * 1000, 1)
+            self.lazy[name] = (ms, round(_rss_mb() - rss_before, 1), time.time())
+        logger.info(f"[LAZY] Loaded {name} in {ms}ms")
+        return module
+
+    def format_boot(self) -> str:
+        lines = [f"  {label:<18} {ms:>8.1f} ms   RSS {rss:.1f} MB" for label, ms, rss in self.boot]
+        if self.boot_total_ms is not None:
+            lines.append(f"  {'TOTAL':<18} {self.boot_total_ms:>8.1f} ms   RSS {self.boot_rss_mb:.1f} MB")
+        return "\n".join(lines)
+
+    def stats(self) -> dict:
+        return {
+            "boot_ms": self.boot_total_ms or 0.0,
+            "boot_rss_mb": self.boot_rss_mb or 0.0,
+            "rss_mb": round(_rss_mb(), 1),
+            "lazy": dict(self.lazy),
+        }
+
+
+import_report = ImportReport()
+
+
+def lazy_import(name: str):
+    """Shortcut: `yt_dlp = lazy_import("yt_dlp")` di dalam handler"""
+    return import_report.load(name)
@@ -0,0 +1,99 @@
+# ==========================================
+# 💳 CREDIT LEDGER - ATOMIC CONDITIONAL DEDUCT + BULK DAILY RESET
+# ==========================================
+
+import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+FREE_DAILY_CREDITS = 50
+
+# Tabel credits yang boleh dipakai ledger (nama tabel tidak pernah dari input user)
+_CREDIT_TABLES = {True: "premium_users", False: "user_credits"}
+
+
+class CreditLedger:
+    """
+    Potong credits dengan 1 UPDATE bersyarat (`credits >= cost`) di dalam lock writer,
+    jadi 2 request bersamaan tidak bisa sama-sama lolos cek saldo.
+    Reset harian user free = 1 bulk UPDATE terjadwal (bukan cek per user tiap baca).
+    """
+
+    def __init__(self, pool, free_daily: int = FREE_DAILY_CREDITS):
+        self.pool = pool
+        self.free_daily = free_daily
+        self.deductions = 0
+        self.rejections = 0
+        self.resets = 0
+        self.last_reset_rows = 0
+        self.last_reset_at = None
+
+    async def get_free(self, user_id: int) -> int:
+        """Saldo user free (row dibuat dengan saldo harian kalau belum ada)"""
+        row = await self.pool.fetch_one("SELECT credits FROM user_credits WHERE user_id = ?", (user_id,))
+        if row:
+            return row[0]
+        await self.pool.execute(
+            "INSERT OR IGNORE INTO user_credits (user_id, credits, last_reset) VALUES (?, ?, ?)",
+            (user_id, self.free_daily, datetime.datetime.now().isoformat())
+        )
+        return self.free_daily
+
+    async def deduct(self, user_id: int, cost: int, premium: bool = False) -> tuple:
+        """
+        Return (success, remaining). remaining None = row premium tidak ada
+        (misal baru expired) -> caller fallback ke saldo free.
+        """
+        table = _CREDIT_TABLES[bool(premium)]
+        async with self.pool.writer() as db:
+            if not premium:
+                await db.execute(
+                    "INSERT OR IGNORE INTO user_credits (user_id, credits, last_reset) VALUES (?, ?, ?)",
+                    (user_id, self.free_daily, datetime.datetime.now().isoformat())
+                )
+            cursor = await db.execute(
+                f"UPDATE {table} SET credits = credits - ? WHERE user_id = ? AND credits >= ?",
+                (cost, user_id, cost)
+            )
+            success = cursor.rowcount == 1
+            cursor = await db.execute(f"SELECT credits FROM {table} WHERE user_id = ?", (user_id,))
+            row = await cursor.fetchone()
+            await db.commit()
+
+        if success:
+            self.deductions += 1
+        else:
+            self.rejections += 1
+        return (success, row[0] if row else None)
+
+    async def reset_daily(self, before: str = None) -> int:
+        """
+        Reset saldo semua user free ke saldo harian dalam 1 UPDATE.
+        `before` (isoformat): hanya row dengan last_reset lebih lama (untuk catch-up saat boot).
+        """
+        now = datetime.datetime.now().isoformat()
+        if before:
+            rows = await self.pool.execute(
+                "UPDATE user_credits SET credits = ?, last_reset = ? WHERE last_reset IS NULL OR last_reset < ?",
+                (self.free_daily, now, before)
+            )
+        else:
+            rows = await self.pool.execute(
+                "UPDATE user_credits SET credits = ?, last_reset = ?",
+                (self.free_daily, now)
+            )
+        self.resets += 1
+        self.last_reset_rows = rows
+        self.last_reset_at = now
+        logger.info(f"[LEDGER] Daily reset: {rows} users -> {self.free_daily} credits")
+        return rows
+
+    def stats(self) -> dict:
+        return {
+            "deductions": self.deductions,
+            "rejections": self.rejections,
+            "resets": self.resets,
+            "last_reset_rows": self.last_reset_rows,
+            "last_reset_at": self.last_reset_at,
+        }
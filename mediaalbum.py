@@ -0,0 +1,194 @@
+# ==========================================
+# 🖼️ MEDIA ALBUM - HEAD PROBE + SEND_MEDIA_GROUP + FILE_ID REPLAY
+# ==========================================
+
+import asyncio
+import json
+import logging
+
+from telegram import InputMediaDocument, InputMediaPhoto, InputMediaVideo
+from telegram.constants import ParseMode
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+ALBUM_MAX_ITEMS = 10
+# Batas Telegram untuk kirim via URL: foto 5MB, selain itu 20MB
+PHOTO_URL_LIMIT = 5 * 1024 * 1024
+URL_LIMIT = 20 * 1024 * 1024
+
+_INPUT_MEDIA = {"photo": InputMediaPhoto, "video": InputMediaVideo, "document": InputMediaDocument}
+
+
+class AlbumItem:
+    """1 item album: URL sumber + jenis kirim (photo/video/document) hasil probe"""
+
+    __slots__ = ("url", "hint", "kind", "content_type", "size")
+
+    def __init__(self, url: str, hint: str):
+        self.url = url
+        self.hint = hint
+        self.kind = None
+        self.content_type = ""
+        self.size = None
+
+
+def classify(hint: str, content_type: str, size) -> str:
+    """Pilih jenis kirim sekali di depan (tidak ada retry reply_document)"""
+    content_type = (content_type or "").lower()
+    if content_type.startswith("video/"):
+        kind = "video"
+    elif content_type.startswith("image/") and "gif" not in content_type:
+        kind = "photo"
+    elif content_type and not content_type.startswith(("application/octet-stream", "binary/", "text/")):
+        kind = "document"
+    else:
+        # HEAD gagal / content-type generik -> ikut hint dari scraper
+        kind = "video" if hint == "video" else "photo"
+    if size is not None:
+        if kind == "photo" and size > PHOTO_URL_LIMIT:
+            kind = "document"
+        elif kind == "video" and size > URL_LIMIT:
+            kind = "document"
+    return kind
+
+
+def dump_album(entries: list) -> str:
+    """[(kind, file_id), ...] -> string untuk kolom file_id media_cache (media_type 'album')"""
+    return json.dumps(entries)
+
+
+def load_album(raw: str) -> list:
+    return [tuple(e) for e in json.loads(raw)]
+
+
+class AlbumSender:
+    """
+    Kirim hasil multi-item sebagai album (maks 10 per send_media_group):
+    - Semua URL di-probe HEAD paralel (content-type + size) -> photo/video/document
+    - photo+video digabung 1 album, document di album terpisah (aturan Telegram)
+    - Album gagal -> fallback kirim per item dengan jenis yang sudah dipilih
+    - Return [(kind, file_id)] supaya caller bisa cache dan replay 1 album
+    """
+
+    def __init__(self, http, probe_timeout: float = 6.0, probe_concurrency: int = 8):
+        self.http = http
+        self.probe_timeout = probe_timeout
+        self._probe_sem = asyncio.Semaphore(probe_concurrency)
+        self.probes = 0
+        self.probe_failures = 0
+        self.albums = 0
+        self.album_fallbacks = 0
+        self.replays = 0
+        self.items_sent = 0
+
+    async def _probe_one(self, client, item: AlbumItem):
+        async with self._probe_sem:
+            self.probes += 1
+            try:
+                r = await client.head(item.url)
+                if r.is_success:
+                    item.content_type = r.headers.get("content-type", "")
+                    length = r.headers.get("content-length")
+                    item.size = int(length) if length and length.isdigit() else None
+                else:
+                    # CDN menolak HEAD (403/405): header itu milik halaman error -> pakai hint scraper
+                    self.probe_failures += 1
+            except Exception as e:
+                self.probe_failures += 1
+                logger.debug(f"[ALBUM] HEAD failed {item.url[:80]}: {e}")
+        item.kind = classify(item.hint, item.content_type, item.size)
+
+    async def probe(self, items: list) -> list:
+        """items: [(url, hint), ...] -> [AlbumItem] dengan kind terisi"""
+        album_items = [AlbumItem(url, hint) for url, hint in items]
+        async with self.http.client(timeout=self.probe_timeout, follow_redirects=True,
+                                    headers={"User-Agent": "Mozilla/5.0"}) as client:
+            await asyncio.gather(*(self._probe_one(client, item) for item in album_items))
+        return album_items
+
+    @staticmethod
+    def group(entries: list) -> list:
+        """Bagi (kind, media) jadi album: photo/video campur, document terpisah, maks 10 per album"""
+        visual = [e for e in entries if e[0] != "document"]
+        documents = [e for e in entries if e[0] == "document"]
+        groups = []
+        for bucket in (visual, documents):
+            for i in range(0, len(bucket), ALBUM_MAX_ITEMS):
+                groups.append(bucket[i:i + ALBUM_MAX_ITEMS])
+        return groups
+
+    @staticmethod
+    def _file_id(message, kind: str):
+        if kind == "photo" and message.photo:
+            return message.photo[-1].file_id
+        media = getattr(message, kind, None)
+        return media.file_id if media else None
+
+    async def _send_group(self, msg, group: list, caption: str) -> list:
+        media = [
+            _INPUT_MEDIA[kind](source, caption=caption if i == 0 else None,
+                               parse_mode=ParseMode.HTML if caption and i == 0 else None)
+            for i, (kind, source) in enumerate(group)
+        ]
+        try:
+            messages = await msg.reply_media_group(media=media)
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            messages = await msg.reply_media_group(media=media)
+        self.albums += 1
+        return [(kind, self._file_id(m, kind)) for (kind, _), m in zip(group, messages)]
+
+    async def _send_single(self, msg, kind: str, source: str, caption: str):
+        send = {"photo": msg.reply_photo, "video": msg.reply_video, "document": msg.reply_document}[kind]
+        message = await send(source, caption=caption, parse_mode=ParseMode.HTML if caption else None)
+        return (kind, self._file_id(message, kind))
+
+    async def send(self, msg, entries: list, caption: str = None) -> list:
+        """
+        entries: [(kind, url_atau_file_id)]. Caption hanya di item pertama.
+        Return [(kind, file_id)] untuk item yang terkirim.
+        """
+        sent = []
+        for g, group in enumerate(self.group(entries)):
+            cap = caption if g == 0 else None
+            if len(group) == 1:
+                try:
+                    sent.append(await self._send_single(msg, group[0][0], group[0][1], cap))
+                except Exception as e:
+                    logger.warning(f"[ALBUM] Single {group[0][0]} failed: {e}")
+                continue
+            try:
+                sent.extend(await self._send_group(msg, group, cap))
+                continue
+            except Exception as e:
+                # 1 URL jelek bikin seluruh album ditolak -> kirim satu-satu
+                self.album_fallbacks += 1
+                logger.warning(f"[ALBUM] Album of {len(group)} failed, sending items: {e}")
+            for i, (kind, source) in enumerate(group):
+                try:
+                    sent.append(await self._send_single(msg, kind, source, cap if i == 0 else None))
+                except Exception as e:
+                    logger.warning(f"[ALBUM] Item {kind} failed: {e}")
+        self.items_sent += len(sent)
+        return [e for e in sent if e[1]]
+
+    async def send_items(self, msg, items: list, caption: str = None) -> list:
+        """Probe lalu kirim; items: [(url, hint)]"""
+        probed = await self.probe(items)
+        return await self.send(msg, [(item.kind, item.url) for item in probed], caption)
+
+    async def replay(self, msg, entries: list, caption: str = None) -> list:
+        """Kirim ulang album dari file_id cache (tanpa download/probe)"""
+        self.replays += 1
+        return await self.send(msg, entries, caption)
+
+    def stats(self) -> dict:
+        return {
+            "albums": self.albums,
+            "items_sent": self.items_sent,
+            "fallbacks": self.album_fallbacks,
+            "replays": self.replays,
+            "probes": self.probes,
+            "probe_failures": self.probe_failures,
+        }
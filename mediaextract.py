@@ -0,0 +1,284 @@
+# ==========================================
+# 🧲 MEDIA EXTRACTOR - DECLARATIVE FIELD PATHS PER PLATFORM
+# ==========================================
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MEDIA_BUCKETS = ("video", "audio", "image")
+META_FIELDS = ("title", "uploader")
+# URL "video" yang ternyata audio (misal field play di slideshow TikTok)
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".aac")
+
+# Field response GiMiTA per platform (path "a.b", "a[].b" = tiap item list).
+# "primary" = bucket media utama; kalau semuanya kosong -> None (caller pakai collect_urls).
+GIMITA_EXTRACTORS = {
+    "tiktok": {
+        "primary": ("video", "image"),
+        "video": ("data.hdplay", "data.play", "data.nowatermark", "data.video.noWatermark", "data.wmplay"),
+        "audio": ("data.music", "data.music_info.play"),
+        "image": ("data.images[]", "data.images[].url"),
+        "title": ("data.title", "data.desc"),
+        "uploader": ("data.author.nickname", "data.author.unique_id", "data.author"),
+        "music_info": ("data.music_info",),
+    },
+    "facebook": {
+        "primary": ("video",),
+        "video": ("data.hd", "data.sd", "data.video_hd", "data.video_sd", "data.url"),
+        "title": ("data.title",),
+        "uploader": ("data.author",),
+    },
+    "twitter": {
+        "primary": ("video", "image"),
+        "video": ("data.video_url", "data.videos[].url", "media_list[].video_url"),
+        "image": ("data.images[]", "data.photos[].url", "media_list[].image_url"),
+        "title": ("data.text", "data.title", "data.desc"),
+        "uploader": ("data.author.name", "data.author.username", "data.user.name", "data.author"),
+    },
+    "youtube": {
+        "primary": ("video",),
+        "video": ("data.download_url", "data.download", "data.url", "result.download_url", "result.download"),
+        "title": ("data.title", "result.title"),
+        "uploader": ("data.channel", "data.author", "result.channel", "result.author"),
+    },
+    "terabox": {
+        "primary": ("video",),
+        "video": ("data.download_link", "data.dlink", "data.direct_link", "data.url"),
+        "title": ("data.file_name", "data.filename", "data.title"),
+    },
+    "spotify": {
+        # Cover/thumbnail sengaja tidak diambil: kalau masuk bucket image, dl_command
+        # mengirim (dan meng-cache) cover sebagai hasil download
+        "primary": ("audio",),
+        "audio": ("data.download", "data.download_url", "data.url", "result.download"),
+        "title": ("data.title", "data.name", "result.title"),
+        "uploader": ("data.artist", "data.artists", "result.artist"),
+    },
+}
+
+
+def unwrap_response(data):
+    """
+    Response mentah GiMiTA -> bentuk yang dibaca extractor:
+    list -> item pertama; `data` list (carousel/multi media) -> {"data": item pertama,
+    "media_list": semua item}; `result` list -> item pertama. Selain itu apa adanya.
+    """
+    if isinstance(data, list) and data:
+        return data[0]
+    if isinstance(data, dict):
+        if isinstance(data.get("data"), list) and data["data"]:
+            return {"data": data["data"][0], "media_list": data["data"]}
+        if isinstance(data.get("result"), list) and data["result"]:
+            return data["result"][0]
+    return data
+
+
+def compile_path(path: str):
+    """
+    "data.images[].url" -> fungsi obj -> list value.
+    `key[]` = iterasi list di key itu; path yang tidak ada -> list kosong.
+    """
+    steps = []
+    for part in path.split("."):
+        many = part.endswith("[]")
+        steps.append((part[:-2] if many else part, many))
+
+    def get(obj) -> list:
+        values = [obj]
+        for key, many in steps:
+            found = []
+            for value in values:
+                if not isinstance(value, dict):
+                    continue
+                child = value.get(key)
+                if child is None:
+                    continue
+                if many:
+                    if isinstance(child, list):
+                        found.extend(child)
+                else:
+                    found.append(child)
+            if not found:
+                return found
+            values = found
+        return values
+
+    return get
+
+
+class MediaExtractor:
+    """
+    Extractor 1 platform dari spec {field: (path, ...)}.
+    - Bucket media (video/audio/image): semua URL http dari path, urut sesuai spec, tanpa duplikat
+    - `primary`: bucket media utama platform; kalau kosong semua -> None (fallback walk generik)
+    - title/uploader: string pertama yang tidak kosong
+    - music_info: dict pertama (format TikTok music_info)
+    """
+
+    def __init__(self, platform: str, spec: dict):
+        self.platform = platform
+        self.primary = tuple(spec.get("primary", MEDIA_BUCKETS))
+        self.paths = {field: [compile_path(p) for p in paths] for field, paths in spec.items() if field != "primary"}
+
+    def _first(self, field: str, data):
+        for get in self.paths.get(field, ()):
+            for value in get(data):
+                if isinstance(value, str) and value.strip():
+                    return value.strip()
+        return ""
+
+    def extract(self, data) -> dict | None:
+        """Format sama dengan collect_urls (+ title/uploader), None kalau media utama tidak ketemu"""
+        out = {"video": [], "audio": [], "image": [], "other": [], "music_info": None}
+        seen = set()
+        for bucket in MEDIA_BUCKETS:
+            for get in self.paths.get(bucket, ()):
+                for value in get(data):
+                    if isinstance(value, str) and value.startswith(("http://", "https://")) and value not in seen:
+                        seen.add(value)
+                        if bucket == "video" and value.split("?", 1)[0].lower().endswith(AUDIO_EXTENSIONS):
+                            out["audio"].append(value)
+                        else:
+                            out[bucket].append(value)
+        if not any(out[bucket] for bucket in self.primary):
+            # Hanya audio/field sampingan yang cocok -> jangan tekan fallback walk generik
+            return None
+
+        for field in META_FIELDS:
+            out[field] = self._first(field, data)
+
+        for get in self.paths.get("music_info", ()):
+            music = next((v for v in get(data) if isinstance(v, dict)), None)
+            if music:
+                play = music.get("play") or music.get("play_url") or ""
+                out["music_info"] = {
+                    "title": music.get("title", "Unknown"),
+                    "author": music.get("author", "Unknown"),
+                    "url": play.get("uri") if isinstance(play, dict) else play,
+                }
+                break
+        return out
+
+
+class ExtractorRegistry:
+    """Extractor per platform (dicompile sekali saat boot) + hit/fallback counter"""
+
+    def __init__(self, specs: dict):
+        self._extractors = {platform: MediaExtractor(platform, spec) for platform, spec in specs.items()}
+        self.hits = {}
+        self.fallbacks = {}
+
+    def __contains__(self, platform) -> bool:
+        return platform in self._extractors
+
+    def extract(self, platform: str, data) -> dict | None:
+        """None = tidak ada extractor / field tidak ketemu -> caller pakai walk generik"""
+        extractor = self._extractors.get(platform)
+        out = None
+        if extractor is not None:
+            try:
+                out = extractor.extract(data)
+            except Exception as e:
+                logger.debug(f"[EXTRACT] {platform} extractor error: {e}")
+        counter = self.hits if out is not None else self.fallbacks
+        counter[platform] = counter.get(platform, 0) + 1
+        return out
+
+    def stats(self) -> dict:
+        hits = sum(self.hits.values())
+        fallbacks = sum(self.fallbacks.values())
+        return {
+            "platforms": len(self._extractors),
+            "hits": hits,
+            "fallbacks": fallbacks,
+            "fallback_by_platform": dict(self.fallbacks),
+            "hit_rate": round(hits / (hits + fallbacks) * 100, 1) if hits + fallbacks else 0.0,
+        }
+
+
+def collect_urls(obj, platform: str = None):
+    """
+    Smart URL collector that categorizes media URLs.
+    Improved to handle TikTok/Instagram better - avoid duplicate thumbnails when video exists.
+    """
+    out = {"video": [], "audio": [], "image": [], "other": [], "music_info": None}
+    seen = {bucket: set() for bucket in ("video", "audio", "image", "other")}
+
+    # Track if we found a real video (not thumbnail)
+    has_real_video = False
+
+    def push(url: str, bucket: str):
+        nonlocal has_real_video
+        if not isinstance(url, str):
+            return
+        url = url.strip()
+        if not url.startswith(("http://", "https://")):
+            return
+        if url not in seen[bucket]:
+            seen[bucket].add(url)
+            out[bucket].append(url)
+            if bucket == "video":
+                has_real_video = True
+
+    def walk(x, parent_key=""):
+        if isinstance(x, dict):
+            for k, v in x.items():
+                lk = str(k).lower()
+                full_key = f"{parent_key}.{lk}" if parent_key else lk
+
+                if isinstance(v, str) and v.startswith(("http://", "https://")):
+                    # Priority: Video detection
+                    if any(w in lk for w in ["video", "play", "nowatermark", "hdplay", "wmplay"]):
+                        push(v, "video")
+                    # Music/Audio detection
+                    elif any(w in lk for w in ["music", "audio", "mp3", "sound"]) or ".mp3" in v.lower():
+                        push(v, "audio")
+                    # Skip thumbnails/covers if we're likely a video post
+                    elif any(w in lk for w in ["thumb", "thumbnail", "cover", "origin_cover", "dynamic_cover", "avatar"]):
+                        # Don't add thumbnails to image bucket - skip them
+                        pass
+                    # Real images (TikTok slideshow, IG carousel)
+                    elif any(w in lk for w in ["images", "image_post", "display_url", "image_url"]):
+                        push(v, "image")
+                    # Fallback with extension check
+                    elif ".mp4" in v.lower() or ".webm" in v.lower():
+                        push(v, "video")
+                    else:
+                        push(v, "other")
+                else:
+                    walk(v, full_key)
+
+            # Extract music info from TikTok response
+            if "music" in x and isinstance(x.get("music"), dict):
+                music = x["music"]
+                out["music_info"] = {
+                    "title": music.get("title", "Unknown"),
+                    "author": music.get("author", "Unknown"),
+                    "url": music.get("play_url", {}).get("uri") if isinstance(music.get("play_url"), dict) else music.get("play_url", "")
+                }
+
+        elif isinstance(x, list):
+            for it in x:
+                walk(it, parent_key)
+
+    walk(obj)
+
+    # Fallback heuristics
+    if not out["video"]:
+        for u in out["other"]:
+            if any(t in u.lower() for t in [".mp4", ".mkv", ".webm"]):
+                push(u, "video")
+
+    if not out["audio"]:
+        for u in out["other"]:
+            if any(t in u.lower() for t in [".mp3", ".m4a", ".aac"]):
+                push(u, "audio")
+
+    # SMART: If we have video, clear images (they're likely just thumbnails)
+    # Exception: Instagram carousel and TikTok slideshows explicitly have "images" array
+    if has_real_video and platform in ["tiktok", "pornhub", "xnxx"]:
+        # For video platforms, thumbnails are not useful
+        out["image"] = []
+
+    return out
@@ -0,0 +1,758 @@
+# ==========================================
+# 📄 PDF ENGINE - PROCESS WORKERS + MEMORY/TIME LIMIT + QUEUE POSITION
+# ==========================================
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+import zipfile
+
+try:
+    import resource
+except ImportError:  # Windows: tanpa limit memory
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class PdfJobRejected(Exception):
+    """Antrian PDF penuh"""
+
+
+QUEUE_FULL_MESSAGE = "PDF queue is full. Please try again in a moment."
+
+
+class PdfJobFailed(Exception):
+    """Worker error / timeout / kena limit memory"""
+
+
+# ===== OPERASI (jalan di PROSES worker, input & output lewat path file) =====
+
+# Merge streaming: output ditulis append-only per input (objek di-renumber),
+# Pages + Catalog + xref baru ditulis saat finish. Memory worker = 1 file input.
+MERGE_HEADER = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+_MERGE_PAGES_ID = 1
+_MERGE_CATALOG_ID = 2
+
+
+def _load_merge_state(state_path: str) -> dict:
+    with open(state_path, "r") as fh:
+        return json.load(fh)
+
+
+def _save_merge_state(state_path: str, state: dict):
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(state, fh)
+    os.replace(tmp_path, state_path)
+
+
+def start_merge(out_path: str, state_path: str):
+    """Siapkan file output merge (header) + state kosong"""
+    with open(out_path, "wb") as fh:
+        fh.write(MERGE_HEADER)
+    # offsets[id] = posisi byte objek id di output (None = belum/tidak ada)
+    _save_merge_state(state_path, {"next_id": 3, "offsets": [None, None, None], "pages": []})
+
+
+def _op_merge_append(path: str, out_path: str, state_path: str) -> dict:
+    """Salin semua halaman `path` (+ objek yang direferensikan) ke akhir output merge"""
+    from collections import deque
+    from PyPDF2 import PdfReader
+    from PyPDF2.generic import (
+        ArrayObject, DecodedStreamObject, DictionaryObject, EncodedStreamObject,
+        IndirectObject, NameObject, NullObject, StreamObject,
+    )
+
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        raise ValueError("Encrypted PDF is not supported")
+    state = _load_merge_state(state_path)
+    offsets = state["offsets"]
+    next_id = state["next_id"]
+    mapping = {}
+    queue = deque()
+
+    def new_ref(ref):
+        nonlocal next_id
+        key = (ref.idnum, ref.generation)
+        if key not in mapping:
+            mapping[key] = next_id
+            next_id += 1
+            queue.append(ref)
+        return IndirectObject(mapping[key], 0, None)
+
+    def remap(obj):
+        if isinstance(obj, IndirectObject):
+            target = obj.get_object()
+            # Node pohon halaman / catalog sumber tidak ikut; Pages baru dibuat saat finish
+            if isinstance(target, DictionaryObject) and target.get("/Type") in ("/Pages", "/Catalog"):
+                return NullObject()
+            return new_ref(obj)
+        if isinstance(obj, StreamObject):
+            copy = EncodedStreamObject() if isinstance(obj, EncodedStreamObject) else DecodedStreamObject()
+            copy._data = obj._data
+            for key, value in obj.items():
+                copy[NameObject(key)] = remap(value)
+            return copy
+        if isinstance(obj, DictionaryObject):
+            copy = DictionaryObject()
+            for key, value in obj.items():
+                copy[NameObject(key)] = remap(value)
+            return copy
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(remap(value) for value in obj)
+        return obj
+
+    # reader.pages sudah menyalin atribut warisan (Resources, MediaBox, Rotate) ke tiap halaman
+    page_ids = [new_ref(page.indirect_reference).idnum for page in reader.pages]
+    page_set = set(page_ids)
+    with open(out_path, "ab") as fh:
+        while queue:
+            ref = queue.popleft()
+            new_id = mapping[(ref.idnum, ref.generation)]
+            obj = ref.get_object()
+            data = NullObject() if obj is None else remap(obj)
+            if new_id in page_set:
+                data[NameObject("/Parent")] = IndirectObject(_MERGE_PAGES_ID, 0, None)
+            offsets.extend([None] * (new_id + 1 - len(offsets)))
+            offsets[new_id] = fh.tell()
+            fh.write(f"{new_id} 0 obj\n".encode())
+            data.write_to_stream(fh, None)
+            fh.write(b"\nendobj\n")
+
+    # State hanya disimpan kalau semua objek tertulis; sisa byte job gagal tidak direferensikan xref
+    state["next_id"] = next_id
+    state["pages"].extend(page_ids)
+    _save_merge_state(state_path, state)
+    return {"pages": len(page_ids), "objects": len(mapping)}
+
+
+def finish_merge(out_path: str, state_path: str) -> dict:
+    """Tulis Pages, Catalog, xref & trailer -> output jadi PDF valid (cepat, tanpa baca ulang input)"""
+    state = _load_merge_state(state_path)
+    pages = state["pages"]
+    if not pages:
+        raise ValueError("No pages to merge")
+    offsets = state["offsets"]
+    size = state["next_id"]
+    with open(out_path, "ab") as fh:
+        offsets[_MERGE_PAGES_ID] = fh.tell()
+        kids = " ".join(f"{page_id} 0 R" for page_id in pages)
+        fh.write(f"{_MERGE_PAGES_ID} 0 obj\n<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>\nendobj\n".encode())
+        offsets[_MERGE_CATALOG_ID] = fh.tell()
+        fh.write(f"{_MERGE_CATALOG_ID} 0 obj\n<< /Type /Catalog /Pages {_MERGE_PAGES_ID} 0 R >>\nendobj\n".encode())
+        xref_at = fh.tell()
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f\r\n"]
+        for obj_id in range(1, size):
+            offset = offsets[obj_id] if obj_id < len(offsets) else None
+            lines.append(f"{offset:010d} 00000 n\r\n" if offset is not None else "0000000000 65535 f\r\n")
+        lines.append(f"trailer\n<< /Size {size} /Root {_MERGE_CATALOG_ID} 0 R >>\nstartxref\n{xref_at}\n%%EOF\n")
+        fh.write("".join(lines).encode())
+    return {"pages": len(pages), "size": os.path.getsize(out_path)}
+
+
+def parse_page_ranges(spec: str, max_ranges: int = 50) -> list:
+    """
+    "1-3,10,20-25" / "5-" -> [[1, 3], [10, 10], [20, 25], [5, None]] (1-based, inklusif).
+    Raise ValueError kalau format salah. Batas atas dicek worker (jumlah halaman belum diketahui).
+    """
+    ranges = []
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        start, dash, end = part.partition("-")
+        if not start.isdigit() or (end and not end.isdigit()):
+            raise ValueError(f"Invalid page range: {part}")
+        first = int(start)
+        last = (int(end) if end else None) if dash else first
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f"Invalid page range: {part}")
+        ranges.append([first, last])
+    if not ranges:
+        raise ValueError("No pages selected")
+    if len(ranges) > max_ranges:
+        raise ValueError(f"Too many ranges (max {max_ranges})")
+    return ranges
+
+
+def _select_pages(ranges, total: int) -> list:
+    """Range 1-based -> index 0-based unik, urut sesuai input, dipotong ke jumlah halaman"""
+    if not ranges:
+        return list(range(total))
+    selected = []
+    seen = set()
+    for first, last in ranges:
+        for page in range(first, min(last or total, total) + 1):
+            if page - 1 not in seen:
+                seen.add(page - 1)
+                selected.append(page - 1)
+    return selected
+
+
+def _op_split(path: str, out_path: str, ranges: list = None, as_files: bool = False) -> dict:
+    """
+    Halaman terpilih -> 1 PDF per halaman. Default ditulis langsung ke ZIP `out_path`
+    (tiap halaman di-serialize ke memory lalu masuk zip, tanpa file sementara);
+    `as_files`: `out_path` = folder, tiap halaman jadi page_N.pdf (untuk seleksi kecil).
+    """
+    import io
+    from PyPDF2 import PdfReader, PdfWriter
+
+    reader = PdfReader(path)
+    total = len(reader.pages)
+    selected = _select_pages(ranges, total)
+    if not selected:
+        raise ValueError(f"Selected pages are outside this PDF ({total} pages)")
+
+    def render(index: int) -> bytes:
+        writer = PdfWriter()
+        writer.add_page(reader.pages[index])
+        buf = io.BytesIO()
+        writer.write(buf)
+        return buf.getvalue()
+
+    files = []
+    if as_files:
+        for index in selected:
+            file_path = os.path.join(out_path, f"page_{index + 1}.pdf")
+            with open(file_path, "wb") as fh:
+                fh.write(render(index))
+            files.append(file_path)
+    else:
+        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for index in selected:
+                zf.writestr(f"page_{index + 1}.pdf", render(index))
+    return {"pages": len(selected), "total": total, "files": files}
+
+
+def _op_info(path: str) -> dict:
+    from PyPDF2 import PdfReader
+
+    return {"pages": len(PdfReader(path).pages)}
+
+
+def _op_extract(path: str, out_path: str, start: int = 0, end: int = None) -> dict:
+    """Teks halaman [start, end) -> out_path (halaman kosong dilewati, dipisah baris kosong)"""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    end = len(reader.pages) if end is None else min(end, len(reader.pages))
+    chars = 0
+    with open(out_path, "w", encoding="utf-8") as fh:
+        for i in range(start, end):
+            txt = (reader.pages[i].extract_text() or "").strip()
+            if txt:
+                if chars:
+                    fh.write("\n\n")
+                fh.write(txt)
+                chars += len(txt)
+    return {"pages": end - start, "chars": chars}
+
+
+# Gambar -> PDF: JPEG di-embed apa adanya (DCTDecode, tanpa decode/encode ulang),
+# orientasi EXIF lewat matrix `cm` halaman. Hanya non-JPEG / JPEG raksasa yang di-decode.
+IMAGE_PDF_RESOLUTION = 150.0
+IMAGE_PAGE_MAX_DIM = 2500
+JPEG_PASSTHROUGH_MAX_DIM = 8000
+_JPEG_PASSTHROUGH_MODES = {"L": "/DeviceGray", "RGB": "/DeviceRGB"}
+
+
+def _orientation_matrix(orientation: int, width: float, height: float) -> tuple:
+    """
+    Matrix `cm` untuk gambar di kotak halaman width x height (ukuran SETELAH rotasi),
+    hasilnya sama dengan ImageOps.exif_transpose untuk tag Orientation 1-8.
+    """
+    w, h = width, height
+    return {
+        2: (-w, 0, 0, h, w, 0),
+        3: (-w, 0, 0, -h, w, h),
+        4: (w, 0, 0, -h, 0, h),
+        5: (0, -h, -w, 0, w, h),
+        6: (0, -h, w, 0, 0, h),
+        7: (0, h, w, 0, 0, 0),
+        8: (0, h, -w, 0, w, 0),
+    }.get(orientation, (w, 0, 0, h, 0, 0))
+
+
+def _jpeg_source(path: str, max_dim: int):
+    """(width, height, colorspace, orientation) kalau file bisa di-embed langsung, selain itu None"""
+    from PIL import Image
+
+    with Image.open(path) as im:  # lazy: hanya baca header, pixel tidak di-decode
+        if im.format != "JPEG" or im.mode not in _JPEG_PASSTHROUGH_MODES or max(im.size) > max_dim:
+            return None
+        orientation = im.getexif().get(0x0112, 1)
+        return im.width, im.height, _JPEG_PASSTHROUGH_MODES[im.mode], orientation if 1 <= orientation <= 8 else 1
+
+
+def _reencode_image(path: str, max_dim: int) -> tuple:
+    """Jalur lambat: decode, auto-rotate, RGB, thumbnail -> (bytes JPEG, width, height, colorspace)"""
+    import io
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as src:
+        im = ImageOps.exif_transpose(src)
+        if im.mode not in _JPEG_PASSTHROUGH_MODES:
+            im = im.convert("RGB")
+        if max(im.size) > max_dim:
+            im.thumbnail((max_dim, max_dim))
+        buf = io.BytesIO()
+        im.save(buf, "JPEG")
+        return buf.getvalue(), im.width, im.height, _JPEG_PASSTHROUGH_MODES[im.mode]
+
+
+def _op_images(paths: list, out_path: str, max_dim: int = IMAGE_PAGE_MAX_DIM,
+               resolution: float = IMAGE_PDF_RESOLUTION) -> dict:
+    """
+    1 gambar = 1 halaman. Ukuran halaman = gambar (dibatasi `max_dim` px) pada `resolution` dpi,
+    JPEG passthrough tetap resolusi asli di halaman yang sama. File gagal dibaca dilewati.
+    """
+    scale = 72.0 / resolution
+    offsets = [None, None, None]
+    page_ids = []
+    passthrough = decoded = 0
+    with open(out_path, "wb") as fh:
+        fh.write(MERGE_HEADER)
+
+        def begin(obj_id: int):
+            offsets.extend([None] * (obj_id + 1 - len(offsets)))
+            offsets[obj_id] = fh.tell()
+            fh.write(f"{obj_id} 0 obj\n".encode())
+
+        for path in paths:
+            try:
+                source = _jpeg_source(path, JPEG_PASSTHROUGH_MAX_DIM)
+                if source:
+                    width, height, colorspace, orientation = source
+                    data = None
+                    length = os.path.getsize(path)
+                else:
+                    data, width, height, colorspace = _reencode_image(path, max_dim)
+                    orientation = 1
+                    length = len(data)
+            except Exception as e:
+                logger.warning(f"[PDF] Image skipped {os.path.basename(path)}: {e}")
+                continue
+
+            # Orientasi 5-8 = rotasi 90°: lebar/tinggi halaman ditukar
+            shown_w, shown_h = (height, width) if orientation >= 5 else (width, height)
+            fit = min(1.0, max_dim / max(shown_w, shown_h))
+            page_w = round(shown_w * fit * scale, 2)
+            page_h = round(shown_h * fit * scale, 2)
+
+            page_id = len(offsets)
+            content_id, image_id = page_id + 1, page_id + 2
+            matrix = " ".join(f"{v:g}" for v in _orientation_matrix(orientation, page_w, page_h))
+            content = f"q {matrix} cm /Im0 Do Q".encode()
+
+            begin(page_id)
+            fh.write(
+                f"<< /Type /Page /Parent {_MERGE_PAGES_ID} 0 R /MediaBox [0 0 {page_w:g} {page_h:g}] "
+                f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>\nendobj\n".encode()
+            )
+            begin(content_id)
+            fh.write(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream\nendobj\n")
+            begin(image_id)
+            fh.write(
+                f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} /ColorSpace {colorspace} "
+                f"/BitsPerComponent 8 /Filter /DCTDecode /Length {length} >>\nstream\n".encode()
+            )
+            if data is None:
+                with open(path, "rb") as src:
+                    shutil.copyfileobj(src, fh)
+                passthrough += 1
+            else:
+                fh.write(data)
+                decoded += 1
+            fh.write(b"\nendstream\nendobj\n")
+            page_ids.append(page_id)
+
+    if not page_ids:
+        raise ValueError("No readable images")
+    state_path = f"{out_path}.state"
+    _save_merge_state(state_path, {"next_id": len(offsets), "offsets": offsets, "pages": page_ids})
+    try:
+        result = finish_merge(out_path, state_path)
+    finally:
+        os.remove(state_path)
+    result.update(passthrough=passthrough, decoded=decoded)
+    return result
+
+
+PDF_OPS = {
+    "info": _op_info,
+    "merge_append": _op_merge_append,
+    "split": _op_split,
+    "extract": _op_extract,
+    "images": _op_images,
+}
+
+
+def _append_part(part_path: str, out_path: str, separator: bool):
+    """Sambung hasil 1 shard ke file output (jalan di thread, bukan event loop)"""
+    with open(out_path, "a", encoding="utf-8") as out, open(part_path, "r", encoding="utf-8") as part:
+        if separator:
+            out.write("\n\n")
+        shutil.copyfileobj(part, out)
+    os.remove(part_path)
+
+
+def _child_main(argv: list) -> int:
+    """
+    Entry point proses worker (`python pdfengine.py <op> <args_json> <memory_bytes>`):
+    pasang limit memory, jalankan op, tulis hasil kecil (JSON 1 baris) ke stdout.
+    """
+    op, args, memory_bytes = argv[0], json.loads(argv[1]), int(argv[2])
+    try:
+        if memory_bytes and resource is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+        result = {"ok": PDF_OPS[op](*args)}
+    except MemoryError:
+        result = {"error": "Memory limit exceeded"}
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    sys.stdout.write(json.dumps(result))
+    sys.stdout.flush()
+    return 0 if "ok" in result else 1
+
+
+class PdfJob:
+    """State 1 job PDF (posisi antrian dibaca callback progress)"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, user_id: int, op: str):
+        self.id = next(self._ids)
+        self.user_id = user_id
+        self.op = op
+        self.status = "queued"
+        self.position = 0
+        self.started_at = None
+        self.pid = None
+
+
+class MergeSession:
+    """
+    Sesi /pdfmerge multi-file: tiap PDF yang dikirim user langsung di-download
+    (paralel dengan append sebelumnya) lalu di-append URUT ke output di PDF worker.
+    `finish()` cuma menulis Pages/xref, jadi selesai instan berapapun jumlah file.
+    Sesi memesan 1 tempat antrian engine selama hidup (append jalan 1 per 1), jadi dihitung
+    ke `max_queue`; raise PdfJobRejected kalau antrian penuh. `on_progress(job)` (opsional)
+    menerima posisi antrian append yang sedang menunggu.
+    """
+
+    def __init__(self, engine, user_id: int, work_dir: str, max_files: int = 50):
+        self._reservation = engine.reserve(1)
+        self.engine = engine
+        self.user_id = user_id
+        self.work_dir = work_dir
+        self.max_files = max_files
+        self.out_path = os.path.join(work_dir, "merged.pdf")
+        self.state_path = os.path.join(work_dir, "merge_state.json")
+        self.files = 0
+        self.pages = 0
+        self.accepted = 0
+        self.errors = []
+        self.touched_at = time.time()
+        self.on_progress = None
+        self._tail = None
+        try:
+            start_merge(self.out_path, self.state_path)
+        except Exception:
+            engine.release(self._reservation)
+            raise
+
+    def add(self, name: str, download) -> asyncio.Task:
+        """
+        `download(path)`: coroutine yang menyimpan file ke `path`.
+        Return task yang selesai setelah file ini ter-append (error dicatat, tidak di-raise).
+        """
+        self.accepted += 1
+        self.touched_at = time.time()
+        index = self.accepted
+        previous = self._tail
+
+        async def step():
+            path = os.path.join(self.work_dir, f"input_{index}.pdf")
+            try:
+                await download(path)
+            except Exception as e:
+                self.errors.append(f"{name}: download failed ({e})")
+            if previous is not None:
+                await previous
+            if not os.path.exists(path):
+                return
+            try:
+                result = await self.engine.run("merge_append", path, self.out_path, self.state_path,
+                                               user_id=self.user_id, on_progress=self._progress, reserved=True)
+                self.files += 1
+                self.pages += result["pages"]
+            except Exception as e:
+                self.errors.append(f"{name}: {e}")
+            finally:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        self._tail = asyncio.ensure_future(step())
+        return self._tail
+
+    async def _progress(self, job: PdfJob):
+        if self.on_progress:
+            await self.on_progress(job)
+
+    @property
+    def full(self) -> bool:
+        return self.accepted >= self.max_files
+
+    async def finish(self) -> dict:
+        if self._tail is not None:
+            await self._tail
+        result = await asyncio.to_thread(finish_merge, self.out_path, self.state_path)
+        result["files"] = self.files
+        return result
+
+    def close(self):
+        if self._tail is not None and not self._tail.done():
+            self._tail.cancel()
+        if self._reservation:
+            self.engine.release(self._reservation)
+            self._reservation = 0
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+class PdfEngine:
+    """
+    Merge / split / extract PDF di proses terpisah (1 proses python per job):
+    - event loop tidak pernah menjalankan PyPDF2
+    - proses baru bersih (bukan fork bot / re-import __main__), cukup stdlib + PyPDF2
+    - tiap job punya limit waktu (`timeout`) dan memory (`memory_mb`, RLIMIT_AS); lewat -> proses di-kill
+    - maksimal `max_workers` job paralel, antrian terbatas `max_queue` + posisi antrian
+    - file tidak pernah lewat event loop: worker baca/tulis path di disk, yang balik cuma dict kecil
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 20, timeout: float = 120.0, memory_mb: int = 768):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self._slots = asyncio.Semaphore(max_workers)
+        self._waiting = []
+        self._reserved = 0
+        self._jobs = {}
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.shards = 0
+        self.total_ms = 0.0
+
+    # ===== WORKER (PROSES) =====
+
+    async def _execute(self, job: PdfJob, op: str, args: tuple, timeout: float) -> dict:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), op, json.dumps(args), str(self.memory_bytes),
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        job.pid = proc.pid
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PdfJobFailed(f"Timed out after {timeout:.0f}s")
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+        try:
+            result = json.loads(stdout.decode() or "{}")
+        except ValueError:
+            result = {}
+        if "ok" in result:
+            return result["ok"]
+        if result.get("error"):
+            raise PdfJobFailed(result["error"])
+        logger.debug(f"[PDF] Worker stderr: {stderr.decode(errors='replace')[-500:]}")
+        raise PdfJobFailed(f"Worker crashed (exit code {proc.returncode})")
+
+    # ===== API (EVENT LOOP) =====
+
+    def _refresh_positions(self):
+        for idx, waiting_job in enumerate(self._waiting):
+            waiting_job.position = idx + 1
+
+    def queue_load(self) -> int:
+        """Tempat antrian terpakai: job yang menunggu slot + tempat yang sudah dipesan (`reserve`)"""
+        return len(self._waiting) + self._reserved
+
+    def reserve(self, units: int = 1) -> int:
+        """
+        Pesan `units` tempat antrian untuk job multi-langkah (shard extract, sesi merge), dihitung ke `max_queue`
+        sejak job diterima supaya langkah berikutnya tidak ditolak di tengah jalan.
+        Raise PdfJobRejected kalau tidak muat. Caller wajib `release(units)`.
+        """
+        if self.queue_load() + units > self.max_queue:
+            raise PdfJobRejected(QUEUE_FULL_MESSAGE)
+        self._reserved += units
+        return units
+
+    def release(self, units: int):
+        self._reserved -= units
+
+    def _leave_queue(self, job: PdfJob, reserved: bool):
+        if job in self._waiting:
+            self._waiting.remove(job)
+            self._refresh_positions()
+            if reserved:
+                self._reserved += 1
+
+    async def run(self, op: str, *args, user_id: int = 0, timeout: float = None,
+                  on_progress=None, progress_interval: float = 2.0, queue_exempt: bool = False,
+                  reserved: bool = False) -> dict:
+        """
+        Jalankan 1 operasi PDF_OPS di proses worker dan tunggu hasilnya (dict kecil).
+        `on_progress(job)` dipanggil berkala selama antri.
+        `reserved`: pakai 1 tempat yang sudah dipesan caller (`reserve`): tidak ditolak max_queue,
+        tetap masuk `_waiting` (dapat posisi antrian), tempatnya dikembalikan ke reservasi setelah keluar.
+        `queue_exempt`: shard yang ditanggung reservasi caller, tidak masuk `_waiting`
+        jadi tidak menggeser posisi antrian user lain.
+        Raise PdfJobRejected / PdfJobFailed.
+        """
+        if op not in PDF_OPS:
+            raise ValueError(f"Unknown PDF op: {op}")
+        if not (queue_exempt or reserved) and self.queue_load() >= self.max_queue:
+            raise PdfJobRejected(QUEUE_FULL_MESSAGE)
+
+        job = PdfJob(user_id, op)
+        self._jobs[job.id] = job
+        if not queue_exempt:
+            self._waiting.append(job)
+            self._refresh_positions()
+            if reserved:
+                self._reserved -= 1  # tempat reservasi pindah jadi entry `_waiting`
+
+        acquired = False
+        acquire_task = asyncio.ensure_future(self._slots.acquire())
+        try:
+            while True:
+                done, _ = await asyncio.wait({acquire_task}, timeout=progress_interval)
+                if done:
+                    acquired = True
+                    break
+                if on_progress:
+                    await self._safe_progress(on_progress, job)
+
+            self._leave_queue(job, reserved)
+            job.status = "running"
+            job.started_at = time.monotonic()
+            if on_progress:
+                await self._safe_progress(on_progress, job)
+
+            result = await self._execute(job, op, args, timeout or self.timeout)
+            job.status = "done"
+            self.completed += 1
+            self.total_ms += (time.monotonic() - job.started_at) * 1000
+            return result
+
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception:
+            job.status = "failed"
+            self.failed += 1
+            raise
+        finally:
+            self._leave_queue(job, reserved)
+            if not acquired:
+                if acquire_task.done() and not acquire_task.cancelled():
+                    acquired = True
+                else:
+                    acquire_task.cancel()
+            if acquired:
+                self._slots.release()
+            self._jobs.pop(job.id, None)
+
+    async def extract_text(self, path: str, out_path: str, user_id: int = 0, on_progress=None,
+                           on_pages=None, shard_pages: int = 25, shard_concurrency: int = 2) -> dict:
+        """
+        Extract teks dibagi per range halaman (`shard_pages`), shard jalan paralel di slot worker
+        (maksimal `shard_concurrency` sekaligus per job, supaya 1 PDF besar tidak memonopoli slot).
+        Hasil shard disambung ke `out_path` URUT halaman begitu shard itu (dan semua sebelumnya)
+        selesai; `on_pages(done, total, chars)` dipanggil tiap ada shard yang tersambung.
+        Saat diterima, job memesan `shard_concurrency` tempat antrian (shard yang bisa menunggu
+        sekaligus), jadi PDF sebesar apapun tetap dihitung ke `max_queue`.
+        """
+        units = self.reserve(max(1, min(shard_concurrency, self.max_workers)))
+        try:
+            return await self._extract_shards(path, out_path, units, user_id, on_progress, on_pages, shard_pages)
+        finally:
+            self.release(units)
+
+    async def _extract_shards(self, path: str, out_path: str, units: int, user_id: int,
+                              on_progress, on_pages, shard_pages: int) -> dict:
+        info = await self.run("info", path, user_id=user_id, on_progress=on_progress, reserved=True)
+        total = info["pages"]
+        ranges = [(start, min(start + shard_pages, total)) for start in range(0, total, shard_pages)] or [(0, 0)]
+        in_flight = asyncio.Semaphore(units)
+
+        async def shard(i: int, start: int, end: int) -> dict:
+            async with in_flight:
+                return await self.run(
+                    "extract", path, f"{out_path}.part{i}", start, end, user_id=user_id, queue_exempt=True
+                )
+
+        tasks = [asyncio.ensure_future(shard(i, start, end)) for i, (start, end) in enumerate(ranges)]
+        self.shards += len(tasks)
+        open(out_path, "w").close()
+        done = chars = 0
+        try:
+            for i, task in enumerate(tasks):
+                result = await task
+                await asyncio.to_thread(_append_part, f"{out_path}.part{i}", out_path, bool(chars and result["chars"]))
+                done += result["pages"]
+                chars += result["chars"]
+                if on_pages:
+                    try:
+                        await on_pages(done, total, chars)
+                    except Exception as e:
+                        logger.debug(f"[PDF] Page callback error: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Tunggu shard yang di-cancel benar-benar mati sebelum hapus part file
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for i in range(len(tasks)):
+                try:
+                    os.remove(f"{out_path}.part{i}")
+                except OSError:
+                    pass
+        return {"pages": total, "chars": chars, "shards": len(tasks)}
+
+    async def _safe_progress(self, on_progress, job: PdfJob):
+        try:
+            await on_progress(job)
+        except Exception as e:
+            logger.debug(f"[PDF] Progress callback error: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "running": sum(1 for j in self._jobs.values() if j.status == "running"),
+            "queued": len(self._waiting),
+            "reserved": self._reserved,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "shards": self.shards,
+            "avg_ms": round(self.total_ms / self.completed) if self.completed else 0,
+        }
+
+
+if __name__ == "__main__":
+    sys.exit(_child_main(sys.argv[1:]))
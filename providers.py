@@ -0,0 +1,216 @@
+# ==========================================
+# 🏁 PROVIDER RACER - HEALTH SCORE + HEDGED REQUEST + CIRCUIT BREAKER
+# ==========================================
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailable(Exception):
+    """Provider down (error transport / HTTP 5xx) -> dihitung gagal oleh circuit breaker"""
+
+
+# Hanya error ini yang membuka circuit; "tidak ada hasil" (link private/invalid) bukan salah provider
+PROVIDER_FAILURES = (ProviderUnavailable, asyncio.TimeoutError, OSError)
+
+
+class ProviderHealth:
+    """Statistik rolling 1 provider: latency EWMA, success rate, circuit breaker"""
+
+    __slots__ = ("name", "latency", "outcomes", "consecutive_failures", "open_until", "probing",
+                 "wins", "calls", "empty")
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self.latency = None  # EWMA detik (hanya dari request sukses)
+        self.outcomes = deque(maxlen=window)  # True/False terakhir
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probing = False  # half-open: 1 request percobaan sedang jalan
+        self.wins = 0
+        self.calls = 0
+        self.empty = 0
+
+    @property
+    def success_rate(self) -> float:
+        # Provider baru dianggap sehat supaya tetap dicoba
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 1.0
+
+    def score(self, default_latency: float) -> float:
+        """Makin kecil makin bagus: perkiraan waktu sampai dapat hasil"""
+        latency = self.latency if self.latency is not None else default_latency
+        return latency / max(self.success_rate, 0.05)
+
+
+class ProviderRacer:
+    """
+    Jalankan beberapa provider yang setara (misal scraper IG) secara hedged:
+    - Urutan = skor health (latency EWMA / success rate), provider circuit-open dilewati
+    - Provider terbaik jalan dulu; kalau belum selesai setelah `hedge_delay`
+      (atau gagal), provider berikutnya ikut dijalankan
+    - Hasil valid pertama menang, sisanya di-cancel
+    - Gagal = error transport / timeout / 5xx (ProviderUnavailable). Provider yang menjawab
+      tapi tanpa hasil (link private/invalid) hanya menurunkan skor, tidak membuka circuit
+    - `failure_threshold` gagal berturut-turut -> circuit open selama `cooldown` detik,
+      setelah itu tepat 1 request percobaan (half-open); race lain melewati provider itu
+      sampai percobaan selesai
+    - Kalau semua circuit open, provider yang cooldown-nya paling cepat habis tetap dicoba
+    """
+
+    def __init__(self, name: str, hedge_delay: float = 2.5, attempt_timeout: float = 20.0,
+                 failure_threshold: int = 3, cooldown: float = 120.0, window: int = 50,
+                 alpha: float = 0.3, latency_samples: int = 500):
+        self.name = name
+        self.hedge_delay = hedge_delay
+        self.attempt_timeout = attempt_timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.window = window
+        self.alpha = alpha
+        self._health = {}
+        self._latencies = deque(maxlen=latency_samples)
+        self.races = 0
+        self.hedged = 0
+        self.exhausted = 0
+
+    def health(self, provider: str) -> ProviderHealth:
+        h = self._health.get(provider)
+        if h is None:
+            h = self._health[provider] = ProviderHealth(provider, self.window)
+        return h
+
+    def _record(self, provider: str, outcome: str, elapsed: float):
+        """outcome: "ok" (ada hasil), "empty" (menjawab tanpa hasil), "failed" (down)"""
+        h = self.health(provider)
+        h.calls += 1
+        h.outcomes.append(outcome == "ok")
+        if outcome != "failed":
+            # Provider hidup -> circuit tertutup lagi; latency hanya dari hasil valid
+            h.consecutive_failures = 0
+            h.open_until = 0.0
+            if outcome == "ok":
+                h.latency = elapsed if h.latency is None else (1 - self.alpha) * h.latency + self.alpha * elapsed
+            else:
+                h.empty += 1
+        else:
+            h.consecutive_failures += 1
+            if h.consecutive_failures >= self.failure_threshold:
+                h.open_until = time.monotonic() + self.cooldown
+                logger.info(f"[RACER] {self.name}/{provider} circuit open ({h.consecutive_failures} failures)")
+
+    def _half_open(self, h: ProviderHealth) -> bool:
+        return h.consecutive_failures >= self.failure_threshold
+
+    def _available(self, h: ProviderHealth, now: float) -> bool:
+        return h.open_until <= now and not h.probing
+
+    def ranked(self, providers: list) -> list:
+        """Provider yang boleh dicoba, urut skor terbaik (circuit open / sedang probe dibuang)"""
+        now = time.monotonic()
+        allowed = [p for p in providers if self._available(self.health(p), now)]
+        if not allowed:
+            # Semua circuit open: jangan langsung menyerah, probe yang cooldown-nya paling cepat habis
+            idle = [p for p in providers if not self.health(p).probing]
+            if idle:
+                return [min(idle, key=lambda p: self.health(p).open_until)]
+        return sorted(allowed, key=lambda p: self.health(p).score(self.hedge_delay * 2))
+
+    def _launch(self, provider: str, factory) -> asyncio.Future:
+        h = self.health(provider)
+        task = asyncio.ensure_future(self._attempt(provider, factory))
+        if self._half_open(h):
+            # Ditandai saat launch (bukan di dalam task) supaya race lain langsung melewatinya
+            h.probing = True
+            task.add_done_callback(lambda _t: setattr(h, "probing", False))
+        return task
+
+    async def _attempt(self, provider: str, factory):
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(factory(), self.attempt_timeout)
+            outcome = "ok" if result else "empty"
+        except asyncio.CancelledError:
+            # Kalah race bukan berarti provider jelek -> tidak dicatat
+            raise
+        except PROVIDER_FAILURES as e:
+            logger.debug(f"[RACER] {self.name}/{provider} failed: {e}")
+            result, outcome = None, "failed"
+        except Exception as e:
+            # Response aneh (parse error dsb) = provider menjawab tapi tanpa hasil
+            logger.debug(f"[RACER] {self.name}/{provider} no result: {e}")
+            result, outcome = None, "empty"
+        self._record(provider, outcome, time.monotonic() - start)
+        return result
+
+    async def race(self, providers: dict):
+        """
+        `providers`: {nama: coro_factory}. Factory return hasil (truthy), None kalau tidak ada hasil,
+        atau raise ProviderUnavailable kalau provider down (error transport / 5xx).
+        Return (nama_provider, hasil) atau (None, None) kalau semua gagal.
+        """
+        self.races += 1
+        start = time.monotonic()
+        queue = self.ranked(list(providers))
+        pending = {}
+        winner = (None, None)
+        try:
+            while queue or pending:
+                if queue:
+                    name = queue.pop(0)
+                    # Dilewati kalau race lain sudah mulai probe half-open provider ini
+                    if not self.health(name).probing:
+                        if pending:
+                            self.hedged += 1
+                        pending[self._launch(name, providers[name])] = name
+                if not pending:
+                    continue
+                # Tunggu hasil; kalau ada provider cadangan, maksimal hedge_delay
+                done, _ = await asyncio.wait(
+                    pending, timeout=self.hedge_delay if queue else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    name = pending.pop(task)
+                    result = task.result()
+                    if result:
+                        winner = (name, result)
+                        self.health(name).wins += 1
+                        return winner
+        finally:
+            for task in pending:
+                task.cancel()
+            if winner[0] is None:
+                self.exhausted += 1
+            self._latencies.append(time.monotonic() - start)
+        return winner
+
+    def percentile(self, pct: float) -> float:
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "races": self.races,
+            "hedged": self.hedged,
+            "exhausted": self.exhausted,
+            "p50_ms": round(self.percentile(50) * 1000),
+            "p99_ms": round(self.percentile(99) * 1000),
+            "open": [p for p, h in self._health.items() if h.open_until > now],
+            "providers": {
+                p: {
+                    "latency_ms": round(h.latency * 1000) if h.latency is not None else None,
+                    "success_rate": round(h.success_rate * 100, 1),
+                    "wins": h.wins,
+                    "calls": h.calls,
+                    "empty": h.empty,
+                }
+                for p, h in self._health.items()
+            },
+        }
@@ -0,0 +1,109 @@
+# ==========================================
+# 🚦 RATE LIMITER - TOKEN BUCKET PER (USER, CLASS) + CONCURRENCY BUDGET
+# ==========================================
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per (user_id, command class).
+    - Isi bucket = `capacity` unit, terisi `refill_per_sec` unit/detik
+    - Tiap command memakai `cost` unit (diambil dari CREDIT_COSTS oleh caller)
+    - Bucket yang idle > `idle_ttl` dibuang (bucket penuh = sama dengan tidak ada)
+    - Jumlah bucket dibatasi `max_buckets` (LRU), memory tetap terbatas
+    - Class berat (dl/ai/scan) punya budget eksekusi paralel global
+    """
+
+    def __init__(self, capacity: float = 30.0, refill_per_sec: float = 1.0, idle_ttl: float = 600.0,
+                 max_buckets: int = 100000, concurrency: dict = None):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.idle_ttl = idle_ttl
+        self.max_buckets = max_buckets
+        # (user_id, cls) -> [tokens, last_update]; urutan = terakhir dipakai
+        self._buckets = OrderedDict()
+        self._budgets = {cls: asyncio.Semaphore(limit) for cls, limit in (concurrency or {}).items()}
+        self._budget_limits = dict(concurrency or {})
+        self._in_flight = {cls: 0 for cls in self._budgets}
+        self.allowed = 0
+        self.rejected = {}  # cls -> jumlah ditolak bucket
+        self.busy_rejected = {}  # cls -> jumlah ditolak budget paralel
+        self.expired = 0
+        self.evicted = 0
+
+    def _expire_idle(self, now: float):
+        # Bucket paling lama tidak dipakai ada di depan
+        while self._buckets:
+            bucket = next(iter(self._buckets.values()))
+            if now - bucket[1] < self.idle_ttl:
+                break
+            self._buckets.popitem(last=False)
+            self.expired += 1
+
+    def consume(self, user_id: int, cls: str, cost: float) -> tuple:
+        """Return (allowed, retry_after_detik)"""
+        now = time.monotonic()
+        self._expire_idle(now)
+
+        key = (user_id, cls)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [self.capacity, now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+        else:
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_per_sec)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+
+        cost = min(cost, self.capacity)
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            self.allowed += 1
+            return True, 0.0
+
+        self.rejected[cls] = self.rejected.get(cls, 0) + 1
+        return False, (cost - bucket[0]) / self.refill_per_sec
+
+    @asynccontextmanager
+    async def budget(self, cls: str):
+        """
+        Slot eksekusi global untuk class berat. Yield False kalau budget penuh
+        (tidak menunggu); class tanpa budget selalu yield True.
+        """
+        sem = self._budgets.get(cls)
+        if sem is None:
+            yield True
+            return
+        if sem.locked():
+            self.busy_rejected[cls] = self.busy_rejected.get(cls, 0) + 1
+            yield False
+            return
+        await sem.acquire()
+        self._in_flight[cls] += 1
+        try:
+            yield True
+        finally:
+            self._in_flight[cls] -= 1
+            sem.release()
+
+    def stats(self) -> dict:
+        return {
+            "buckets": len(self._buckets),
+            "max_buckets": self.max_buckets,
+            "allowed": self.allowed,
+            "rejected": sum(self.rejected.values()),
+            "busy_rejected": sum(self.busy_rejected.values()),
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "in_flight": {cls: f"{self._in_flight[cls]}/{limit}" for cls, limit in self._budget_limits.items()},
+        }
@@ -0,0 +1,285 @@
+# ==========================================
+# ⚡ RESPONSE CACHE - TTL LRU + SQLITE TIER + SINGLE-FLIGHT
+# ==========================================
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+logger = logging.getLogger(__name__)
+
+# (host, path_prefix, ttl_detik) — yang pertama cocok dipakai.
+# Endpoint yang tidak ada di sini TIDAK di-cache.
+CACHE_TTL_RULES = [
+    ("api.aladhan.com", "/v1/timingsByCity", 1800),
+    ("data.bmkg.go.id", "/DataMKG/TEWS/autogempa.json", 60),
+    ("api.binance.com", "/api/v3/ticker/24hr", 10),
+    ("api.openweathermap.org", "/data/2.5/weather", 600),
+    ("api.openweathermap.org", "/data/2.5/air_pollution", 900),
+]
+
+# Entry dengan TTL >= ini ikut disimpan ke SQLite (tahan restart)
+PERSIST_MIN_TTL = 300
+
+# Query param rahasia dibuang dari cache key (tidak masuk memory key / tabel SQLite)
+SECRET_PARAMS = ("appid", "apikey", "api_key", "key", "token", "access_token")
+
+
+class NoCache:
+    """Bungkus hasil fetcher yang tetap dikembalikan ke caller tapi TIDAK di-cache (misal body error)"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class SingleFlight:
+    """
+    Gabungkan request identik yang jalan bersamaan jadi 1 eksekusi.
+    Caller berikutnya menunggu hasil task pertama.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.coalesced = 0
+
+    def __contains__(self, key) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key, coro_factory):
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(coro_factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        # shield: kalau 1 caller dibatalkan, task tetap jalan untuk caller lain
+        return await asyncio.shield(task)
+
+
+class InflightRegistry:
+    """
+    Single-flight untuk job panjang yang hasilnya siap SEBELUM job selesai
+    (misal file_id Telegram setelah upload pertama, audio/foto susulan masih jalan).
+    - Caller pertama `claim(key)` lalu jalan normal, `publish()` begitu hasil ada,
+      `release()` di finally (follower dapat None kalau belum publish = gagal)
+    - Caller berikutnya `wait(key)` -> hasil leader, tanpa fetch/download sendiri
+    """
+
+    def __init__(self):
+        self._futures = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.published = 0
+        self.failed = 0
+
+    def __contains__(self, key) -> bool:
+        return key in self._futures
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def claim(self, key) -> bool:
+        """True kalau caller jadi leader untuk key ini"""
+        if key in self._futures:
+            return False
+        self._futures[key] = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        return True
+
+    def publish(self, key, value):
+        fut = self._futures.get(key)
+        if fut is not None and not fut.done():
+            fut.set_result(value)
+            self.published += 1
+
+    def release(self, key):
+        fut = self._futures.pop(key, None)
+        if fut is not None and not fut.done():
+            fut.set_result(None)
+            self.failed += 1
+
+    async def wait(self, key, timeout: float):
+        """
+        Hasil leader, atau None kalau tidak ada job / leader gagal / timeout.
+        Return None hanya saat key sudah lepas (atau timeout), jadi caller bisa
+        langsung `claim()` tanpa await di antaranya.
+        """
+        deadline = time.monotonic() + timeout
+        counted = False
+        while key in self._futures:
+            if not counted:
+                self.coalesced += 1
+                counted = True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                value = await asyncio.wait_for(asyncio.shield(self._futures[key]), remaining)
+            except asyncio.TimeoutError:
+                return None
+            if value is not None:
+                return value
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._futures),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "published": self.published,
+            "failed": self.failed,
+        }
+
+
+class ResponseCache:
+    """
+    Cache response JSON 2 tingkat:
+    L1 = LRU in-memory (OrderedDict), L2 = tabel SQLite `http_cache` (opsional).
+    Miss yang bersamaan untuk key sama digabung lewat SingleFlight.
+    """
+
+    def __init__(self, max_entries: int = 2048, rules: list = None, pool=None, write_queue=None):
+        self.max_entries = max_entries
+        self.rules = rules if rules is not None else CACHE_TTL_RULES
+        self.pool = pool
+        self.write_queue = write_queue
+        self._lru = OrderedDict()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    async def init_table(self):
+        """Buat tabel L2 + buang entry yang sudah expired"""
+        if not self.pool:
+            return
+        async with self.pool.writer() as db:
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    key TEXT PRIMARY KEY,
+                    body TEXT,
+                    expires_at REAL
+                )
+            """)
+            await db.execute("DELETE FROM http_cache WHERE expires_at < ?", (time.time(),))
+            # Row lama yang key-nya masih berisi API key
+            for param in SECRET_PARAMS:
+                await db.execute("DELETE FROM http_cache WHERE key LIKE ?", (f"%{param}=%",))
+            await db.commit()
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        """URL -> cache key tanpa query param rahasia (API key ikut URL, misal appid OpenWeather)"""
+        parsed = urlparse(url)
+        if not parsed.query:
+            return url
+        query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k.lower() not in SECRET_PARAMS]
+        return parsed._replace(query=urlencode(query)).geturl()
+
+    def ttl_for(self, url: str) -> int:
+        parsed = urlparse(url)
+        host = (parsed.hostname or "").lower()
+        for rule_host, prefix, ttl in self.rules:
+            if host == rule_host and parsed.path.startswith(prefix):
+                return ttl
+        return 0
+
+    def _get_l1(self, key):
+        entry = self._lru.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._lru[key]
+            self.expired += 1
+            return None
+        self._lru.move_to_end(key)
+        return value
+
+    def _put_l1(self, key, value, expires_at: float):
+        self._lru[key] = (expires_at, value)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    async def _get_l2(self, key):
+        if not self.pool:
+            return None
+        try:
+            row = await self.pool.fetch_one(
+                "SELECT body, expires_at FROM http_cache WHERE key=?", (key,)
+            )
+        except Exception as e:
+            logger.debug(f"[CACHE] L2 read error: {e}")
+            return None
+        if not row or row[1] < time.time():
+            return None
+        value = json.loads(row[0])
+        self._put_l1(key, value, row[1])
+        return value
+
+    def _put_l2(self, key, value, expires_at: float):
+        if not self.pool:
+            return
+        query = "INSERT OR REPLACE INTO http_cache (key, body, expires_at) VALUES (?, ?, ?)"
+        params = (key, json.dumps(value), expires_at)
+        if self.write_queue:
+            self.write_queue.push(query, params)
+        else:
+            asyncio.ensure_future(self.pool.execute(query, params))
+
+    async def get_or_fetch(self, key: str, ttl: int, fetcher):
+        """
+        Ambil dari cache; kalau miss panggil `fetcher()` (sekali saja untuk request
+        bersamaan). Hasil None / NoCache(...) tidak di-cache.
+        """
+        value = self._get_l1(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        async def _load():
+            cached = await self._get_l2(key)
+            if cached is not None:
+                self.l2_hits += 1
+                return cached
+            self.misses += 1
+            fresh = await fetcher()
+            if isinstance(fresh, NoCache):
+                return fresh.value
+            if fresh is not None:
+                expires_at = time.time() + ttl
+                self._put_l1(key, fresh, expires_at)
+                if ttl >= PERSIST_MIN_TTL:
+                    self._put_l2(key, fresh, expires_at)
+            return fresh
+
+        return await self._flight.do(key, _load)
+
+    def invalidate(self, key: str):
+        self._lru.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.l2_hits + self.misses
+        return {
+            "entries": len(self._lru),
+            "hits": self.hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "coalesced": self._flight.coalesced,
+            "hit_rate": round((self.hits + self.l2_hits) / lookups * 100, 1) if lookups else 0.0,
+        }
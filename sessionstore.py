@@ -0,0 +1,192 @@
+# ==========================================
+# 🗂️ SESSION STORE - TTL + LRU + SIZE ACCOUNTING + SQLITE SPILL
+# ==========================================
+
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def approx_size(value) -> int:
+    """Perkiraan ukuran (byte) value: rekursif untuk dict/list/str, sisanya sys.getsizeof"""
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(approx_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class BoundedStore:
+    """
+    Dict dengan batas:
+    - `ttl`: entry yang tidak disentuh selama ttl detik dibuang
+    - `max_entries` / `max_bytes`: LRU eviction kalau lewat batas
+    - ukuran tiap entry dihitung saat `set` (perubahan in-place wajib `set` ulang)
+    - opsional spill ke SQLite (`spill_table`): entry yang dibuang disimpan via
+      write-behind queue dan di-load lagi oleh `load()` selama umurnya < `spill_ttl`;
+      `pop`/`del` juga menghapus row spill-nya (sesi yang sengaja dihapus tidak balik lagi)
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int, max_bytes: int = None,
+                 pool=None, write_queue=None, spill_table: str = None, spill_ttl: float = 86400 * 7):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.pool = pool
+        self.write_queue = write_queue
+        self.spill_table = spill_table
+        self.spill_ttl = spill_ttl
+        self._data = OrderedDict()  # key -> [value, size, last_access]
+        self.bytes = 0
+        self.evictions = 0
+        self.expired = 0
+        self.spilled = 0
+        self.restored = 0
+
+    async def init_table(self):
+        if not (self.pool and self.spill_table):
+            return
+        async with self.pool.writer() as db:
+            await db.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.spill_table} (
+                    key TEXT PRIMARY KEY,
+                    value TEXT,
+                    updated_at REAL
+                )
+            """)
+            await db.execute(f"DELETE FROM {self.spill_table} WHERE updated_at < ?", (time.time() - self.spill_ttl,))
+            await db.commit()
+
+    # ===== INTERNAL =====
+
+    def _drop(self, key, entry, expired: bool):
+        self.bytes -= entry[1]
+        if expired:
+            self.expired += 1
+        else:
+            self.evictions += 1
+        self._spill(key, entry[0], entry[2])
+
+    def _spill(self, key, value, last_access: float):
+        if not (self.pool and self.spill_table):
+            return
+        try:
+            params = (str(key), json.dumps(value), last_access)
+        except (TypeError, ValueError):
+            return
+        query = f"INSERT OR REPLACE INTO {self.spill_table} (key, value, updated_at) VALUES (?, ?, ?)"
+        if self.write_queue:
+            self.write_queue.push(query, params)
+            self.spilled += 1
+
+    def _unspill(self, key):
+        if self.pool and self.spill_table and self.write_queue:
+            self.write_queue.push(f"DELETE FROM {self.spill_table} WHERE key = ?", (str(key),))
+
+    def _enforce(self, now: float):
+        # Urutan OrderedDict = terakhir disentuh, jadi yang expired selalu di depan
+        while self._data:
+            key, entry = next(iter(self._data.items()))
+            if now - entry[2] < self.ttl:
+                break
+            self._data.popitem(last=False)
+            self._drop(key, entry, expired=True)
+        while len(self._data) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes and len(self._data) > 1):
+            key, entry = self._data.popitem(last=False)
+            self._drop(key, entry, expired=False)
+
+    # ===== DICT API =====
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        now = time.time()
+        if now - entry[2] >= self.ttl:
+            del self._data[key]
+            self._drop(key, entry, expired=True)
+            return default
+        entry[2] = now
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def set(self, key, value):
+        now = time.time()
+        size = approx_size(value)
+        old = self._data.get(key)
+        if old is not None:
+            self.bytes -= old[1]
+        self._data[key] = [value, size, now]
+        self._data.move_to_end(key)
+        self.bytes += size
+        self._enforce(now)
+
+    def pop(self, key, default=None):
+        # Row spill dihapus juga walau key tidak ada di memory (bisa tinggal di SQLite saja)
+        self._unspill(key)
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return default
+        self.bytes -= entry[1]
+        return entry[0]
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if key not in self._data:
+            raise KeyError(key)
+        self.pop(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    async def load(self, key, default=None):
+        """Seperti get(), tapi kalau tidak ada di memory coba ambil dari spill SQLite"""
+        value = self.get(key)
+        if value is not None or not (self.pool and self.spill_table):
+            return value if value is not None else default
+        try:
+            row = await self.pool.fetch_one(
+                f"SELECT value, updated_at FROM {self.spill_table} WHERE key = ?", (str(key),)
+            )
+        except Exception as e:
+            logger.debug(f"[STORE] {self.name} spill read error: {e}")
+            return default
+        if not row or time.time() - row[1] > self.spill_ttl:
+            return default
+        value = json.loads(row[0])
+        self.restored += 1
+        self.set(key, value)
+        return value
+
+    def flush_spill(self):
+        """Spill semua entry di memory (dipanggil saat shutdown, sebelum write queue di-stop)"""
+        for key, entry in self._data.items():
+            self._spill(key, entry[0], entry[2])
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "spilled": self.spilled,
+            "restored": self.restored,
+        }
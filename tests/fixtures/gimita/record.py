@@ -0,0 +1,68 @@
+"""
+Rekam response GiMiTA asli jadi fixture (sudah di-redact).
+
+    python tests/fixtures/gimita/record.py <platform> <url_post> <nama_fixture>
+
+Endpoint diambil dari GIMITA_ENDPOINTS di duhur_fixed.py. Query string semua URL di response
+diganti "REDACTED" (token/signature CDN), field sensitif (cookie, token, key) dikosongkan.
+`expected` sengaja diisi "TODO" (test gagal sampai diisi): isi manual dari response,
+JANGAN disalin dari hasil extractor.
+"""
+
+import ast
+import datetime
+import json
+import os
+import sys
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(HERE)))
+SENSITIVE_KEYS = ("cookie", "token", "apikey", "api_key", "key", "session")
+
+
+def load_endpoints() -> dict:
+    path = os.path.join(ROOT, "duhur_fixed.py")
+    tree = ast.parse(open(path, encoding="utf-8").read(), path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "GIMITA_ENDPOINTS":
+            return ast.literal_eval(node.value)
+    raise SystemExit("GIMITA_ENDPOINTS not found")
+
+
+def redact(obj, key: str = ""):
+    if isinstance(obj, dict):
+        return {k: redact(v, str(k).lower()) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [redact(v, key) for v in obj]
+    if isinstance(obj, str):
+        if key in SENSITIVE_KEYS:
+            return "REDACTED"
+        if obj.startswith(("http://", "https://")) and "?" in obj:
+            return obj.split("?", 1)[0] + "?REDACTED"
+    return obj
+
+
+def main(platform: str, post_url: str, name: str):
+    endpoint = load_endpoints()[platform]
+    r = httpx.get(endpoint, params={"url": post_url}, timeout=45.0, follow_redirects=True,
+                  headers={"User-Agent": "Mozilla/5.0", "Accept": "application/json"})
+    r.raise_for_status()
+    fixture = {
+        "platform": platform,
+        "source": f"recorded {datetime.date.today().isoformat()}",
+        "response": redact(r.json()),
+        "expected": "TODO",
+    }
+    out_path = os.path.join(HERE, f"{name}.json")
+    with open(out_path, "w", encoding="utf-8") as fh:
+        json.dump(fixture, fh, indent=2, ensure_ascii=False)
+        fh.write("\n")
+    print(f"{out_path}: isi `expected` manual sebelum commit")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        raise SystemExit(__doc__)
+    main(*sys.argv[1:])
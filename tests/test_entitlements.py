@@ -0,0 +1,62 @@
+import asyncio
+
+from entitlements import EntitlementService
+
+
+class SlowPool:
+    """fetch_one menunggu `gate` -> invalidate bisa disisipkan saat load masih jalan"""
+
+    def __init__(self):
+        self.subscribers = {1}
+        self.gate = asyncio.Event()
+        self.queries = 0
+
+    async def fetch_one(self, query, params):
+        self.queries += 1
+        if "subscribers" not in query:
+            return None
+        # Hasil diambil saat query mulai (snapshot), dikembalikan setelah gate dibuka
+        row = (1,) if params[0] in self.subscribers else None
+        await self.gate.wait()
+        return row
+
+
+def test_invalidate_during_load_drops_stale_row():
+    async def run():
+        pool = SlowPool()
+        ents = EntitlementService(pool, owner_id=0)
+        first = asyncio.ensure_future(ents.get(1))
+        while pool.queries < 2:
+            await asyncio.sleep(0)
+        # Subscriber dihapus + invalidate saat load pertama masih menunggu query
+        pool.subscribers.clear()
+        ents.invalidate(1)
+        second = asyncio.ensure_future(ents.get(1))
+        while pool.queries < 4:
+            await asyncio.sleep(0)
+        pool.gate.set()
+        stale, fresh = await first, await second
+        cached = await ents.get(1)
+        return ents, stale, fresh, cached
+
+    ents, stale, fresh, cached = asyncio.run(run())
+    assert stale.is_subscriber  # caller lama dapat snapshot saat mulai
+    assert not fresh.is_subscriber and not cached.is_subscriber
+    assert ents.stats()["dropped_loads"] == 1
+    assert ents._stamps == {}
+
+
+def test_invalidate_all_during_load():
+    async def run():
+        pool = SlowPool()
+        ents = EntitlementService(pool, owner_id=0)
+        load = asyncio.ensure_future(ents.get(1))
+        while pool.queries < 2:
+            await asyncio.sleep(0)
+        ents.invalidate_all()
+        pool.gate.set()
+        await load
+        return ents
+
+    ents = asyncio.run(run())
+    assert ents.stats()["entries"] == 0 and ents.stats()["dropped_loads"] == 1
@@ -0,0 +1,42 @@
+import asyncio
+
+import httpx
+
+from httpclients import HttpClientRegistry
+from mediaalbum import PHOTO_URL_LIMIT, AlbumSender, classify
+
+
+def registry_with(handler):
+    registry = HttpClientRegistry(http2=False)
+    build = registry._build_client
+
+    def build_mocked(proxy=None):
+        client = build(proxy)
+        client._transport = httpx.MockTransport(handler)
+        return client
+
+    registry._build_client = build_mocked
+    return registry
+
+
+def test_classify():
+    assert classify("image", "image/jpeg", 1000) == "photo"
+    assert classify("image", "image/jpeg", PHOTO_URL_LIMIT + 1) == "document"
+    assert classify("video", "application/octet-stream", None) == "video"
+    assert classify("image", "image/gif", None) == "document"
+
+
+def test_refused_head_falls_back_to_hint():
+    def handler(request):
+        if "deny" in request.url.path:
+            return httpx.Response(403, headers={"content-type": "application/xml"}, content=b"<Error/>")
+        return httpx.Response(200, headers={"content-type": "video/mp4", "content-length": "1000"})
+
+    sender = AlbumSender(registry_with(handler))
+    items = asyncio.run(sender.probe([
+        ("https://cdn.test/deny/a.mp4", "video"),
+        ("https://cdn.test/deny/b.jpg", "image"),
+        ("https://cdn.test/ok/c", "image"),
+    ]))
+    assert [item.kind for item in items] == ["video", "photo", "video"]
+    assert sender.stats()["probe_failures"] == 2
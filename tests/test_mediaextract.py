@@ -0,0 +1,94 @@
+import glob
+import json
+import os
+
+import pytest
+
+from mediaextract import GIMITA_EXTRACTORS, ExtractorRegistry, collect_urls, compile_path, unwrap_response
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "gimita")
+FIXTURES = sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.json")))
+
+
+def load(path):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+@pytest.fixture
+def registry():
+    return ExtractorRegistry(GIMITA_EXTRACTORS)
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda p: os.path.basename(p)[:-5])
+def test_fixture(registry, path):
+    fx = load(path)
+    # Jalur dl_command: response mentah -> unwrap_response -> extractor
+    data = unwrap_response(fx["response"])
+    out = registry.extract(fx["platform"], data)
+    expected = fx["expected"]
+    assert expected != "TODO", "fixture rekaman baru: isi `expected` manual"
+    if expected is None:
+        # Media utama tidak ketemu -> caller harus jatuh ke walk generik, dan walk itu menemukannya
+        assert out is None
+        walked = collect_urls(data, fx["platform"])
+        assert walked["video"] or walked["audio"] or walked["image"]
+        return
+    assert out is not None
+    for field, value in expected.items():
+        assert out[field] == value, field
+
+
+def all_urls(obj):
+    if isinstance(obj, dict):
+        obj = list(obj.values())
+    if isinstance(obj, list):
+        return set().union(*(all_urls(v) for v in obj)) if obj else set()
+    return {obj} if isinstance(obj, str) and obj.startswith("http") else set()
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda p: os.path.basename(p)[:-5])
+def test_extracted_urls_come_from_response(registry, path):
+    """Semua URL hasil extractor memang ada di response (path tidak salah ambil field)"""
+    fx = load(path)
+    out = registry.extract(fx["platform"], unwrap_response(fx["response"]))
+    if out is None:
+        return
+    urls = all_urls(fx["response"])
+    for bucket in ("video", "audio", "image"):
+        assert set(out[bucket]) <= urls
+
+
+def test_spotify_cover_is_not_media(registry):
+    fx = load(os.path.join(FIXTURE_DIR, "spotify.json"))
+    out = registry.extract("spotify", unwrap_response(fx["response"]))
+    assert out["image"] == []
+    assert fx["response"]["data"]["cover"] not in out["audio"]
+
+
+def test_secondary_field_alone_falls_back(registry):
+    # Hanya musik yang cocok (video utama hilang) -> None supaya walk generik tetap jalan
+    data = {"data": {"music": "https://cdn.example/m.mp3", "video": {"url": "https://cdn.example/v.mp4"}}}
+    assert registry.extract("tiktok", data) is None
+    assert collect_urls(data, "tiktok")["video"] == ["https://cdn.example/v.mp4"]
+
+
+def test_unknown_platform_counts_fallback(registry):
+    assert registry.extract("xnxx", {"data": {"url": "https://cdn.example/v.mp4"}}) is None
+    assert registry.stats()["fallback_by_platform"] == {"xnxx": 1}
+
+
+def test_unwrap_response():
+    items = [{"video_url": "https://cdn.example/1.mp4"}, {"image_url": "https://cdn.example/2.jpg"}]
+    assert unwrap_response({"data": items}) == {"data": items[0], "media_list": items}
+    assert unwrap_response({"result": items}) == items[0]
+    assert unwrap_response(items) == items[0]
+    assert unwrap_response({"data": {"url": "x"}}) == {"data": {"url": "x"}}
+    assert unwrap_response({"data": []}) == {"data": []}
+
+
+def test_compile_path():
+    get = compile_path("data.items[].url")
+    assert get({"data": {"items": [{"url": "a"}, {"x": 1}, {"url": "b"}]}}) == ["a", "b"]
+    assert get({"data": {"items": "nope"}}) == []
+    assert get({"other": 1}) == []
@@ -0,0 +1,109 @@
+import asyncio
+import shutil
+
+import pytest
+from PyPDF2 import PdfReader, PdfWriter
+
+from pdfengine import MergeSession, PdfEngine, PdfJobRejected
+
+
+def blank_pdf(path, pages):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    with open(path, "wb") as fh:
+        writer.write(fh)
+    return str(path)
+
+
+def test_queue_position_advances(tmp_path):
+    path = blank_pdf(tmp_path / "a.pdf", 1)
+    seen = {n: [] for n in range(4)}
+
+    async def run():
+        engine = PdfEngine(max_workers=1, max_queue=10)
+
+        def recorder(n):
+            async def on_progress(job):
+                seen[n].append(job.position if job.status == "queued" else "running")
+            return on_progress
+
+        # Handler block=False: beberapa job diterima bersamaan, masing-masing menunggu slot
+        return await asyncio.gather(*(
+            engine.run("info", path, user_id=n, on_progress=recorder(n), progress_interval=0.02)
+            for n in range(4)
+        ))
+
+    results = asyncio.run(run())
+    assert all(r == {"pages": 1} for r in results)
+    last = seen[3]
+    positions = [p for p in last if p != "running"]
+    assert positions[0] == 3 and positions[-1] == 1
+    assert positions == sorted(positions, reverse=True)
+    assert last[-1] == "running"
+
+
+def test_extract_shards_count_against_queue(tmp_path):
+    path = blank_pdf(tmp_path / "big.pdf", 60)
+    loads = []
+
+    async def run():
+        engine = PdfEngine(max_workers=1, max_queue=3)
+
+        async def on_pages(done, total, chars):
+            loads.append(engine.queue_load())
+
+        extract = asyncio.ensure_future(engine.extract_text(
+            path, str(tmp_path / "out.txt"), user_id=1, on_pages=on_pages, shard_pages=10
+        ))
+        await asyncio.sleep(0)
+        others = await asyncio.gather(
+            *(engine.run("info", path, user_id=n) for n in (2, 3, 4)), return_exceptions=True
+        )
+        result = await extract
+        return engine, result, others
+
+    engine, result, others = asyncio.run(run())
+    assert result["shards"] == 6 and result["pages"] == 60
+    # 1 tempat dipesan job extract (shard_concurrency dibatasi max_workers) -> hanya 2 job lain muat
+    assert [type(o).__name__ for o in others] == ["dict", "dict", "PdfJobRejected"]
+    assert loads and max(loads) <= engine.max_queue
+    assert engine.queue_load() == 0 and engine.stats()["reserved"] == 0
+
+
+def test_merge_sessions_hold_queue_places(tmp_path):
+    src = blank_pdf(tmp_path / "src.pdf", 2)
+
+    async def download(path):
+        shutil.copy(src, path)
+
+    async def run():
+        engine = PdfEngine(max_workers=1, max_queue=2)
+        first = MergeSession(engine, 1, str(tmp_path / "m1"))
+        second = MergeSession(engine, 2, str(tmp_path / "m2"))
+        with pytest.raises(PdfJobRejected):
+            MergeSession(engine, 3, str(tmp_path / "m3"))
+        with pytest.raises(PdfJobRejected):
+            await engine.run("info", src)
+
+        statuses = []
+
+        async def on_progress(job):
+            statuses.append(job.status)
+
+        first.on_progress = on_progress
+        first.add("a.pdf", download)
+        first.add("b.pdf", download)
+        result = await first.finish()
+        result["read_pages"] = len(PdfReader(first.out_path).pages)
+        first.close()
+        load_after_close = engine.queue_load()
+        second.close()
+        return result, statuses, load_after_close, engine.queue_load()
+
+    for name in ("m1", "m2", "m3"):
+        (tmp_path / name).mkdir()
+    result, statuses, load_after_close, load = asyncio.run(run())
+    assert result["pages"] == result["read_pages"] == 4 and result["files"] == 2
+    assert statuses.count("running") == 2
+    assert load_after_close == 1 and load == 0
@@ -0,0 +1,44 @@
+import asyncio
+
+from respcache import NoCache, ResponseCache
+
+
+def test_key_for_strips_secrets():
+    key = ResponseCache.key_for("https://api.openweathermap.org/data/2.5/weather?q=Jakarta&appid=SECRET&units=metric")
+    assert "SECRET" not in key
+    assert key == "https://api.openweathermap.org/data/2.5/weather?q=Jakarta&units=metric"
+    assert ResponseCache.key_for("https://api.binance.com/api/v3/ticker/24hr") == "https://api.binance.com/api/v3/ticker/24hr"
+
+
+def test_error_body_returned_but_not_cached():
+    cache = ResponseCache()
+    calls = []
+
+    async def fetch_error():
+        calls.append(1)
+        return NoCache({"cod": "404", "message": "city not found"})
+
+    async def run():
+        first = await cache.get_or_fetch("k", 600, fetch_error)
+        second = await cache.get_or_fetch("k", 600, fetch_error)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == {"cod": "404", "message": "city not found"}
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_success_is_cached():
+    cache = ResponseCache()
+    calls = []
+
+    async def fetch_ok():
+        calls.append(1)
+        return {"ok": True}
+
+    async def run():
+        return [await cache.get_or_fetch("k", 600, fetch_ok) for _ in range(3)]
+
+    assert asyncio.run(run()) == [{"ok": True}] * 3
+    assert len(calls) == 1
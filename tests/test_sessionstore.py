@@ -0,0 +1,49 @@
+import asyncio
+
+from dbpool import SQLitePool, WriteBehindQueue
+from sessionstore import BoundedStore
+
+
+async def open_store(tmp_path):
+    pool = SQLitePool(str(tmp_path / "store.db"), readers=1)
+    await pool.open()
+    queue = WriteBehindQueue(pool)
+    store = BoundedStore("test", ttl=3600, max_entries=1, pool=pool, write_queue=queue, spill_table="spill")
+    await store.init_table()
+    return pool, queue, store
+
+
+def test_pop_removes_spilled_row(tmp_path):
+    async def run():
+        pool, queue, store = await open_store(tmp_path)
+        store.set("a", {"n": 1})
+        store.set("b", {"n": 2})  # max_entries=1 -> "a" di-spill
+        await queue.flush()
+        restored = await store.load("a")
+        store.pop("a")
+        store.pop("b")
+        await queue.flush()
+        after = await store.load("a"), await store.load("b")
+        await pool.close()
+        return restored, after
+
+    restored, after = asyncio.run(run())
+    assert restored == {"n": 1}
+    assert after == (None, None)
+
+
+def test_spill_after_pop_in_same_batch_survives(tmp_path):
+    async def run():
+        pool, queue, store = await open_store(tmp_path)
+        store.set("a", {"n": 1})
+        store.set("b", {"n": 2})  # spill a
+        store.pop("a")            # delete a
+        store.set("a", {"n": 3})  # spill b
+        store.set("c", {"n": 4})  # spill a lagi, semua dalam 1 batch
+        await queue.flush()
+        store.pop("c")
+        value = await store.load("a")
+        await pool.close()
+        return value
+
+    assert asyncio.run(run()) == {"n": 3}
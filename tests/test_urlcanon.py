@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+
+from httpclients import HttpClientRegistry
+from urlcanon import UrlCanonicalizer
+
+
+class TrackedBody(httpx.AsyncByteStream):
+    """Body besar yang mencatat kalau sempat dibaca"""
+
+    def __init__(self):
+        self.read = False
+
+    async def __aiter__(self):
+        self.read = True
+        yield b"x" * 1_000_000
+
+
+def registry_with(handler):
+    registry = HttpClientRegistry(http2=False)
+    build = registry._build_client
+
+    def build_mocked(proxy=None):
+        client = build(proxy)
+        client._transport = httpx.MockTransport(handler)
+        return client
+
+    registry._build_client = build_mocked
+    return registry
+
+
+def test_resolve_uses_head():
+    methods = []
+
+    def handler(request):
+        methods.append(request.method)
+        if request.url.host == "vt.tiktok.com":
+            return httpx.Response(301, headers={"location": "https://www.tiktok.com/@u/video/7301234567890"})
+        return httpx.Response(200)
+
+    canon = UrlCanonicalizer(registry_with(handler))
+    key = asyncio.run(canon.content_key("https://vt.tiktok.com/ZSabc/"))
+    assert key == "tiktok:7301234567890"
+    assert methods == ["HEAD"]
+
+
+def test_head_refused_falls_back_to_unread_get():
+    methods = []
+    bodies = []
+
+    def handler(request):
+        methods.append(request.method)
+        if request.method == "HEAD":
+            return httpx.Response(405)
+        body = TrackedBody()
+        bodies.append(body)
+        if request.url.host == "bit.ly":
+            return httpx.Response(302, headers={"location": "https://www.tiktok.com/@u/video/42"}, stream=body)
+        return httpx.Response(200, stream=body)
+
+    canon = UrlCanonicalizer(registry_with(handler))
+    final = asyncio.run(canon.resolve("https://bit.ly/abc"))
+    assert final == "https://www.tiktok.com/@u/video/42"
+    assert methods == ["HEAD", "GET"]
+    assert not any(body.read for body in bodies)
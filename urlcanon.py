@@ -0,0 +1,203 @@
+# ==========================================
+# 🔗 URL CANONICALIZER - STABLE PER-PLATFORM CONTENT KEYS
+# ==========================================
+
+import logging
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+logger = logging.getLogger(__name__)
+
+# Host short link -> harus di-resolve (redirect) dulu sebelum dapat ID konten
+SHORT_HOSTS = {
+    "vt.tiktok.com", "vm.tiktok.com", "fb.watch", "t.co", "spotify.link",
+    "on.soundcloud.com", "pin.it", "b23.tv",
+}
+SHORT_PATH_PREFIXES = {
+    "tiktok.com": ("/t/",),
+    "facebook.com": ("/share/",),
+}
+
+# (platform, host regex, path/query regex) -> content key "<platform>:<id>"
+CONTENT_PATTERNS = [
+    ("tiktok", r"(^|\.)tiktok\.com$", r"/(?:video|photo|v)/(\d+)"),
+    ("youtube", r"^youtu\.be$", r"^/([A-Za-z0-9_-]{11})"),
+    ("youtube", r"(^|\.)youtube\.com$", r"(?:[?&]v=|/shorts/|/embed/|/live/|/v/)([A-Za-z0-9_-]{11})"),
+    ("twitter", r"(^|\.)(twitter|x|fxtwitter|vxtwitter)\.com$", r"/status(?:es)?/(\d+)"),
+    ("instagram", r"(^|\.)(instagram\.com|instagr\.am)$", r"/(?:p|reel|reels|tv)/([A-Za-z0-9_-]+)"),
+    ("facebook", r"(^|\.)(facebook|fb)\.com$", r"(?:/videos/(?:[^/]+/)?|/reel/|[?&]v=|[?&]story_fbid=)(\d+)"),
+    ("spotify", r"^open\.spotify\.com$", r"/(?:intl-[a-z]+/)?(track|album|playlist|episode)/([A-Za-z0-9]+)"),
+    ("pornhub", r"(^|\.)pornhub\.com$", r"[?&]viewkey=([A-Za-z0-9]+)"),
+    ("xnxx", r"(^|\.)xnxx\.com$", r"/video-([A-Za-z0-9]+)"),
+    ("terabox", r"(^|\.)(terabox|teraboxapp|1024tera|4funbox|mirrobox|nephobox)\.com$", r"(?:/s/1?|[?&]surl=)([A-Za-z0-9_-]+)"),
+]
+
+# Query param tracking yang dibuang saat normalisasi fallback
+TRACKING_PARAMS = {
+    "si", "igshid", "igsh", "fbclid", "gclid", "feature", "ref", "ref_src", "ref_url", "s", "t",
+    "is_from_webapp", "sender_device", "web_id", "_r", "_t", "share_app_id", "mibextid", "rdid",
+    "share_url", "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "pp", "context",
+}
+STRIP_HOST_PREFIXES = ("www.", "m.", "mobile.", "mbasic.", "web.", "music.")
+
+_COMPILED = [(p, re.compile(h), re.compile(r)) for p, h, r in CONTENT_PATTERNS]
+
+
+def _host(parsed) -> str:
+    host = (parsed.hostname or "").lower()
+    for prefix in STRIP_HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return host
+
+
+def normalize_url(url: str) -> str:
+    """Normalisasi generik: host lowercase tanpa www/m., buang tracking param, fragment & trailing slash"""
+    parsed = urlparse(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=False)
+             if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")]
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse(("https", _host(parsed), path, "", urlencode(sorted(query)), ""))
+
+
+def extract_content_key(url: str):
+    """Content key per platform (misal `tiktok:7301234567890`) atau None kalau pola tidak dikenal"""
+    parsed = urlparse(url.strip())
+    host = _host(parsed)
+    target = parsed.path + ("?" + parsed.query if parsed.query else "")
+    for platform, host_re, id_re in _COMPILED:
+        if not host_re.search(host):
+            continue
+        match = id_re.search(target)
+        if match:
+            return f"{platform}:" + ":".join(g for g in match.groups() if g)
+    return None
+
+
+def is_short_link(url: str) -> bool:
+    parsed = urlparse(url.strip())
+    host = _host(parsed)
+    if (parsed.hostname or "").lower() in SHORT_HOSTS or host in SHORT_HOSTS:
+        return True
+    return any(parsed.path.startswith(p) for p in SHORT_PATH_PREFIXES.get(host, ()))
+
+
+class UrlCanonicalizer:
+    """
+    URL user -> content key stabil (dipakai sebagai key media_cache).
+    Short link di-resolve sekali (ikuti redirect manual, tanpa download body halaman),
+    hasilnya diingat di LRU memory + tabel `url_aliases`.
+    """
+
+    def __init__(self, http, pool=None, write_queue=None, max_aliases: int = 20000, max_hops: int = 5):
+        self.http = http
+        self.pool = pool
+        self.write_queue = write_queue
+        self.max_aliases = max_aliases
+        self.max_hops = max_hops
+        self._aliases = OrderedDict()
+        self.resolved = 0
+        self.alias_hits = 0
+        self.platform_keys = 0
+        self.fallback_keys = 0
+
+    async def init_table(self):
+        if not self.pool:
+            return
+        async with self.pool.writer() as db:
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS url_aliases (
+                    short_url TEXT PRIMARY KEY,
+                    content_key TEXT,
+                    created_at REAL
+                )
+            """)
+            await db.commit()
+
+    def _remember(self, short_url: str, key: str, persist: bool = True):
+        self._aliases[short_url] = key
+        self._aliases.move_to_end(short_url)
+        while len(self._aliases) > self.max_aliases:
+            self._aliases.popitem(last=False)
+        if persist and self.pool and self.write_queue:
+            self.write_queue.push(
+                "INSERT OR REPLACE INTO url_aliases (short_url, content_key, created_at) VALUES (?, ?, ?)",
+                (short_url, key, time.time())
+            )
+
+    async def _lookup_alias(self, short_url: str):
+        key = self._aliases.get(short_url)
+        if key is not None:
+            self._aliases.move_to_end(short_url)
+            return key
+        if not self.pool:
+            return None
+        try:
+            row = await self.pool.fetch_one("SELECT content_key FROM url_aliases WHERE short_url=?", (short_url,))
+        except Exception as e:
+            logger.debug(f"[URLCANON] Alias read error: {e}")
+            return None
+        if row:
+            self._remember(short_url, row[0], persist=False)
+            return row[0]
+        return None
+
+    async def _hop(self, client, url: str):
+        """1 hop tanpa body: HEAD; kalau HEAD ditolak (405/501) GET streaming yang langsung ditutup"""
+        headers = {"User-Agent": "Mozilla/5.0"}
+        resp = await client.head(url, headers=headers)
+        if resp.status_code in (405, 501):
+            resp = await client.request("GET", url, headers=headers, stream=True)
+            await resp.aclose()
+        return resp
+
+    async def resolve(self, url: str) -> str:
+        """Ikuti redirect (maks `max_hops`) sampai URL bukan short link lagi"""
+        current = url
+        async with self.http.client(follow_redirects=False, timeout=10.0) as client:
+            for _ in range(self.max_hops):
+                resp = await self._hop(client, current)
+                location = resp.headers.get("location")
+                if not (resp.is_redirect and location):
+                    break
+                current = urljoin(current, location)
+                if not is_short_link(current) and extract_content_key(current):
+                    break
+        return current
+
+    async def content_key(self, url: str) -> str:
+        url = url.strip()
+        key = extract_content_key(url)
+        if key:
+            self.platform_keys += 1
+            return key
+
+        if is_short_link(url):
+            short = normalize_url(url)
+            key = await self._lookup_alias(short)
+            if key:
+                self.alias_hits += 1
+                return key
+            try:
+                final_url = await self.resolve(url)
+                self.resolved += 1
+                key = extract_content_key(final_url) or f"url:{normalize_url(final_url)}"
+                self._remember(short, key)
+                return key
+            except Exception as e:
+                logger.debug(f"[URLCANON] Resolve failed for {url}: {e}")
+
+        self.fallback_keys += 1
+        return f"url:{normalize_url(url)}"
+
+    def stats(self) -> dict:
+        return {
+            "aliases": len(self._aliases),
+            "resolved": self.resolved,
+            "alias_hits": self.alias_hits,
+            "platform_keys": self.platform_keys,
+            "fallback_keys": self.fallback_keys,
+        }
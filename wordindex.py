@@ -0,0 +1,111 @@
+# ==========================================
+# 🔤 WORD CHAIN INDEX - SHARED READ-ONLY VOCABULARY
+# ==========================================
+
+import gzip
+import logging
+import os
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class LevelVocab:
+    """Vocabulary 1 bahasa + level: tuple (pick by index) + frozenset (lookup). Read-only, dipakai bareng semua game."""
+
+    __slots__ = ("lang", "level", "words", "lookup")
+
+    def __init__(self, lang: str, level: str, words):
+        self.lang = lang
+        self.level = level
+        # lowercase + dedup (urutan pertama dipertahankan) + intern supaya string kata tidak dobel di memori
+        self.words = tuple(dict.fromkeys(sys.intern(w.strip().lower()) for w in words if w and w.strip()))
+        self.lookup = frozenset(self.words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.lookup
+
+
+class WordIndex:
+    """
+    Index kamus word chain, dibangun sekali per (lang, level) saat pertama dipakai.
+    Sumber: dict bawaan (WORD_CHAIN_WORDS) + file opsional (`path`, .txt atau .txt.gz):
+
+        @id easy
+        apel
+        jeruk
+        @en hard
+        ...
+    """
+
+    def __init__(self, builtin: dict, path: str = None):
+        self.builtin = builtin
+        self.path = path
+        self._levels = {}
+        self._file_words = None
+        self._lock = threading.Lock()
+
+    def _load_file(self) -> dict:
+        """Baca file kamus sekali (kalau ada) -> {(lang, level): [words]}"""
+        if self._file_words is not None:
+            return self._file_words
+        result = {}
+        if self.path and os.path.exists(self.path):
+            opener = gzip.open if self.path.endswith(".gz") else open
+            try:
+                with opener(self.path, "rt", encoding="utf-8") as f:
+                    bucket = None
+                    for line in f:
+                        line = line.strip()
+                        if not line or line.startswith("#"):
+                            continue
+                        if line.startswith("@"):
+                            parts = line[1:].split()
+                            bucket = result.setdefault((parts[0], parts[1]), []) if len(parts) == 2 else None
+                        elif bucket is not None:
+                            bucket.append(line)
+                logger.info(f"[WORDINDEX] Loaded {sum(len(v) for v in result.values())} words from {self.path}")
+            except Exception as e:
+                logger.error(f"[WORDINDEX] Load file error: {e}")
+                result = {}
+        self._file_words = result
+        return result
+
+    def get(self, lang: str, level: str):
+        """LevelVocab untuk (lang, level), atau None kalau kosong"""
+        key = (lang, level)
+        vocab = self._levels.get(key)
+        if vocab is not None:
+            return vocab
+        with self._lock:
+            vocab = self._levels.get(key)
+            if vocab is None:
+                words = list(self.builtin.get(lang, {}).get(level, []))
+                words.extend(self._load_file().get(key, []))
+                vocab = LevelVocab(lang, level, words)
+                self._levels[key] = vocab
+        return vocab if len(vocab) else None
+
+    def dump(self, path: str):
+        """Tulis semua kamus (bawaan + file) ke format file index"""
+        keys = {(lang, level) for lang, levels in self.builtin.items() for level in levels}
+        keys.update(self._load_file().keys())
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as f:
+            for lang, level in sorted(keys):
+                vocab = self.get(lang, level)
+                if vocab:
+                    f.write(f"@{lang} {level}\n")
+                    f.write("\n".join(vocab.words))
+                    f.write("\n")
+
+    def stats(self) -> dict:
+        return {
+            "levels": len(self._levels),
+            "words": sum(len(v) for v in self._levels.values()),
+            "file": bool(self._file_words),
+        }